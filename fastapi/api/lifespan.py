@@ -1,10 +1,25 @@
+import asyncio
 from contextlib import asynccontextmanager
 import os
 
 from fastapi import FastAPI
 
-from services.database import create_db_and_tables
-from utils.get_env import get_app_data_directory_env
+from api.v1.ppt.endpoints.presentation import (
+    on_async_generation_task_failed,
+    run_async_generation_task,
+)
+from services.citation_service import CITATION_SERVICE
+from services.database import async_session_maker, create_db_and_tables
+from services.generation_job_queue import GENERATION_JOB_QUEUE, GenerationWorker
+from services.image_backfill_queue import IMAGE_BACKFILL_QUEUE, ImageBackfillWorker
+from services.redis_service import REDIS_SERVICE
+from services.session_store import SESSION_STORE
+from services.user_config_service import USER_CONFIG_SERVICE
+from utils.get_env import (
+    get_app_data_directory_env,
+    get_generation_queue_mode_env,
+    get_redis_url_env,
+)
 from utils.model_availability import (
     check_llm_and_image_provider_api_or_model_availability,
 )
@@ -15,9 +30,48 @@ async def app_lifespan(_: FastAPI):
     """
     Lifespan context manager for FastAPI application.
     Initializes the application data directory and checks LLM model availability.
+    Loads the user config snapshot and starts its file watcher, starts the expired
+    session and stale citations sweepers, and in local queue mode also runs the generation job worker
+    and the placeholder image backfill worker inside this process.
 
     """
     os.makedirs(get_app_data_directory_env(), exist_ok=True)
     await create_db_and_tables()
     # await check_llm_and_image_provider_api_or_model_availability()
+
+    USER_CONFIG_SERVICE.reload()
+    user_config_watcher = asyncio.create_task(USER_CONFIG_SERVICE.run_watcher())
+    session_sweeper = asyncio.create_task(SESSION_STORE.run_sweeper())
+    # 进程重启或崩溃后遗留的引用标记计算状态超时后标记为失败
+    citations_sweeper = asyncio.create_task(CITATION_SERVICE.run_sweeper())
+
+    if get_generation_queue_mode_env() == "external" and not get_redis_url_env():
+        # 任务在 worker.py 中执行，进度事件无法跨进程推送
+        print(
+            "Warning: GENERATION_QUEUE_MODE=external without REDIS_URL, "
+            "/status/{id}/stream falls back to polling the database every 15s"
+        )
+
+    generation_worker = None
+    image_backfill_worker = None
+    if get_generation_queue_mode_env() == "local":
+        generation_worker = GenerationWorker(
+            GENERATION_JOB_QUEUE,
+            async_session_maker,
+            handler=run_async_generation_task,
+            on_failure=on_async_generation_task_failed,
+        )
+        generation_worker.start()
+        image_backfill_worker = ImageBackfillWorker(IMAGE_BACKFILL_QUEUE)
+        image_backfill_worker.start()
+
     yield
+
+    user_config_watcher.cancel()
+    session_sweeper.cancel()
+    citations_sweeper.cancel()
+    if generation_worker:
+        await generation_worker.stop()
+    if image_backfill_worker:
+        await image_backfill_worker.stop()
+    await REDIS_SERVICE.close()
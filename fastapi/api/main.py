@@ -2,12 +2,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from api.lifespan import app_lifespan
-from api.middlewares.user_config_middleware import UserConfigEnvUpdateMiddleware
 from api.middlewares.auth_middleware import AuthMiddleware
 from api.v1.ppt.router import API_V1_PPT_ROUTER
 from api.v1.webhook.router import API_V1_WEBHOOK_ROUTER
 from api.v1.mock.router import API_V1_MOCK_ROUTER
 from api.v1.auth.router import AUTH_ROUTER
+from api.v1.metrics.router import API_V1_METRICS_ROUTER
+from api.v1.config.router import API_V1_CONFIG_ROUTER
 from utils.error_handling import register_exception_handlers
 import os
 
@@ -26,6 +27,8 @@ app.include_router(API_V1_PPT_ROUTER)
 app.include_router(API_V1_WEBHOOK_ROUTER)
 app.include_router(API_V1_MOCK_ROUTER)
 app.include_router(AUTH_ROUTER)
+app.include_router(API_V1_METRICS_ROUTER)
+app.include_router(API_V1_CONFIG_ROUTER)
 
 # Middlewares
 origins = [
@@ -41,9 +44,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-app.add_middleware(UserConfigEnvUpdateMiddleware)
 app.add_middleware(AuthMiddleware)
 
 # 注册全局异常处理器
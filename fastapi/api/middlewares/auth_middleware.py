@@ -1,7 +1,12 @@
-from fastapi import HTTPException, Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response, JSONResponse
+import hmac
+from typing import Optional
+
+from fastapi import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 from api.v1.auth.router import get_current_user
+from services.llm_rate_limiter import set_llm_rate_limit_user
+from utils.get_env import get_metrics_scrape_token_env
 
 # 不需要认证的路径列表
 PUBLIC_PATHS = [
@@ -11,36 +16,79 @@ PUBLIC_PATHS = [
     "/openapi.json",
     "/static",
     "/api/v1/mock",  # 假设模拟端点是公开的
+    "/api/v1/config/reload",  # 内部调用，由 ADMIN_API_TOKEN 校验
 ]
 
+# 监控指标：已登录用户或携带 METRICS_SCRAPE_TOKEN 的采集器可以访问
+METRICS_PATH = "/api/v1/metrics"
+
 # 需要认证但允许匿名访问的路径列表
 AUTH_OPTIONAL_PATHS = [
     # 可以添加需要认证但允许匿名访问的路径
 ]
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+
+def has_bearer_token(request: Request, token: Optional[str]) -> bool:
+    """
+    请求是否携带了与 token 一致的 Authorization: Bearer 令牌（token 未配置时总是False）
+    """
+    if not token:
+        return False
+    authorization = request.headers.get("authorization", "")
+    scheme, _, credentials = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not credentials:
+        return False
+    return hmac.compare_digest(credentials.encode(), token.encode())
+
+
+class AuthMiddleware:
+    """
+    纯ASGI认证中间件：每个请求只解析一次会话，结果保存在 request.state 上，
+    后续的 get_current_user / get_current_api_key 等依赖直接读取，不再重复查询。
+    不使用 BaseHTTPMiddleware，避免为每个（包括SSE流式）响应额外包装任务和响应流。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
         path = request.url.path
-        
+
         # 检查是否为公开路径
         if any(path.startswith(public_path) for public_path in PUBLIC_PATHS):
-            return await call_next(request)
-        
-        # 获取当前用户
-        current_user = get_current_user(request)
-        
-        # 检查是否为可选认证路径
+            await self.app(scope, receive, send)
+            return
+
+        if path.startswith(METRICS_PATH) and has_bearer_token(
+            request, get_metrics_scrape_token_env()
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # 获取当前用户（同时缓存到 request.state）
+        current_user = await get_current_user(request)
+        # LLM限流按用户轮转排队
+        set_llm_rate_limit_user(current_user)
+
+        # 检查是否为可选认证路径：即使未登录也继续处理请求
         if any(path.startswith(auth_optional_path) for auth_optional_path in AUTH_OPTIONAL_PATHS):
-            # 即使未登录也继续处理请求
-            return await call_next(request)
-        
+            await self.app(scope, receive, send)
+            return
+
         # 对于其他路径，要求用户必须登录
         if not current_user:
             # 所有请求，返回401错误
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=401,
                 content={"detail": "Authentication required"}
             )
-        
+            await response(scope, receive, send)
+            return
+
         # 用户已登录，继续处理请求
-        return await call_next(request)
\ No newline at end of file
+        await self.app(scope, receive, send)
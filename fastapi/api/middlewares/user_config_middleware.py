@@ -1,13 +0,0 @@
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
-
-from utils.get_env import get_can_change_keys_env
-from utils.user_config import update_env_with_user_config
-
-
-class UserConfigEnvUpdateMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # if get_can_change_keys_env() != "false":
-        #     update_env_with_user_config()
-        return await call_next(request)
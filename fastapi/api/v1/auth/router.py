@@ -4,12 +4,13 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from typing import Optional, Dict, Any
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 
 # 导入用户配置相关的模块
-from utils.user_config import get_user_config, update_env_with_user_config
+from services.user_config_service import USER_CONFIG_SERVICE
 
 from utils.get_env import get_jwt_token_secret_key_env
+from services.session_store import SESSION_STORE, SESSION_TTL
 
 # 创建认证路由器
 AUTH_ROUTER = APIRouter(prefix="/auth", tags=["Auth"])
@@ -21,8 +22,8 @@ JWT_ALGORITHM = "HS256"
 # 支持的用户角色
 available_roles = ["payment", "subscription", "card"]
 
-# 模拟用户会话存储
-USER_SESSIONS = {}
+# 当前请求已解析的会话缓存在 request.state 上，区分"未解析"与"无会话"
+_SESSION_NOT_LOADED = object()
 
 @AUTH_ROUTER.get("/")
 async def auth_with_token(
@@ -59,14 +60,12 @@ async def auth_with_token(
         session_id = f"session_{user_id}_{datetime.now().timestamp()}"
         
         # 存储用户会话信息
-        USER_SESSIONS[session_id] = {
+        await SESSION_STORE.create(session_id, {
             "user_id": user_id,
             "user_name": user_name,
             "role": role,
             "api_key": api_key,
-            "created_at": datetime.now(),
-            "expires_at": datetime.now() + timedelta(hours=12)
-        }
+        })
         
         # 设置会话Cookie
         response.set_cookie(
@@ -75,7 +74,7 @@ async def auth_with_token(
             httponly=True,
             secure=False,  # 在生产环境中应设置为True
             samesite="lax",
-            expires=(datetime.now() + timedelta(hours=12)).strftime("%a, %d %b %Y %H:%M:%S GMT")
+            expires=(datetime.now() + SESSION_TTL).strftime("%a, %d %b %Y %H:%M:%S GMT")
         )
         
         # 返回认证成功信息
@@ -91,42 +90,37 @@ async def auth_with_token(
         raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
 
 # 获取当前登录用户的依赖项 - 返回完整用户信息
-def _get_current_user_details(request: Request) -> Optional[Dict[str, Any]]:
+async def _get_current_user_details(request: Request) -> Optional[Dict[str, Any]]:
     """
     获取当前登录用户的完整信息（包含userId, userName, role等）
+    同一请求内只查询一次会话存储，结果缓存在 request.state 上
     """
+    session = getattr(request.state, "user_session", _SESSION_NOT_LOADED)
+    if session is not _SESSION_NOT_LOADED:
+        return session
+
     session_id = request.cookies.get("user_session")
-    
-    if not session_id or session_id not in USER_SESSIONS:
-        return None
-    
-    session = USER_SESSIONS[session_id]
-    
-    # 检查会话是否过期
-    if datetime.now() > session["expires_at"]:
-        del USER_SESSIONS[session_id]
-        return None
-    
-    # 返回用户详细信息（不包含apiKey）
+    session = await SESSION_STORE.get(session_id) if session_id else None
+    request.state.user_session = session
     return session
 
 # 获取当前登录用户的依赖项 - 仅返回用户ID
-def get_current_user(request: Request) -> Optional[str]:
+async def get_current_user(request: Request) -> Optional[str]:
     """
     获取当前登录用户的ID（兼容现有代码）
     """
-    user_details = _get_current_user_details(request)
+    user_details = await _get_current_user_details(request)
     if user_details:
         return str(user_details["user_id"])
     return None
 
 # 基于角色的权限控制依赖项
-def get_user_with_model_access(request: Request) -> Dict[str, Any]:
+async def get_user_with_model_access(request: Request) -> Dict[str, Any]:
     """
     获取当前登录用户信息，并验证是否有权限访问大模型接口
     subscription和card用户可以访问所有接口，payment用户只能访问不需要使用大模型的接口
     """
-    user_details = _get_current_user_details(request)
+    user_details = await _get_current_user_details(request)
     
     if not user_details:
         raise HTTPException(
@@ -144,11 +138,11 @@ def get_user_with_model_access(request: Request) -> Dict[str, Any]:
     return user_details
 
 # 获取当前登录用户的API Key - 用于调用大模型接口
-def get_current_api_key(request: Request) -> Optional[str]:
+async def get_current_api_key(request: Request) -> Optional[str]:
     """
     获取当前登录用户的API Key
     """
-    user_details = _get_current_user_details(request)
+    user_details = await _get_current_user_details(request)
     if user_details:
         return user_details["api_key"]
     return None
@@ -162,7 +156,7 @@ async def get_user_info(current_user: Optional[Dict[str, Any]] = Depends(_get_cu
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     # 这里可以从用户配置或数据库中获取更多用户信息
-    user_config = get_user_config()
+    user_config = USER_CONFIG_SERVICE.snapshot
     
     return {
         "user_id": current_user["user_id"],
@@ -178,8 +172,8 @@ async def logout(request: Request, response: Response):
     """
     session_id = request.cookies.get("user_session")
     
-    if session_id and session_id in USER_SESSIONS:
-        del USER_SESSIONS[session_id]
+    if session_id:
+        await SESSION_STORE.delete(session_id)
     
     # 清除Cookie
     response.delete_cookie("user_session")
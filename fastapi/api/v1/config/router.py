@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, Request
+
+from api.middlewares.auth_middleware import has_bearer_token
+from services.user_config_service import USER_CONFIG_SERVICE
+from utils.get_env import get_admin_api_token_env, get_can_change_keys_env
+
+API_V1_CONFIG_ROUTER = APIRouter(prefix="/api/v1/config", tags=["Config"])
+
+
+@API_V1_CONFIG_ROUTER.post(
+    "/reload",
+    responses={401: {"description": "Unauthorized"}, 403: {"description": "Forbidden"}},
+)
+async def reload_user_config(request: Request):
+    """
+    立即重新加载用户配置文件并替换内存中的配置快照
+    （配置文件变化也会被后台监听任务自动加载，此接口用于无需等待的场景）
+    仅供运维/内部调用：需要携带 Authorization: Bearer <ADMIN_API_TOKEN>，普通登录用户无权调用
+
+    异常:
+        HTTPException 401: 未携带正确的 ADMIN_API_TOKEN（未配置时此接口不可用）
+        HTTPException 403: 当前部署不允许修改配置（CAN_CHANGE_KEYS=false）
+    """
+    if not has_bearer_token(request, get_admin_api_token_env()):
+        raise HTTPException(401, "Unauthorized")
+    if get_can_change_keys_env() == "false":
+        raise HTTPException(403, "Changing config is not allowed")
+
+    snapshot = USER_CONFIG_SERVICE.reload()
+    return {"message": "User config reloaded", "LLM": snapshot.LLM}
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+
+from services.metrics_service import METRICS_SERVICE
+
+API_V1_METRICS_ROUTER = APIRouter(prefix="/api/v1/metrics", tags=["Metrics"])
+
+
+@API_V1_METRICS_ROUTER.get("", response_model=dict)
+async def get_metrics():
+    """
+    获取运行指标（数据库连接池状态及各类计数器），供监控系统采集
+    """
+    return METRICS_SERVICE.snapshot()
@@ -5,7 +5,7 @@ import traceback
 from typing import Any, Dict, Optional
 import uuid
 import dirtyjson
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -18,10 +18,12 @@ from models.sse_response import (
     SSEStatusResponse,
 )
 from services.temp_file_service import TEMP_FILE_SERVICE
-from services.database import get_async_session
+from services.database import async_session_maker, get_async_session
 from services.documents_loader import DocumentsLoader
+from services.generation_run_registry import GENERATION_RUN_REGISTRY
 from utils.llm_calls.generate_presentation_outlines import generate_ppt_outline, generate_ppt_outline_with_web_search,get_search_results_map
 from utils.ppt_utils import get_presentation_title_from_outlines
+from utils.streaming_json import StreamingJsonArrayParser
 from api.v1.auth.router import get_current_user, get_current_api_key
 from utils.web_search import TavilySearchService
 tavily_search_service = TavilySearchService()
@@ -35,11 +37,14 @@ async def stream_outlines(
     id: uuid.UUID,  # 演示文稿唯一标识符
     sql_session: AsyncSession = Depends(get_async_session),  # 数据库会话
     current_user: Optional[str] = Depends(get_current_user),  # 当前登录用户
-    api_key: str = Depends(get_current_api_key)  # API密钥
+    api_key: str = Depends(get_current_api_key),  # API密钥
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),  # 断线重连时最后收到的事件ID
 ):
     """
     流式生成演示文稿大纲的端点
     通过 SSE (Server-Sent Events) 实时返回大纲生成进度和结果
+    生成过程独立于HTTP连接执行，客户端携带 Last-Event-ID 重连时回放错过的事件；
+    同一演示文稿同一时间只生成一次，重复请求（包括其他worker上的）连接到正在进行的生成
     """
     # 从数据库获取演示文稿信息
     presentation = await sql_session.get(PresentationModel, id)
@@ -57,6 +62,26 @@ async def stream_outlines(
 
     # 内部异步生成器函数，用于流式返回结果
     async def inner():
+        # 生成过程可能在请求结束后继续执行，使用独立的数据库会话
+        async with async_session_maker() as run_session:
+            async for message in generate_events(run_session):
+                yield message
+
+    async def remote_result():
+        """同一演示文稿正在其他worker上生成大纲时，在其结束后返回保存的结果"""
+        async with async_session_maker() as run_session:
+            current = await run_session.get(PresentationModel, id)
+        if not current or not current.outlines:
+            yield SSEErrorResponse(
+                detail="Failed to generate presentation outlines. Please try again."
+            ).to_string()
+            return
+        yield SSECompleteResponse(
+            key="presentation", value=current.model_dump(mode="json")
+        ).to_string()
+
+    async def generate_events(sql_session: AsyncSession):
+        presentation = await sql_session.get(PresentationModel, id)
         # 发送初始状态消息
         yield SSEStatusResponse(
             status="Generating presentation outlines..."
@@ -72,6 +97,8 @@ async def stream_outlines(
                 additional_context = "\n\n".join(documents)
 
         presentation_outlines_text = ""
+        # 增量解析大纲，每页大纲闭合后立即发送 slide_outline 事件
+        outlines_parser = StreamingJsonArrayParser("slides")
 
         # 计算需要生成的幻灯片数量
         n_slides_to_generate = presentation.n_slides
@@ -116,18 +143,32 @@ async def stream_outlines(
             # 积累生成的大纲文本
             presentation_outlines_text += chunk
 
+            for index, slide_outline in outlines_parser.feed(chunk):
+                if index >= n_slides_to_generate:
+                    continue
+                yield SSEResponse(
+                    event="response",
+                    data=json.dumps(
+                        {"type": "slide_outline", "index": index, "slide": slide_outline}
+                    ),
+                ).to_string()
+
         try:
             # 尝试将生成的文本解析为JSON格式
             presentation_outlines_json = dict(
                 dirtyjson.loads(presentation_outlines_text)
             )
         except Exception as e:
-            # 处理JSON解析错误
-            traceback.print_exc()
-            yield SSEErrorResponse(
-                detail=f"Failed to generate presentation outlines. Please try again. {str(e)}",
-            ).to_string()
-            return
+            if outlines_parser.items:
+                # 完整文本无法解析（例如输出被截断）时，使用已完整解析的大纲
+                presentation_outlines_json = {"slides": outlines_parser.items}
+            else:
+                # 处理JSON解析错误
+                traceback.print_exc()
+                yield SSEErrorResponse(
+                    detail=f"Failed to generate presentation outlines. Please try again. {str(e)}",
+                ).to_string()
+                return
 
         # 将JSON数据转换为PresentationOutlineModel对象
         presentation_outlines = PresentationOutlineModel(**presentation_outlines_json)
@@ -151,4 +192,9 @@ async def stream_outlines(
         ).to_string()
 
     # 返回流式响应，使用text/event-stream媒体类型
-    return StreamingResponse(inner(), media_type="text/event-stream")
+    return StreamingResponse(
+        GENERATION_RUN_REGISTRY.attach(
+            ("outlines", id), inner, last_event_id, remote_result
+        ),
+        media_type="text/event-stream",
+    )
@@ -1,13 +1,14 @@
 import asyncio
-from datetime import datetime
+import copy
 import json
 import math
 import os
 import random
+import time
 import traceback
-from typing import Annotated, Any, Dict, List, Literal, Optional, Tuple, Callable, Union
+from typing import Annotated, Any, Dict, Hashable, List, Literal, Optional, Tuple, Callable, Union
 import dirtyjson
-from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, Path, Request, Query, Form, UploadFile, File, status, Response
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Path, Request, Query, Form, UploadFile, File, status, Response
 from fastapi.responses import StreamingResponse, JSONResponse
 from sqlalchemy import delete, insert, func
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -36,15 +37,48 @@ from services.documents_loader import DocumentsLoader
 from services.webhook_service import WebhookService
 from utils.get_layout_by_name import get_layout_by_name
 from services.image_generation_service import ImageGenerationService
+from utils.deadline import (
+    EXPORT_RESERVE_SECONDS,
+    RequestDeadlineExceeded,
+    get_generation_deadline_seconds,
+    get_request_deadline,
+    get_request_deadline_remaining,
+    request_deadline_scope,
+    set_request_deadline,
+)
+from utils.credential_crypto import decrypt_credential, encrypt_credential
 from utils.dict_utils import deep_update
 from utils.export_utils import export_presentation
 from utils.llm_calls.generate_presentation_outlines import generate_ppt_outline, get_search_results_map
 from models.sql.slide import SlideModel
 from models.sse_response import SSECompleteResponse, SSEErrorResponse, SSEResponse
 
-from services.database import get_async_session
+from services.database import async_session_maker, get_async_session
 from services.temp_file_service import TEMP_FILE_SERVICE
 from services.concurrent_service import CONCURRENT_SERVICE
+from services.image_backfill_queue import IMAGE_BACKFILL_QUEUE
+from services.generation_run_registry import GENERATION_RUN_REGISTRY
+from services.generation_job_queue import (
+    GENERATION_JOB_QUEUE,
+    TERMINAL_TASK_STATUSES,
+    build_generation_task_event,
+)
+from services.task_event_bus import (
+    TASK_EVENT_BUS,
+    get_citations_topic,
+    get_generation_task_topic,
+    get_presentation_assets_topic,
+)
+from services.citation_service import (
+    CITATION_SERVICE,
+    TERMINAL_CITATIONS_STATUSES,
+    build_citations_event,
+)
+from services.llm_rate_limiter import set_llm_rate_limit_user
+from services.llm_response_cache import (
+    LLM_RESPONSE_CACHE,
+    start_llm_response_cache_tracking,
+)
 from models.sql.presentation import PresentationModel
 from services.pptx_presentation_creator import PptxPresentationCreator
 from models.sql.async_presentation_generation_status import (
@@ -54,12 +88,21 @@ from api.v1.auth.router import get_current_user, get_user_with_model_access, get
 from utils.asset_directory_utils import get_exports_directory, get_images_directory
 from utils.llm_calls.generate_presentation_structure import (
     generate_presentation_structure,
+    select_slide_layout_index,
 )
 from utils.llm_calls.generate_slide_content import (
     get_slide_content_from_type_and_outline,
 )
+from utils.pagination import decode_created_at_cursor, encode_created_at_cursor
+from utils.slide_content_batcher import SlideContentBatcher
+from utils.slide_persistence import save_presentation_slides
+from utils.streaming_json import StreamingJsonArrayParser
+from utils.streaming_pipeline import PipelineStage, StreamingPipeline
 from utils.ppt_utils import (
     get_presentation_title_from_outlines,
+    get_slide_position_with_toc,
+    get_table_of_contents_outlines,
+    get_toc_slide_position,
     select_toc_or_list_slide_layout_index,
 )
 from utils.process_slides import (
@@ -67,7 +110,6 @@ from utils.process_slides import (
     process_slide_and_fetch_assets,
 )
 import uuid
-from utils.citations import citations_instance
 import logging
 logging.basicConfig(level=logging.DEBUG)
 
@@ -77,6 +119,13 @@ PRESENTATION_ROUTER = APIRouter(prefix="/presentation", tags=["Presentation"])
 
 @PRESENTATION_ROUTER.get("/all", response_model=List[PresentationWithSlides])
 async def get_all_presentations(
+    response: Response,
+    limit: Optional[int] = Query(
+        None, ge=1, le=200, description="Page size, returns all presentations if omitted"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="Cursor returned in the X-Next-Cursor header of the previous page"
+    ),
     sql_session: AsyncSession = Depends(get_async_session),
     current_user: Optional[str] = Depends(get_current_user)
 ):
@@ -84,34 +133,69 @@ async def get_all_presentations(
     获取所有演示文稿（每个演示文稿只返回第一张幻灯片）
     
     参数:
+        response: 响应对象，用于返回下一页游标
+        limit: 每页数量（可选），不传时返回全部演示文稿
+        cursor: 上一页响应头 X-Next-Cursor 中返回的游标（可选）
         sql_session: 异步数据库会话
         current_user: 当前登录用户ID（可选）
     
     返回:
-        演示文稿列表，每个包含基本信息和第一张幻灯片
+        演示文稿列表，每个包含基本信息和第一张幻灯片。
+        只查询列表需要的列，不加载 outlines、layout、structure 等大JSON字段。
+        分页时按 (created_at, id) 倒序的键集分页，还有下一页时通过 X-Next-Cursor 响应头返回游标
     """
-    presentations_with_slides = []
-
     # 构建查询，获取当前用户名下所有演示文稿及其第一张幻灯片
     query = (
-        select(PresentationModel, SlideModel)
+        select(
+            PresentationModel.id,
+            PresentationModel.content,
+            PresentationModel.n_slides,
+            PresentationModel.language,
+            PresentationModel.title,
+            PresentationModel.created_at,
+            PresentationModel.updated_at,
+            PresentationModel.tone,
+            PresentationModel.verbosity,
+            SlideModel,
+        )
         .join(
             SlideModel,
             (SlideModel.presentation == PresentationModel.id) & (SlideModel.index == 0),
         )
         .where(PresentationModel.user_id == current_user)
-        .order_by(PresentationModel.created_at.desc())
+        .order_by(PresentationModel.created_at.desc(), PresentationModel.id.desc())
     )
 
+    if cursor:
+        cursor_created_at, cursor_id = decode_created_at_cursor(cursor)
+        query = query.where(
+            (PresentationModel.created_at < cursor_created_at)
+            | (
+                (PresentationModel.created_at == cursor_created_at)
+                & (PresentationModel.id < cursor_id)
+            )
+        )
+
+    if limit:
+        # 多查一条用于判断是否还有下一页
+        query = query.limit(limit + 1)
+
     results = await sql_session.execute(query)
     rows = results.all()
-    presentations_with_slides = [
-        PresentationWithSlides(
-            **presentation.model_dump(),
-            slides=[first_slide],
+
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_created_at_cursor(
+            rows[-1].created_at, rows[-1].id
+        )
+
+    presentations_with_slides = []
+    for row in rows:
+        presentation_fields = row._asdict()
+        first_slide = presentation_fields.pop("SlideModel")
+        presentations_with_slides.append(
+            PresentationWithSlides(**presentation_fields, slides=[first_slide])
         )
-        for presentation, first_slide in rows
-    ]
     return presentations_with_slides
 
 
@@ -383,62 +467,26 @@ async def prepare_presentation(
 
     return presentation
 
-async def add_reference_markers(presentation: PresentationModel, slides,api_key: str):
-    tavily_search_results_json = presentation.get_tavily_search_results_json()
-    search_content_map = tavily_search_results_json
-    source_embeddings,source_ids,source_contents,source_map = await citations_instance.get_source_embeddings_map(search_content_map,api_key)
-    # source_embeddings=[]  
-    reference_markers = []
-    slide_index=1
-    for  slide in slides:
-        slide_content = slide.content
-        slide_title = slide_content.get("title", "")  
-        reference_marker_index = await get_reference_marker(slide_title, source_embeddings,api_key)
-        if reference_marker_index != 0:
-            reference_markers.append({"slide_index":slide_index,"content":slide_title,"reference_marker_index":reference_marker_index})
-        slide_description = slide_content.get("bulletPoints") if "bulletPoints" in slide_content else slide_content.get("description", "")
-        if slide_description:
-            reference_marker_index = await get_reference_marker(str(slide_description), source_embeddings,api_key)
-            if reference_marker_index != 0:
-                reference_markers.append({"slide_index":slide_index,"content":str(slide_description),"reference_marker_index":reference_marker_index})
-
-        bulletPoints = slide_description if isinstance(slide_description, list) else slide_content.get("bulletPoints", [])
-        for bulletPoint in bulletPoints:
-            bulletPoint_title = bulletPoint.get("title", "")
-            reference_marker_index = await get_reference_marker(bulletPoint_title, source_embeddings,api_key)
-            if reference_marker_index!=0:
-                reference_markers.append({"slide_index":slide_index,"content":bulletPoint_title,"reference_marker_index":reference_marker_index})
-            bulletPoint_description = bulletPoint.get("description", "")
-            reference_marker_index = await get_reference_marker(bulletPoint_description, source_embeddings,api_key)
-            if reference_marker_index!=0:
-                reference_markers.append({"slide_index":slide_index,"content":bulletPoint_description,"reference_marker_index":reference_marker_index})
-        slide_index+=1
-    return reference_markers
-
-async def get_reference_marker(content: str,  source_embeddings:[],api_key: str):
-    reference_marker_index =0
-    if content:
-        similar_indexes, cosine_similarities, distances = await citations_instance.calculate_sentence_similarity(content, source_embeddings,api_key)
-        similarity_score = float(cosine_similarities[similar_indexes.index(similar_indexes[0])])
-        if similarity_score > 0.0001:
-                reference_marker_index=similar_indexes[0]
-        # reference_marker_index=random.randint(1,5)
-    return reference_marker_index
-
 @PRESENTATION_ROUTER.get("/stream/{id}", response_model=PresentationWithSlides)
 async def stream_presentation(
     id: uuid.UUID,
     sql_session: AsyncSession = Depends(get_async_session),
     current_user: str = Depends(get_current_user),
     api_key: str = Depends(get_current_api_key),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
 ):
     """
     流式返回演示文稿生成过程
+
+    生成过程独立于HTTP连接执行，客户端断开后继续生成并保存结果；
+    携带 Last-Event-ID 重连时回放错过的事件。
+    同一演示文稿同一时间只生成一次，重复请求（包括其他worker上的）连接到正在进行的生成
     
     参数:
         id: 演示文稿唯一标识符
         sql_session: 异步数据库会话
         current_user: 当前登录用户ID
+        last_event_id: 断线重连时最后收到的事件ID
     
     返回:
         流式响应，包含演示文稿生成过程和最终结果
@@ -477,97 +525,404 @@ async def stream_presentation(
     )
 
     async def inner():
+        # 生成过程可能在请求结束后继续执行，使用独立的数据库会话
+        async with async_session_maker() as run_session:
+            async for message in generate_events(run_session):
+                yield message
+
+    async def remote_result():
+        """同一演示文稿正在其他worker上生成时，在其结束后返回保存的结果"""
+        async with async_session_maker() as run_session:
+            current = await run_session.get(PresentationModel, id)
+            slides = (
+                await run_session.scalars(
+                    select(SlideModel)
+                    .where(SlideModel.presentation == id)
+                    .order_by(SlideModel.index)
+                )
+            ).all()
+        if not slides:
+            yield SSEErrorResponse(
+                detail="Presentation generation did not complete. Please try again."
+            ).to_string()
+            return
+        response = PresentationWithSlides(
+            **current.model_dump(),
+            slides=slides,
+            webSearchResources=current.get_tavily_search_results_json(),
+        )
+        yield SSECompleteResponse(
+            key="presentation", value=response.model_dump(mode="json")
+        ).to_string()
+
+    async def generate_events(sql_session: AsyncSession):
+        presentation = await sql_session.get(PresentationModel, id)
         structure = presentation.get_structure()
         layout = presentation.get_layout()
         outline = presentation.get_presentation_outline()
-
-        async_assets_generation_tasks = []
+        # 截止时间到达时停止生成后续幻灯片，未完成的资产保留占位并标记为待后台补全；
+        # 超时不能通过取消当前任务实现（会跨越 yield），改为在等待事件时检查剩余时间
+        set_request_deadline(get_generation_deadline_seconds())
+
+        # 每张幻灯片的内容生成后立即开始获取资产，与后续幻灯片的内容生成并行，
+        # 每个图片/图标完成后单独发送 asset 事件；
+        # 幻灯片内容逐token生成，内容每有变化即发送 slide_patch 事件
+        async_assets_generation_tasks: List[asyncio.Task] = []
+        slide_events: asyncio.Queue = asyncio.Queue()
+
+        def slide_event_to_string(event: dict) -> str:
+            return SSEResponse(event="response", data=json.dumps(event)).to_string()
+
+        async def stream_slide_events_until(task: asyncio.Future):
+            """等待任务完成，期间转发幻灯片内容补丁和已完成的资产事件，截止时间到达时抛出 RequestDeadlineExceeded"""
+            while not task.done():
+                remaining = get_request_deadline_remaining()
+                if remaining == 0:
+                    raise RequestDeadlineExceeded()
+                event_getter = asyncio.ensure_future(slide_events.get())
+                await asyncio.wait(
+                    {task, event_getter},
+                    timeout=remaining,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if event_getter.done():
+                    yield slide_event_to_string(event_getter.result())
+                else:
+                    event_getter.cancel()
+            while not slide_events.empty():
+                yield slide_event_to_string(slide_events.get_nowait())
 
         slides: List[SlideModel] = []
+        generated_assets = []
+        slides_chunk_closed = False
+        needs_fill_in = False
+        content_task: Optional[asyncio.Future] = None
+        content_tasks: List[asyncio.Future] = []
+        # 配置 SLIDE_CONTENT_BATCH_SIZE 时所有幻灯片一次提交，按批合并为LLM请求，按顺序输出
+        slide_content_batcher = SlideContentBatcher.from_env(
+            presentation.language,
+            api_key,
+            model=presentation.presentation_model,
+            tone=presentation.tone,
+            verbosity=presentation.verbosity,
+            instructions=presentation.instructions,
+        )
+        if slide_content_batcher:
+            content_tasks = [
+                asyncio.ensure_future(
+                    slide_content_batcher.generate(
+                        layout.slides[slide_layout_index], outline.slides[i]
+                    )
+                )
+                for i, slide_layout_index in enumerate(structure.slides)
+            ]
         yield SSEResponse(
             event="response",
             data=json.dumps({"type": "chunk", "chunk": '{ "slides": [ '}),
         ).to_string()
-        for i, slide_layout_index in enumerate(structure.slides):
-            slide_layout = layout.slides[slide_layout_index]
-
+        try:
             try:
-                slide_content = await get_slide_content_from_type_and_outline(
-                    slide_layout=slide_layout,
-                    outline=outline.slides[i],
-                    language=presentation.language,
-                    api_key=api_key,
-                    model=presentation.presentation_model,
-                    tone=presentation.tone,
-                    verbosity=presentation.verbosity,
-                    instructions=presentation.instructions,
-                )
-            except HTTPException as e:
-                yield SSEErrorResponse(detail=e.detail).to_string()
-                return
+                for i, slide_layout_index in enumerate(structure.slides):
+                    slide_layout = layout.slides[slide_layout_index]
 
-            slide = SlideModel(
-                presentation=id,
-                layout_group=layout.name,
-                layout=slide_layout.id,
-                index=i,
-                speaker_note=slide_content.get("__speaker_note__", ""),
-                content=slide_content,
-            )
-            slides.append(slide)
+                    if slide_content_batcher:
+                        content_task = content_tasks[i]
+                    else:
+                        content_task = asyncio.ensure_future(
+                            get_slide_content_from_type_and_outline(
+                                slide_layout=slide_layout,
+                                outline=outline.slides[i],
+                                language=presentation.language,
+                                api_key=api_key,
+                                model=presentation.presentation_model,
+                                tone=presentation.tone,
+                                verbosity=presentation.verbosity,
+                                instructions=presentation.instructions,
+                                on_patch=lambda patches, index=i: slide_events.put_nowait(
+                                    {"type": "slide_patch", "index": index, "patches": patches}
+                                ),
+                            )
+                        )
+                    async for message in stream_slide_events_until(content_task):
+                        yield message
+                    try:
+                        slide_content = content_task.result()
+                    except HTTPException as e:
+                        yield SSEErrorResponse(detail=e.detail).to_string()
+                        return
+
+                    slide = SlideModel(
+                        presentation=id,
+                        layout_group=layout.name,
+                        layout=slide_layout.id,
+                        index=i,
+                        speaker_note=slide_content.get("__speaker_note__", ""),
+                        content=slide_content,
+                    )
+                    slides.append(slide)
+
+                    # This will mutate slide and add placeholder assets
+                    process_slide_add_placeholder_assets(slide)
+
+                    yield SSEResponse(
+                        event="response",
+                        data=json.dumps({"type": "chunk", "chunk": slide.model_dump_json()}),
+                    ).to_string()
+
+                    # This will mutate slide
+                    async_assets_generation_tasks.append(
+                        asyncio.create_task(
+                            process_slide_and_fetch_assets(
+                                image_generation_service,
+                                slide,
+                                on_asset=lambda event, index=i: slide_events.put_nowait(
+                                    {"type": "asset", "slide_index": index, **event}
+                                ),
+                            )
+                        )
+                    )
 
-            # This will mutate slide and add placeholder assets
-            process_slide_add_placeholder_assets(slide)
+                yield SSEResponse(
+                    event="response",
+                    data=json.dumps({"type": "chunk", "chunk": " ] }"}),
+                ).to_string()
+                slides_chunk_closed = True
 
-            # This will mutate slide
-            async_assets_generation_tasks.append(
-                process_slide_and_fetch_assets(image_generation_service, slide)
+                # 等待剩余的资产生成任务完成
+                all_assets_task = asyncio.ensure_future(
+                    asyncio.gather(*async_assets_generation_tasks)
+                )
+                async for message in stream_slide_events_until(all_assets_task):
+                    yield message
+                for assets_list in all_assets_task.result():
+                    generated_assets.extend(assets_list)
+            except RequestDeadlineExceeded:
+                # 已完成的资产照常保存，未完成的保留占位
+                for task in async_assets_generation_tasks:
+                    if not task.done():
+                        needs_fill_in = True
+                    elif not task.cancelled() and task.exception() is None:
+                        generated_assets.extend(task.result())
+                if not slides:
+                    yield SSEErrorResponse(
+                        detail="Presentation generation timed out"
+                    ).to_string()
+                    return
+                if not slides_chunk_closed:
+                    yield SSEResponse(
+                        event="response",
+                        data=json.dumps({"type": "chunk", "chunk": " ] }"}),
+                    ).to_string()
+                yield slide_event_to_string(
+                    {
+                        "type": "deadline_exceeded",
+                        "completed_slides": len(slides),
+                        "needs_fill_in": needs_fill_in,
+                    }
+                )
+        finally:
+            # 出错或客户端断开时取消仍在执行的任务
+            for task in [content_task, *content_tasks, *async_assets_generation_tasks]:
+                if task is not None and not task.done():
+                    task.cancel()
+            if slide_content_batcher:
+                slide_content_batcher.cancel()
+
+        # 按差异保存幻灯片：更新已有的、插入新增的、删除多余的
+        # 引用标记在后台计算，旧的标记与新幻灯片不对应，先清空
+        sql_session.add(presentation)
+        presentation.set_reference_markers(None)
+        presentation.citations_status = "pending"
+        if len(slides) < len(structure.slides):
+            # 截止时间到达时只保留已生成的幻灯片
+            structure.slides = structure.slides[: len(slides)]
+            outline.slides = outline.slides[: len(slides)]
+            presentation.set_structure(structure)
+            presentation.outlines = outline.model_dump()
+        await save_presentation_slides(sql_session, id, slides)
+        sql_session.add_all(generated_assets)
+        # 仍为占位图的图片（生成失败或超过截止时间）由后台重试补全
+        presentation.needs_fill_in = (
+            await IMAGE_BACKFILL_QUEUE.enqueue_slides(
+                sql_session, id, slides, api_key, presentation.image_model
             )
-
-            yield SSEResponse(
-                event="response",
-                data=json.dumps({"type": "chunk", "chunk": slide.model_dump_json()}),
-            ).to_string()
-
-        yield SSEResponse(
-            event="response",
-            data=json.dumps({"type": "chunk", "chunk": " ] }"}),
-        ).to_string()
-
-        # 等待所有资产生成任务完成
-        generated_assets_lists = await asyncio.gather(*async_assets_generation_tasks)
-        generated_assets = []
-        for assets_list in generated_assets_lists:
-            generated_assets.extend(assets_list)
-
-        # 删除旧幻灯片，生成新的
-        await sql_session.execute(
-            delete(SlideModel).where(SlideModel.presentation == id)
+            > 0
         )
         await sql_session.commit()
 
-        sql_session.add(presentation)
-        sql_session.add_all(slides)
-        sql_session.add_all(generated_assets)
-        await sql_session.commit()
-        
-        reference_markers = await add_reference_markers(presentation, slides,api_key)
-        presentation.set_reference_markers(reference_markers)
-        await sql_session.commit()
-        logging.info(f"Reference markers: {reference_markers}")
+        CITATION_SERVICE.schedule(id, api_key)
+
         tavily_search_results_json = presentation.get_tavily_search_results_json()
         response = PresentationWithSlides(
-            **presentation.model_dump(exclude={"reference_markers"}),
+            **presentation.model_dump(),
             slides=slides,
-            reference_markers=reference_markers,
             webSearchResources=tavily_search_results_json,
         )
 
+        # 幻灯片和资产保存后立即完成，客户端通过 /{id}/citations 获取引用标记
         yield SSECompleteResponse(
             key="presentation",
             value=response.model_dump(mode="json"),
         ).to_string()
 
+    return StreamingResponse(
+        GENERATION_RUN_REGISTRY.attach(
+            ("presentation", id), inner, last_event_id, remote_result
+        ),
+        media_type="text/event-stream",
+    )
+
+
+async def get_accessible_presentation(
+    id: uuid.UUID, sql_session: AsyncSession, current_user: Optional[str]
+) -> PresentationModel:
+    presentation = await sql_session.get(PresentationModel, id)
+    if not presentation:
+        raise HTTPException(404, "Presentation not found")
+
+    # 检查用户权限
+    if current_user and presentation.user_id and presentation.user_id != current_user:
+        raise HTTPException(403, "You don't have permission to access this presentation")
+    return presentation
+
+
+@PRESENTATION_ROUTER.get("/{id}/citations")
+async def get_presentation_citations(
+    id: uuid.UUID,
+    sql_session: AsyncSession = Depends(get_async_session),
+    current_user: Optional[str] = Depends(get_current_user),
+):
+    """
+    查询演示文稿引用标记的后台计算状态
+
+    参数:
+        id: 演示文稿唯一标识符
+        sql_session: 异步数据库会话
+        current_user: 当前登录用户ID
+
+    返回:
+        {"type": "citations", "presentation_id", "status"}，
+        status 为 completed 时包含 reference_markers
+
+    异常:
+        HTTPException 404: 演示文稿不存在
+        HTTPException 403: 无权限访问该演示文稿
+    """
+    presentation = await get_accessible_presentation(id, sql_session, current_user)
+    return build_citations_event(presentation)
+
+
+@PRESENTATION_ROUTER.get("/{id}/citations/stream")
+async def stream_presentation_citations(
+    id: uuid.UUID,
+    sql_session: AsyncSession = Depends(get_async_session),
+    current_user: Optional[str] = Depends(get_current_user),
+):
+    """
+    以SSE流推送演示文稿引用标记的计算状态，替代轮询 /{id}/citations
+
+    参数:
+        id: 演示文稿唯一标识符
+        sql_session: 异步数据库会话
+        current_user: 当前登录用户ID
+
+    返回:
+        流式响应，推送 citations 事件直到状态为 completed 或 error；
+        超过计算时长上限仍未结束时（计算所在的进程已退出）标记为 error 并结束
+
+    异常:
+        HTTPException 404: 演示文稿不存在
+        HTTPException 403: 无权限访问该演示文稿
+    """
+    presentation = await get_accessible_presentation(id, sql_session, current_user)
+    initial_event = build_citations_event(presentation)
+
+    async def inner():
+        yield SSEResponse(event="response", data=json.dumps(initial_event)).to_string()
+        if initial_event["status"] in TERMINAL_CITATIONS_STATUSES or not initial_event["status"]:
+            return
+
+        stream_deadline = time.monotonic() + CITATION_SERVICE.TIMEOUT_SECONDS
+        async with TASK_EVENT_BUS.subscribe(get_citations_topic(id)) as subscription:
+            while True:
+                event = await subscription.get(timeout=15)
+                if event is None:
+                    # 订阅前已完成的计算不会再发布事件，低频回查数据库兜底
+                    async with async_session_maker() as session:
+                        current = await session.get(PresentationModel, id)
+                        if current is None:
+                            return
+                        if (
+                            current.citations_status not in TERMINAL_CITATIONS_STATUSES
+                            and time.monotonic() >= stream_deadline
+                        ):
+                            await CITATION_SERVICE.fail_stale(id)
+                            await session.refresh(current)
+                            yield SSEResponse(
+                                event="response",
+                                data=json.dumps(build_citations_event(current)),
+                            ).to_string()
+                            return
+                    if current.citations_status in TERMINAL_CITATIONS_STATUSES:
+                        event = build_citations_event(current)
+                    else:
+                        yield ": keepalive\n\n"
+                        continue
+
+                yield SSEResponse(event="response", data=json.dumps(event)).to_string()
+                if event["status"] in TERMINAL_CITATIONS_STATUSES:
+                    break
+
+    return StreamingResponse(inner(), media_type="text/event-stream")
+
+
+@PRESENTATION_ROUTER.get("/{id}/assets/stream")
+async def stream_presentation_assets(
+    id: uuid.UUID,
+    sql_session: AsyncSession = Depends(get_async_session),
+    current_user: Optional[str] = Depends(get_current_user),
+):
+    """
+    以SSE流推送后台补全的图片，供打开该演示文稿的编辑器替换占位图
+
+    参数:
+        id: 演示文稿唯一标识符
+        sql_session: 异步数据库会话
+        current_user: 当前登录用户ID
+
+    返回:
+        流式响应，每张图片补全后推送 asset 事件（slide_id、path、url），
+        全部补全任务结束后推送 fill_in_completed 事件并结束
+
+    异常:
+        HTTPException 404: 演示文稿不存在
+        HTTPException 403: 无权限访问该演示文稿
+    """
+    presentation = await get_accessible_presentation(id, sql_session, current_user)
+    completed_event = {"type": "fill_in_completed", "presentation_id": str(id)}
+
+    async def inner():
+        if not presentation.needs_fill_in:
+            yield SSEResponse(event="response", data=json.dumps(completed_event)).to_string()
+            return
+
+        async with TASK_EVENT_BUS.subscribe(get_presentation_assets_topic(id)) as subscription:
+            while True:
+                event = await subscription.get(timeout=15)
+                if event is None:
+                    # 订阅前已结束的补全不会再发布事件，低频回查数据库兜底
+                    async with async_session_maker() as session:
+                        current = await session.get(PresentationModel, id)
+                    if current and not current.needs_fill_in:
+                        event = completed_event
+                    else:
+                        yield ": keepalive\n\n"
+                        continue
+
+                yield SSEResponse(event="response", data=json.dumps(event)).to_string()
+                if event["type"] == "fill_in_completed":
+                    break
+
     return StreamingResponse(inner(), media_type="text/event-stream")
 
 
@@ -623,10 +978,7 @@ async def update_presentation(
             slide.presentation = uuid.UUID(slide.presentation)
             slide.id = uuid.UUID(slide.id)
 
-        await sql_session.execute(
-            delete(SlideModel).where(SlideModel.presentation == presentation.id)
-        )
-        sql_session.add_all(slides)
+        await save_presentation_slides(sql_session, presentation.id, slides)
 
     await sql_session.commit()
 
@@ -855,211 +1207,134 @@ async def generate_presentation_handler(
         此函数负责处理演示文稿的生成过程，包括加载文档、生成大纲、准备演示文稿等
     """
     try:
+        llm_cache_stats = start_llm_response_cache_tracking()
+        set_llm_rate_limit_user(current_user)
+        # 整个生成过程的截止时间，通过contextvars传递给流水线中的各个任务，
+        # 大纲、结构、内容和资产阶段需为导出预留时间
+        set_request_deadline(get_generation_deadline_seconds())
+        content_deadline = get_request_deadline(EXPORT_RESERVE_SECONDS)
+        deadline_exceeded = False
+        needs_fill_in = False
         using_slides_markdown = False
 
         if request.slides_markdown:
             using_slides_markdown = True
             request.n_slides = len(request.slides_markdown)
 
-        if not using_slides_markdown:
-            additional_context = ""
-
-            # Updating async status
-            if async_status:
-                async_status.message = "Generating presentation outlines"
-                async_status.updated_at = datetime.now()
-                sql_session.add(async_status)
-                await sql_session.commit()
-
-            if request.files:
-                documents_loader = DocumentsLoader(file_paths=request.files)
-                await documents_loader.load_documents()
-                documents = documents_loader.documents
-                if documents:
-                    additional_context = "\n\n".join(documents)
-
-            # Finding number of slides to generate by considering table of contents
-            n_slides_to_generate = request.n_slides
-            if request.include_table_of_contents:
-                needed_toc_count = math.ceil(
-                    (
-                        (request.n_slides - 1)
-                        if request.include_title_slide
-                        else request.n_slides
-                    )
-                    / 10
-                )
-                n_slides_to_generate -= math.ceil(
-                    (request.n_slides - needed_toc_count) / 10
-                )
-
-            presentation_outlines_text = ""
-            async for chunk in generate_ppt_outline(
-                request.content,
-                n_slides_to_generate,
-                '', # api key
-                request.language,
-                additional_context,
-                request.tone.value,
-                request.verbosity.value,
-                request.instructions,
-                request.include_title_slide,
-                request.web_search,
-            ):
-
-                if isinstance(chunk, HTTPException):
-                    raise chunk
-
-                presentation_outlines_text += chunk
-
-            try:
-                presentation_outlines_json = dict(
-                    dirtyjson.loads(presentation_outlines_text)
-                )
-            except Exception as e:
-                traceback.print_exc()
-                raise HTTPException(
-                    status_code=400,
-                    detail="Failed to generate presentation outlines. Please try again.",
+        # Finding number of slides to generate by considering table of contents
+        n_slides_to_generate = request.n_slides
+        if request.include_table_of_contents and not using_slides_markdown:
+            needed_toc_count = math.ceil(
+                (
+                    (request.n_slides - 1)
+                    if request.include_title_slide
+                    else request.n_slides
                 )
-            presentation_outlines = PresentationOutlineModel(
-                **presentation_outlines_json
+                / 10
             )
-            total_outlines = n_slides_to_generate
-
-        else:
-            # Setting outlines to slides markdown
-            presentation_outlines = PresentationOutlineModel(
-                slides=[
-                    SlideOutlineModel(content=slide)
-                    for slide in request.slides_markdown
-                ]
+            n_slides_to_generate -= math.ceil(
+                (request.n_slides - needed_toc_count) / 10
             )
-            total_outlines = len(request.slides_markdown)
 
-        # Updating async status
-        if async_status:
-            async_status.message = f"Selecting layout for each slide"
-            async_status.updated_at = datetime.now()
-            sql_session.add(async_status)
-            await sql_session.commit()
-
-        print("-" * 40)
-        print(f"Generated {total_outlines} outlines for the presentation")
-
-        # Parse Layouts
-        layout_model = await get_layout_by_name(request.template)
-        total_slide_layouts = len(layout_model.slides)
-
-        # Generate Structure
-        if layout_model.ordered:
-            presentation_structure = layout_model.to_presentation_structure()
-        else:
-            presentation_structure: PresentationStructureModel = (
-                await generate_presentation_structure(
-                    presentation_outlines=presentation_outlines,
-                    presentation_layout=layout_model,
-                    instructions=request.instructions,
-                    api_key="",
-                    model={"name": "gpt-4.1"},
-                    using_slides_markdown=using_slides_markdown,
+        # 模板布局与大纲生成同时加载，目录页的数量和位置在加载后即可确定
+        async def load_layout():
+            layout_model = await get_layout_by_name(request.template)
+            toc_slide_layout_index = -1
+            if request.include_table_of_contents and not using_slides_markdown:
+                toc_slide_layout_index = select_toc_or_list_slide_layout_index(
+                    layout_model
                 )
+            n_toc_slides = (
+                request.n_slides - n_slides_to_generate
+                if toc_slide_layout_index != -1
+                else 0
             )
+            return layout_model, toc_slide_layout_index, n_toc_slides
 
-        presentation_structure.slides = presentation_structure.slides[:total_outlines]
-        for index in range(total_outlines):
-            random_slide_index = random.randint(0, total_slide_layouts - 1)
-            if index >= total_outlines:
-                presentation_structure.slides.append(random_slide_index)
-                continue
-            if presentation_structure.slides[index] >= total_slide_layouts:
-                presentation_structure.slides[index] = random_slide_index
-
-        # Injecting table of contents to the presentation structure and outlines
-        if request.include_table_of_contents and not using_slides_markdown:
-            n_toc_slides = request.n_slides - total_outlines
-            toc_slide_layout_index = select_toc_or_list_slide_layout_index(layout_model)
-            if toc_slide_layout_index != -1:
-                outline_index = 1 if request.include_title_slide else 0
-                for i in range(n_toc_slides):
-                    outlines_to = outline_index + 10
-                    if total_outlines == outlines_to:
-                        outlines_to -= 1
-
-                    presentation_structure.slides.insert(
-                        i + 1 if request.include_title_slide else i,
-                        toc_slide_layout_index,
-                    )
-                    toc_outline = f"Table of Contents\n\n"
-
-                    for outline in presentation_outlines.slides[
-                        outline_index:outlines_to
-                    ]:
-                        page_number = (
-                            outline_index - i + n_toc_slides + 1
-                            if request.include_title_slide
-                            else outline_index - i + n_toc_slides
-                        )
-                        toc_outline += f"Slide page number: {page_number}\n Slide Content: {outline.content[:100]}\n\n"
-                        outline_index += 1
-
-                    outline_index += 1
-
-                    presentation_outlines.slides.insert(
-                        i + 1 if request.include_title_slide else i,
-                        SlideOutlineModel(
-                            content=toc_outline,
-                        ),
-                    )
+        layout_future = asyncio.ensure_future(load_layout())
 
-        # Create PresentationModel
         presentation = PresentationModel(
             id=presentation_id,
             user_id=current_user,
             content=request.content,
             n_slides=request.n_slides,
             language=request.language,
-            title=get_presentation_title_from_outlines(presentation_outlines),
-            outlines=presentation_outlines.model_dump(),
-            layout=layout_model.model_dump(),
-            structure=presentation_structure.model_dump(),
             tone=request.tone.value,
             verbosity=request.verbosity.value,
             instructions=request.instructions,
         )
-
-        # Updating async status
-        if async_status:
-            async_status.message = "Generating slides"
-            async_status.updated_at = datetime.now()
-            sql_session.add(async_status)
-            await sql_session.commit()
-
         image_generation_service = ImageGenerationService(
-            output_directory=get_images_directory(), 
+            output_directory=get_images_directory(),
             api_key=api_key,
             model=presentation.image_model,
         )
-        async_assets_generation_tasks = []
-
-        # 7. Generate slide content concurrently (batched), then build slides and fetch assets
-        slides: List[SlideModel] = []
-
-        slide_layout_indices = presentation_structure.slides
-        slide_layouts = [layout_model.slides[idx] for idx in slide_layout_indices]
 
-        # Schedule slide content generation and asset fetching in batches of 10
-        batch_size = 10
-        for start in range(0, len(slide_layouts), batch_size):
-            end = min(start + batch_size, len(slide_layouts))
+        # 流式生成：每页大纲解析完成后立即依次进行 布局选择 -> 内容生成 -> 资源获取，
+        # 各页之间互不等待，不再等待全部大纲、全部布局、全部内容完成后才进入下一阶段
+        generated_slides: List[SlideModel] = []
+        # 各页按顺序选择布局，每页可参考之前已选择的布局以保持版式变化和衔接；
+        # 大纲逐页流式到达，布局选择随之推进，内容生成不必等待全部布局
+        selected_layouts: List[int] = []
+        layout_selected_events: List[asyncio.Event] = []
+
+        async def select_slide_layout(item: dict) -> dict:
+            layout_model, toc_slide_layout_index, n_toc_slides = await layout_future
+            if "toc_index" in item:
+                item["position"] = get_toc_slide_position(
+                    item["toc_index"], request.include_title_slide
+                )
+                item["layout_index"] = toc_slide_layout_index
+                return item
 
-            print(f"Generating slides from {start} to {end}")
+            outline_index = item["outline_index"]
+            item["position"] = get_slide_position_with_toc(
+                outline_index, n_toc_slides, request.include_title_slide
+            )
+            total_slide_layouts = len(layout_model.slides)
+            if outline_index > 0:
+                await layout_selected_events[outline_index - 1].wait()
+            if layout_model.ordered:
+                layout_index = outline_index
+            else:
+                layout_index = await select_slide_layout_index(
+                    item["outline"],
+                    item["position"] + 1,
+                    n_slides_to_generate + n_toc_slides,
+                    layout_model,
+                    list(selected_layouts),
+                    instructions=request.instructions,
+                    api_key="",
+                    model={"name": "gpt-4.1"},
+                    using_slides_markdown=using_slides_markdown,
+                )
+            if not 0 <= layout_index < total_slide_layouts:
+                layout_index = random.randint(0, total_slide_layouts - 1)
+            item["layout_index"] = layout_index
+            selected_layouts.append(layout_index)
+            layout_selected_events[outline_index].set()
+            return item
+
+        # 配置 SLIDE_CONTENT_BATCH_SIZE 时，同时等待生成的幻灯片合并为一次LLM请求
+        slide_content_batcher = SlideContentBatcher.from_env(
+            request.language,
+            api_key="",
+            model={"name": "gpt-4.1"},
+            tone=request.tone.value,
+            verbosity=request.verbosity.value,
+            instructions=request.instructions,
+        )
 
-            # Generate contents for this batch concurrently
-            content_tasks = [
-                get_slide_content_from_type_and_outline(
-                    slide_layouts[i],
-                    presentation_outlines.slides[i],
+        async def generate_slide(item: dict) -> dict:
+            layout_model, _, n_toc_slides = await layout_future
+            slide_layout = layout_model.slides[item["layout_index"]]
+            if slide_content_batcher:
+                slide_content = await slide_content_batcher.generate(
+                    slide_layout, item["outline"]
+                )
+            else:
+                slide_content = await get_slide_content_from_type_and_outline(
+                    slide_layout,
+                    item["outline"],
                     request.language,
                     api_key="",
                     model={"name": "gpt-4.1"},
@@ -1067,61 +1342,262 @@ async def generate_presentation_handler(
                     verbosity=request.verbosity.value,
                     instructions=request.instructions,
                 )
-                for i in range(start, end)
-            ]
-            batch_contents: List[dict] = await asyncio.gather(*content_tasks)
-
-            # Build slides for this batch
-            batch_slides: List[SlideModel] = []
-            for offset, slide_content in enumerate(batch_contents):
-                i = start + offset
-                slide_layout = slide_layouts[i]
-                slide = SlideModel(
-                    presentation=presentation_id,
-                    user_id=current_user,
-                    layout_group=layout_model.name,
-                    layout=slide_layout.id,
-                    index=i,
-                    speaker_note=slide_content.get("__speaker_note__"),
-                    content=slide_content,
+            slide = SlideModel(
+                presentation=presentation_id,
+                user_id=current_user,
+                layout_group=layout_model.name,
+                layout=slide_layout.id,
+                index=item["position"],
+                speaker_note=slide_content.get("__speaker_note__"),
+                content=slide_content,
+            )
+            generated_slides.append(slide)
+            item["slide"] = slide
+
+            if async_status:
+                await GENERATION_JOB_QUEUE.publish_event(
+                    async_status.id,
+                    {
+                        "type": "slide",
+                        "index": item["position"],
+                        "layout": slide_layout.id,
+                        "completed": len(generated_slides),
+                        "total": n_slides_to_generate + n_toc_slides,
+                    },
                 )
-                slides.append(slide)
-                batch_slides.append(slide)
+            return item
 
-            # Start asset fetch tasks for just-generated slides so they run while next batch is processed
-            asset_tasks = [
-                process_slide_and_fetch_assets(image_generation_service, slide)
-                for slide in batch_slides
+        async def fetch_slide_assets(item: dict) -> dict:
+            # 先写入占位资产，截止时间到达时未获取完成的资产保留占位
+            process_slide_add_placeholder_assets(item["slide"])
+            item["assets"] = await process_slide_and_fetch_assets(
+                image_generation_service, item["slide"]
+            )
+            return item
+
+        pipeline = StreamingPipeline(
+            [
+                # 布局选择按页顺序进行，无需限制并发
+                PipelineStage(select_slide_layout),
+                PipelineStage(generate_slide, concurrency=10),
+                PipelineStage(fetch_slide_assets),
             ]
-            async_assets_generation_tasks.extend(asset_tasks)
+        )
+        outlines: List[SlideOutlineModel] = []
+        # 已提交的输入项，各阶段在其上写入结果，截止时间到达时用于收集已完成的部分
+        submitted_items: Dict[Hashable, dict] = {}
 
-        if async_status:
-            async_status.message = "Fetching assets for slides"
-            async_status.updated_at = datetime.now()
-            sql_session.add(async_status)
-            await sql_session.commit()
+        def submit_to_pipeline(key: Hashable, item: dict):
+            submitted_items[key] = item
+            pipeline.submit(key, item)
+
+        def submit_outline(outline: SlideOutlineModel):
+            if len(outlines) >= n_slides_to_generate:
+                return
+            outline_index = len(outlines)
+            outlines.append(outline)
+            layout_selected_events.append(asyncio.Event())
+            submit_to_pipeline(
+                ("outline", outline_index),
+                {"outline_index": outline_index, "outline": outline},
+            )
+
+        try:
+            async with request_deadline_scope(content_deadline):
+                if not using_slides_markdown:
+                    additional_context = ""
+
+                    # Updating async status
+                    if async_status:
+                        await GENERATION_JOB_QUEUE.update_progress(
+                            sql_session, async_status, "Generating presentation outlines"
+                        )
+
+                    if request.files:
+                        documents_loader = DocumentsLoader(file_paths=request.files)
+                        await documents_loader.load_documents()
+                        documents = documents_loader.documents
+                        if documents:
+                            additional_context = "\n\n".join(documents)
+
+                    presentation_outlines_text = ""
+                    outlines_parser = StreamingJsonArrayParser("slides")
+                    async for chunk in generate_ppt_outline(
+                        request.content,
+                        n_slides_to_generate,
+                        '', # api key
+                        request.language,
+                        additional_context,
+                        request.tone.value,
+                        request.verbosity.value,
+                        request.instructions,
+                        request.include_title_slide,
+                        request.web_search,
+                    ):
+
+                        if isinstance(chunk, HTTPException):
+                            raise chunk
+
+                        presentation_outlines_text += chunk
+                        for _, slide_outline in outlines_parser.feed(chunk):
+                            submit_outline(SlideOutlineModel(**slide_outline))
+
+                    try:
+                        presentation_outlines_json = dict(
+                            dirtyjson.loads(presentation_outlines_text)
+                        )
+                    except Exception as e:
+                        if not outlines_parser.items:
+                            traceback.print_exc()
+                            raise HTTPException(
+                                status_code=400,
+                                detail="Failed to generate presentation outlines. Please try again.",
+                            )
+                        presentation_outlines_json = {"slides": outlines_parser.items}
+
+                    # 流式解析未能识别的剩余大纲
+                    for slide_outline in PresentationOutlineModel(
+                        **presentation_outlines_json
+                    ).slides[len(outlines) :]:
+                        submit_outline(slide_outline)
+
+                else:
+                    # Setting outlines to slides markdown
+                    for slide in request.slides_markdown:
+                        submit_outline(SlideOutlineModel(content=slide))
+
+                if not outlines:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Failed to generate presentation outlines. Please try again.",
+                    )
+
+                print("-" * 40)
+                print(f"Generated {len(outlines)} outlines for the presentation")
+
+                # 目录页需要全部大纲，在大纲完成后加入流水线
+                layout_model, _, n_toc_slides = await layout_future
+                for toc_index, toc_outline in enumerate(
+                    get_table_of_contents_outlines(
+                        outlines, n_toc_slides, request.include_title_slide
+                    )
+                ):
+                    submit_to_pipeline(
+                        ("toc", toc_index),
+                        {
+                            "toc_index": toc_index,
+                            "outline": SlideOutlineModel(content=toc_outline),
+                        },
+                    )
+
+                # Updating async status
+                if async_status:
+                    await GENERATION_JOB_QUEUE.update_progress(
+                        sql_session, async_status, "Generating slides"
+                    )
+
+                results = await pipeline.join()
+        except RequestDeadlineExceeded:
+            # 截止时间到达：取消未完成的幻灯片，已生成内容的幻灯片组成部分演示文稿，
+            # 资产未获取完成的幻灯片保留占位资产，并标记为待后台补全
+            pipeline.cancel()
+            layout_future.cancel()
+            if slide_content_batcher:
+                slide_content_batcher.cancel()
+            results = {
+                key: item
+                for key, item in submitted_items.items()
+                if "slide" in item
+            }
+            if not results:
+                raise HTTPException(
+                    status_code=504, detail="Presentation generation timed out"
+                )
+            deadline_exceeded = True
+            for item in results.values():
+                if "assets" not in item:
+                    item["assets"] = []
+                    needs_fill_in = True
+            print(
+                f"Generation deadline exceeded, completing with {len(results)} slides"
+            )
+            if async_status:
+                await GENERATION_JOB_QUEUE.publish_event(
+                    async_status.id,
+                    {
+                        "type": "deadline_exceeded",
+                        "completed": len(results),
+                        "needs_fill_in": needs_fill_in,
+                    },
+                )
+        except BaseException:
+            pipeline.cancel()
+            layout_future.cancel()
+            if slide_content_batcher:
+                slide_content_batcher.cancel()
+            raise
+
+        if LLM_RESPONSE_CACHE.enabled:
+            print(
+                f"LLM response cache: {llm_cache_stats['hits']} hits, "
+                f"{llm_cache_stats['misses']} misses"
+            )
 
-        # Run all asset tasks concurrently while batches may still be generating content
-        generated_assets_list = await asyncio.gather(*async_assets_generation_tasks)
+        layout_model, _, _ = layout_future.result()
+        items = sorted(results.values(), key=lambda item: item["position"])
+        slides: List[SlideModel] = [item["slide"] for item in items]
+        if deadline_exceeded:
+            for index, slide in enumerate(slides):
+                slide.index = index
         generated_assets = []
-        for assets_list in generated_assets_list:
-            generated_assets.extend(assets_list)
+        for item in items:
+            generated_assets.extend(item["assets"])
+
+        presentation_outlines = PresentationOutlineModel(
+            slides=[item["outline"] for item in items]
+        )
+        presentation_structure = PresentationStructureModel(
+            slides=[item["layout_index"] for item in items]
+        )
+        presentation.title = get_presentation_title_from_outlines(presentation_outlines)
+        presentation.outlines = presentation_outlines.model_dump()
+        presentation.layout = layout_model.model_dump()
+        presentation.structure = presentation_structure.model_dump()
 
         # 8. Save PresentationModel and Slides
         sql_session.add(presentation)
-        sql_session.add_all(slides)
+        await save_presentation_slides(sql_session, presentation_id, slides)
         sql_session.add_all(generated_assets)
+        # 仍为占位图的图片（生成失败或超过截止时间）由后台重试补全
+        presentation.needs_fill_in = (
+            await IMAGE_BACKFILL_QUEUE.enqueue_slides(
+                sql_session,
+                presentation_id,
+                slides,
+                api_key,
+                presentation.image_model,
+            )
+            > 0
+        )
         await sql_session.commit()
 
         if async_status:
-            async_status.message = "Exporting presentation"
-            async_status.updated_at = datetime.now()
-            sql_session.add(async_status)
+            await GENERATION_JOB_QUEUE.update_progress(
+                sql_session, async_status, "Exporting presentation"
+            )
 
         # 9. Export
-        presentation_and_path = await export_presentation(
-            presentation_id, presentation.title or str(uuid.uuid4()), request.export_as
-        )
+        try:
+            async with request_deadline_scope(get_request_deadline()):
+                presentation_and_path = await export_presentation(
+                    presentation_id,
+                    presentation.title or str(uuid.uuid4()),
+                    request.export_as,
+                )
+        except RequestDeadlineExceeded:
+            raise HTTPException(
+                status_code=504, detail="Presentation export timed out"
+            )
 
         response = PresentationPathAndEditPath(
             **presentation_and_path.model_dump(),
@@ -1129,12 +1605,9 @@ async def generate_presentation_handler(
         )
 
         if async_status:
-            async_status.message = "Presentation generation completed"
-            async_status.status = "completed"
-            async_status.data = response.model_dump(mode="json")
-            async_status.updated_at = datetime.now()
-            sql_session.add(async_status)
-            await sql_session.commit()
+            await GENERATION_JOB_QUEUE.mark_completed(
+                sql_session, async_status, response.model_dump(mode="json")
+            )
 
         # Triggering webhook on success
         CONCURRENT_SERVICE.run_task(
@@ -1149,9 +1622,18 @@ async def generate_presentation_handler(
     except Exception as e:
         if not isinstance(e, HTTPException):
             traceback.print_exc()
+
+        # 异步任务的失败由任务队列处理（重试或最终标记失败并触发webhook），
+        # 保留原始异常，由队列区分暂时性错误（超时、限流、数据库错误）和永久错误
+        if async_status:
+            raise
+
+        if not isinstance(e, HTTPException):
             e = HTTPException(status_code=500, detail="Presentation generation failed")
 
-        api_error_model = APIErrorModel.from_exception(e)
+        api_error_model = APIErrorModel.from_exception(
+            e, "/api/v1/ppt/presentation/generate", "POST"
+        )
 
         # Triggering webhook on failure
         CONCURRENT_SERVICE.run_task(
@@ -1161,16 +1643,67 @@ async def generate_presentation_handler(
             api_error_model.model_dump(mode="json"),
         )
 
-        if async_status:
-            async_status.status = "error"
-            async_status.message = "Presentation generation failed"
-            async_status.updated_at = datetime.now()
-            async_status.error = api_error_model.model_dump(mode="json")
-            sql_session.add(async_status)
-            await sql_session.commit()
+        raise e
+
+
+async def run_async_generation_task(
+    async_status: AsyncPresentationGenerationTaskModel,
+    sql_session: AsyncSession,
+):
+    """
+    任务队列worker执行异步生成任务的入口
+
+    参数:
+        async_status: 已被当前worker领取的任务
+        sql_session: worker为该任务打开的数据库会话
+    """
+    if not async_status.request or not async_status.presentation_id:
+        raise HTTPException(
+            status_code=400, detail="Generation task is missing its request payload"
+        )
+
+    # 重试前清理上一次执行中可能已保存的部分数据
+    await sql_session.execute(
+        delete(SlideModel).where(
+            SlideModel.presentation == async_status.presentation_id
+        )
+    )
+    await sql_session.execute(
+        delete(PresentationModel).where(
+            PresentationModel.id == async_status.presentation_id
+        )
+    )
+    await sql_session.commit()
+
+    return await generate_presentation_handler(
+        GeneratePresentationRequest(**async_status.request),
+        async_status.presentation_id,
+        async_status=async_status,
+        sql_session=sql_session,
+        current_user=async_status.user_id,
+        api_key=decrypt_credential(async_status.api_key),
+    )
+
+
+async def on_async_generation_task_failed(
+    async_status: AsyncPresentationGenerationTaskModel, e: Exception
+) -> dict:
+    """
+    异步生成任务重试次数用尽后调用，触发失败webhook并返回错误信息
+    """
+    api_error_model = APIErrorModel.from_exception(
+        e, "/api/v1/ppt/presentation/generate/async", "POST"
+    )
+
+    # Triggering webhook on failure
+    CONCURRENT_SERVICE.run_task(
+        None,
+        WebhookService.send_webhook,
+        WebhookEvent.PRESENTATION_GENERATION_FAILED,
+        api_error_model.model_dump(mode="json"),
+    )
 
-        else:
-            raise e
+    return api_error_model.model_dump(mode="json")
 
 
 @PRESENTATION_ROUTER.post("/generate", response_model=PresentationPathAndEditPath)
@@ -1197,7 +1730,12 @@ async def generate_presentation_sync(
     try:
         (presentation_id,) = await check_if_api_request_is_valid(request, sql_session)
         return await generate_presentation_handler(
-            request, presentation_id, current_user, sql_session, api_key
+            request,
+            presentation_id,
+            async_status=None,
+            sql_session=sql_session,
+            current_user=current_user,
+            api_key=api_key,
         )
     except Exception as e:
         traceback.print_exc()
@@ -1211,22 +1749,26 @@ async def generate_presentation_sync(
 )
 async def generate_presentation_async(
     request: GeneratePresentationRequest,
-    background_tasks: BackgroundTasks,
     sql_session: AsyncSession = Depends(get_async_session),
     current_user: Optional[str] = Depends(get_current_user),
+    api_key: Optional[str] = Depends(get_current_api_key),
 ):
     """
     异步生成演示文稿
     
     参数:
         request: 生成演示文稿请求对象
-        background_tasks: FastAPI后台任务管理器，用于异步执行生成任务
         sql_session: 异步数据库会话
         current_user: 当前登录用户ID（可选）
+        api_key: 当前用户的API密钥
     
     返回:
         AsyncPresentationGenerationTaskModel: 异步任务状态对象，包含任务ID和当前状态
     
+    说明:
+        任务写入数据库任务队列，由进程内worker（本地模式）或独立worker进程执行，
+        服务重启后未完成的任务会被重新领取
+    
     异常:
         HTTPException 500: 演示文稿生成任务创建失败
     """
@@ -1238,17 +1780,11 @@ async def generate_presentation_async(
             message="Queued for generation",
             data=None,
             user_id=current_user,
+            presentation_id=presentation_id,
+            request=request.model_dump(mode="json"),
+            api_key=encrypt_credential(api_key),
         )
-        sql_session.add(async_status)
-        await sql_session.commit()
-
-        background_tasks.add_task(
-            generate_presentation_handler,
-            request,
-            presentation_id,
-            async_status=async_status,
-            sql_session=sql_session,
-        )
+        await GENERATION_JOB_QUEUE.enqueue(sql_session, async_status)
         return async_status
 
     except Exception as e:
@@ -1297,6 +1833,118 @@ async def check_async_presentation_generation_status(
     return status
 
 
+@PRESENTATION_ROUTER.get(
+    "/status/{id}/stream",
+    responses={401: {"description": "Unauthorized"}, 403: {"description": "Forbidden"}}
+)
+async def stream_async_presentation_generation_status(
+    id: str = Path(description="ID of the presentation generation task"),
+    sql_session: AsyncSession = Depends(get_async_session),
+    current_user: Optional[str] = Depends(get_current_user),
+):
+    """
+    以SSE流推送异步演示文稿生成任务的进度，替代轮询 /status/{id}
+    
+    参数:
+        id: 演示文稿生成任务ID
+        sql_session: 异步数据库会话
+        current_user: 当前登录用户ID（可选）
+    
+    返回:
+        流式响应，依次推送 status（阶段变化）、slide（单页进度）事件，
+        最终推送 complete（包含 PresentationPathAndEditPath）或 error 事件
+    
+    异常:
+        HTTPException 404: 任务不存在
+        HTTPException 403: 无权限访问该任务状态
+    """
+    status = await sql_session.get(AsyncPresentationGenerationTaskModel, id)
+    if not status:
+        raise HTTPException(
+            status_code=404, detail="No presentation generation task found"
+        )
+
+    # 检查用户权限
+    if current_user and status.user_id and status.user_id != current_user:
+        raise HTTPException(403, "You don't have permission to access this task status")
+
+    initial_event = build_generation_task_event(status)
+    is_finished = status.status in TERMINAL_TASK_STATUSES
+
+    def is_final_event(event: dict) -> bool:
+        return event["type"] in ("complete", "error") or (
+            event["type"] == "status" and event.get("status") == "cancelled"
+        )
+
+    async def inner():
+        yield SSEResponse(event="response", data=json.dumps(initial_event)).to_string()
+        if is_finished:
+            return
+
+        last_polled_event = initial_event
+        async with TASK_EVENT_BUS.subscribe(get_generation_task_topic(id)) as subscription:
+            while True:
+                event = await subscription.get(timeout=15)
+                if event is None:
+                    # 未配置Redis时，其他进程（独立worker或其他uvicorn worker）执行的任务
+                    # 收不到事件，只能每15秒回查数据库，推送阶段变化和最终结果（不含单页进度）
+                    if not TASK_EVENT_BUS.is_distributed:
+                        async with async_session_maker() as session:
+                            task = await session.get(AsyncPresentationGenerationTaskModel, id)
+                        if task:
+                            polled_event = build_generation_task_event(task)
+                            if polled_event != last_polled_event:
+                                event = last_polled_event = polled_event
+                    if event is None:
+                        yield ": keepalive\n\n"
+                        continue
+
+                yield SSEResponse(event="response", data=json.dumps(event)).to_string()
+                if is_final_event(event):
+                    break
+
+    return StreamingResponse(inner(), media_type="text/event-stream")
+
+
+@PRESENTATION_ROUTER.post(
+    "/status/{id}/cancel",
+    response_model=AsyncPresentationGenerationTaskModel,
+    responses={401: {"description": "Unauthorized"}, 403: {"description": "Forbidden"}}
+)
+async def cancel_async_presentation_generation(
+    id: str = Path(description="ID of the presentation generation task"),
+    sql_session: AsyncSession = Depends(get_async_session),
+    current_user: Optional[str] = Depends(get_current_user),
+):
+    """
+    取消异步演示文稿生成任务
+    
+    参数:
+        id: 演示文稿生成任务ID
+        sql_session: 异步数据库会话
+        current_user: 当前登录用户ID（可选）
+    
+    返回:
+        AsyncPresentationGenerationTaskModel: 取消后的任务状态对象
+    
+    异常:
+        HTTPException 404: 任务不存在
+        HTTPException 403: 无权限取消该任务
+    """
+    status = await sql_session.get(AsyncPresentationGenerationTaskModel, id)
+    if not status:
+        raise HTTPException(
+            status_code=404, detail="No presentation generation task found"
+        )
+
+    # 检查用户权限
+    if current_user and status.user_id and status.user_id != current_user:
+        raise HTTPException(403, "You don't have permission to cancel this task")
+
+    await GENERATION_JOB_QUEUE.request_cancel(sql_session, status)
+    return status
+
+
 @PRESENTATION_ROUTER.post("/edit", response_model=PresentationPathAndEditPath)
 async def edit_presentation_with_new_content(
     data: Annotated[EditPresentationRequest, Body()],
@@ -1330,25 +1978,23 @@ async def edit_presentation_with_new_content(
         select(SlideModel).where(SlideModel.presentation == data.presentation_id)
     )
 
-    new_slides = []
-    slides_to_delete = []
+    edited_slides = []
     for each_slide in slides:
-        updated_content = None
         new_slide_data = list(
             filter(lambda x: x.index == each_slide.index, data.slides)
         )
         if new_slide_data:
-            updated_content = deep_update(each_slide.content, new_slide_data[0].content)
-            new_slides.append(
-                each_slide.get_new_slide(presentation.id, updated_content)
+            updated_content = deep_update(
+                copy.deepcopy(each_slide.content), new_slide_data[0].content
             )
-            slides_to_delete.append(each_slide.id)
+            edited_slide = SlideModel(**each_slide.model_dump())
+            edited_slide.content = updated_content
+            edited_slides.append(edited_slide)
 
-    await sql_session.execute(
-        delete(SlideModel).where(SlideModel.id.in_(slides_to_delete))
+    # 只更新内容确实发生变化的幻灯片，保留幻灯片id
+    await save_presentation_slides(
+        sql_session, presentation.id, edited_slides, delete_missing=False
     )
-
-    sql_session.add_all(new_slides)
     await sql_session.commit()
 
     presentation_and_path = await export_presentation(
@@ -14,6 +14,7 @@ from sqlmodel import select
 from utils.asset_directory_utils import get_images_directory
 from utils.get_env import get_comparegpt_api_url_env, get_comparegpt_api_model_env, get_responses_model_env
 from services.database import get_async_session
+from services.layout_registry import LAYOUT_REGISTRY
 from models.sql.presentation_layout_code import PresentationLayoutCodeModel
 from .prompts import (
     GENERATE_HTML_SYSTEM_PROMPT,
@@ -823,6 +824,10 @@ async def save_layouts(
 
         await session.commit()
 
+        # 使对应自定义模板的布局缓存失效
+        for presentation_id in {layout.presentation for layout in request.layouts}:
+            LAYOUT_REGISTRY.invalidate_custom_template(presentation_id)
+
         return SaveLayoutsResponse(
             success=True,
             saved_count=saved_count,
@@ -1171,5 +1176,6 @@ async def delete_template(
             )
         )
         await session.commit()
+        LAYOUT_REGISTRY.invalidate_custom_template(template_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete template")
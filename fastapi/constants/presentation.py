@@ -1 +1,4 @@
 DEFAULT_TEMPLATES = ["general", "modern", "standard", "swift"]
+
+# 图片生成失败或尚未生成时使用的占位图
+PLACEHOLDER_IMAGE_URL = "/static/images/placeholder.jpg"
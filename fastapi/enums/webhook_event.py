@@ -4,3 +4,5 @@ from enum import Enum
 class WebhookEvent(str, Enum):
     PRESENTATION_GENERATION_COMPLETED = "presentation.generation.completed"
     PRESENTATION_GENERATION_FAILED = "presentation.generation.failed"
+    PRESENTATION_CITATIONS_COMPLETED = "presentation.citations.completed"
+    PRESENTATION_CITATIONS_FAILED = "presentation.citations.failed"
@@ -1,5 +1,5 @@
 from typing import Any, List, Literal, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from google.genai.types import Content as GoogleContent
 
 from models.llm_tool_call import AnthropicToolCall
@@ -17,6 +17,8 @@ class LLMUserMessage(LLMMessage):
 class LLMSystemMessage(LLMMessage):
     role: Literal["system"] = "system"
     content: str
+    # 内容不随请求变化，支持显式缓存控制的服务商可以缓存该消息（不会发送给服务商）
+    cacheable: bool = Field(default=False, exclude=True)
 
 
 class OpenAIAssistantMessage(LLMMessage):
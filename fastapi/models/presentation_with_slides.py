@@ -19,4 +19,6 @@ class PresentationWithSlides(BaseModel):
     verbosity: Optional[str] = None
     slides: List[SlideModel]
     reference_markers: Optional[List[Dict[str, Any]]] = None
+    citations_status: Optional[str] = None
+    needs_fill_in: bool = False
     webSearchResources: Optional[Dict[str, Any]] = None
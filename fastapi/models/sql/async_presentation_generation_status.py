@@ -3,13 +3,16 @@ import secrets
 from typing import Optional
 import uuid
 
-from sqlalchemy import JSON, Column
+from sqlalchemy import JSON, Column, Index, false, text
 from sqlmodel import Field, SQLModel
 
 
 class AsyncPresentationGenerationTaskModel(SQLModel, table=True):
 
     __tablename__ = "async_presentation_generation_tasks"
+    __table_args__ = (
+        Index("idx_async_tasks_status_available_at", "status", "available_at"),
+    )
 
     id: str = Field(
         default_factory=lambda: f"task-{secrets.token_hex(32)}", primary_key=True
@@ -21,3 +24,19 @@ class AsyncPresentationGenerationTaskModel(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
     data: Optional[dict] = Field(sa_column=Column(JSON), default=None)
+
+    # 任务队列字段
+    presentation_id: Optional[uuid.UUID] = Field(default=None, description="ID of the presentation to generate")
+    request: Optional[dict] = Field(sa_column=Column(JSON), default=None)
+    # 使用服务端密钥加密（utils/credential_crypto.py），任务结束后清空
+    api_key: Optional[str] = Field(default=None, exclude=True)
+    # 服务端默认值用于为升级前已存在的任务行补充列
+    attempts: int = Field(default=0, sa_column_kwargs={"server_default": text("0")})
+    max_attempts: int = Field(default=3, sa_column_kwargs={"server_default": text("3")})
+    available_at: datetime = Field(default_factory=datetime.now, description="Earliest time the task can be claimed")
+    lease_owner: Optional[str] = Field(default=None, description="Worker currently holding the task")
+    lease_expires_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    cancel_requested: bool = Field(
+        default=False, sa_column_kwargs={"server_default": false()}
+    )
@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class GenerationLeaseModel(SQLModel, table=True):
+    """未配置Redis时，跨worker的生成过程租约，同一名称同一时间只有一个持有者"""
+
+    __tablename__ = "generation_leases"
+
+    name: str = Field(primary_key=True, max_length=255)
+    owner: str = Field(max_length=255)
+    expires_at: datetime = Field(index=True)
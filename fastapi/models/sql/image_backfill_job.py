@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import List, Optional
+import uuid
+
+from sqlalchemy import JSON, Column, Index
+from sqlmodel import Field, SQLModel
+
+
+class ImageBackfillJobModel(SQLModel, table=True):
+    """生成失败（使用占位图）的图片，由后台worker重试后写回幻灯片内容"""
+
+    __tablename__ = "image_backfill_jobs"
+    __table_args__ = (
+        Index("idx_image_backfill_jobs_status_available_at", "status", "available_at"),
+    )
+
+    id: uuid.UUID = Field(primary_key=True, default_factory=uuid.uuid4)
+    presentation_id: uuid.UUID = Field(index=True)
+    slide_id: uuid.UUID = Field(index=True)
+    # 图片在幻灯片内容中的路径，例如 ["items", 0, "image"]
+    path: List[str | int] = Field(sa_column=Column(JSON))
+    prompt: str
+    image_model: Optional[dict] = Field(sa_column=Column(JSON), default=None)
+    # 使用服务端密钥加密（utils/credential_crypto.py），任务结束后清空
+    api_key: Optional[str] = Field(default=None, exclude=True)
+    # pending / running / completed / failed / skipped
+    status: str = Field(default="pending")
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=5)
+    available_at: datetime = Field(default_factory=datetime.now)
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
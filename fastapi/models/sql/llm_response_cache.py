@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, Column
+from sqlmodel import Field, SQLModel
+
+
+class LLMResponseCacheModel(SQLModel, table=True):
+
+    __tablename__ = "llm_response_cache"
+
+    # (模型, 消息, 响应schema, 工具) 的sha256
+    key: str = Field(primary_key=True, max_length=64)
+    model: str
+    response: dict = Field(sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=datetime.now, index=True)
+    expires_at: datetime = Field(index=True)
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 import uuid
-from sqlalchemy import JSON, Column, DateTime, String
+from sqlalchemy import JSON, Column, DateTime, Index, String, false
 from sqlmodel import Boolean, Field, SQLModel
 
 from models.presentation_layout import PresentationLayoutModel
@@ -12,6 +12,10 @@ from utils.datetime_utils import get_current_utc_datetime
 
 class PresentationModel(SQLModel, table=True):
     __tablename__ = "presentations"
+    __table_args__ = (
+        # 用户演示文稿列表按创建时间倒序
+        Index("idx_presentations_user_id_created_at", "user_id", "created_at"),
+    )
 
     id: uuid.UUID = Field(primary_key=True, default_factory=uuid.uuid4)
     user_id: Optional[str] = Field(index=True, default=None)
@@ -47,6 +51,14 @@ class PresentationModel(SQLModel, table=True):
     image_model: Optional[dict] = Field(sa_column=Column(JSON), default=None)
     tavily_search_results_json: Optional[dict] = Field(sa_column=Column(JSON), default=None)
     reference_markers: Optional[List[Dict[str, Any]]] = Field(sa_column=Column(JSON), default=None)
+    # 引用标记的后台计算状态：pending / running / completed / error
+    citations_status: Optional[str] = Field(sa_column=Column(String), default=None)
+    # 部分图片仍为占位图（生成失败或超过截止时间），等待后台补全
+    # 服务端默认值保证升级前创建的演示文稿补充此列后为False而不是NULL
+    needs_fill_in: bool = Field(
+        sa_column=Column(Boolean, nullable=False, server_default=false()),
+        default=False,
+    )
 
     def get_new_presentation(self):
         return PresentationModel(
@@ -70,6 +82,8 @@ class PresentationModel(SQLModel, table=True):
             image_model=self.image_model,
             tavily_search_results_json=self.tavily_search_results_json,
             reference_markers=self.reference_markers,
+            citations_status=self.citations_status,
+            needs_fill_in=self.needs_fill_in,
         )
 
     def get_presentation_outline(self):
@@ -1,11 +1,15 @@
 from typing import Optional
 import uuid
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlmodel import Field, Column, JSON, SQLModel
 
 
 class SlideModel(SQLModel, table=True):
     __tablename__ = "slides"
+    __table_args__ = (
+        # 按演示文稿读取有序幻灯片、以及列表页取第一张幻灯片（index == 0）
+        Index("idx_slides_presentation_index", "presentation", "index"),
+    )
 
     id: uuid.UUID = Field(primary_key=True, default_factory=uuid.uuid4)
     user_id: Optional[str] = Field(index=True, default=None)
@@ -19,6 +23,8 @@ class SlideModel(SQLModel, table=True):
     html_content: Optional[str]
     speaker_note: Optional[str] = None
     properties: Optional[dict] = Field(sa_column=Column(JSON))
+    # 内容哈希，用于保存时跳过未变化的幻灯片
+    content_hash: Optional[str] = Field(default=None, max_length=64)
 
     def get_new_slide(self, presentation: uuid.UUID, content: Optional[dict] = None):
         return SlideModel(
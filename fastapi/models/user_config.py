@@ -1,5 +1,5 @@
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class UserConfig(BaseModel):
@@ -38,3 +38,9 @@ class UserConfig(BaseModel):
 
     # Web Search
     WEB_GROUNDING: Optional[bool] = None
+
+
+class UserConfigSnapshot(UserConfig):
+    """不可变的用户配置快照，由 USER_CONFIG_SERVICE 在配置变化时整体替换"""
+
+    model_config = ConfigDict(frozen=True)
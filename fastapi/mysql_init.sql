@@ -26,7 +26,10 @@ CREATE TABLE presentations (
     image_model JSON NULL,
     tavily_search_results_json JSON NULL,
     reference_markers JSON NULL,
-    INDEX idx_presentations_user_id (user_id)
+    citations_status VARCHAR(20) NULL,
+    needs_fill_in BOOLEAN NOT NULL DEFAULT FALSE,
+    INDEX idx_presentations_user_id (user_id),
+    INDEX idx_presentations_user_id_created_at (user_id, created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- 创建slides表
@@ -41,8 +44,10 @@ CREATE TABLE slides (
     html_content TEXT NULL,
     speaker_note LONGTEXT NULL,
     properties JSON NULL,
+    content_hash VARCHAR(64) NULL,
     INDEX idx_slides_user_id (user_id),
     INDEX idx_slides_presentation (presentation),
+    INDEX idx_slides_presentation_index (presentation, `index`),
     FOREIGN KEY (presentation) REFERENCES presentations(id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
@@ -112,7 +117,60 @@ CREATE TABLE async_presentation_generation_tasks (
     created_at DATETIME NOT NULL,
     updated_at DATETIME NOT NULL,
     data JSON NULL,
-    INDEX idx_async_tasks_user_id (user_id)
+    presentation_id VARCHAR(36) NULL,
+    request JSON NULL,
+    api_key TEXT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 3,
+    available_at DATETIME NOT NULL,
+    lease_owner VARCHAR(255) NULL,
+    lease_expires_at DATETIME NULL,
+    heartbeat_at DATETIME NULL,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    INDEX idx_async_tasks_user_id (user_id),
+    INDEX idx_async_tasks_status_available_at (status, available_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 创建llm_response_cache表
+CREATE TABLE llm_response_cache (
+    `key` VARCHAR(64) PRIMARY KEY,
+    model VARCHAR(255) NOT NULL,
+    response JSON NULL,
+    created_at DATETIME NOT NULL,
+    expires_at DATETIME NOT NULL,
+    INDEX idx_llm_response_cache_created_at (created_at),
+    INDEX idx_llm_response_cache_expires_at (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 创建image_backfill_jobs表
+CREATE TABLE image_backfill_jobs (
+    id VARCHAR(36) PRIMARY KEY,
+    presentation_id VARCHAR(36) NOT NULL,
+    slide_id VARCHAR(36) NOT NULL,
+    path JSON NULL,
+    prompt TEXT NOT NULL,
+    image_model JSON NULL,
+    api_key TEXT NULL,
+    status VARCHAR(20) NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 5,
+    available_at DATETIME NOT NULL,
+    lease_owner VARCHAR(255) NULL,
+    lease_expires_at DATETIME NULL,
+    error TEXT NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    INDEX idx_image_backfill_jobs_presentation_id (presentation_id),
+    INDEX idx_image_backfill_jobs_slide_id (slide_id),
+    INDEX idx_image_backfill_jobs_status_available_at (status, available_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 创建generation_leases表（未配置Redis时的跨worker生成租约）
+CREATE TABLE generation_leases (
+    name VARCHAR(255) PRIMARY KEY,
+    owner VARCHAR(255) NOT NULL,
+    expires_at DATETIME NOT NULL,
+    INDEX idx_generation_leases_expires_at (expires_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- 创建ollama_pull_status表
@@ -0,0 +1,230 @@
+import asyncio
+from datetime import timedelta
+import traceback
+from typing import Dict, List, Optional
+import uuid
+
+from sqlalchemy import and_, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlmodel import select
+
+from enums.webhook_event import WebhookEvent
+from models.sql.presentation import PresentationModel
+from models.sql.slide import SlideModel
+from services.concurrent_service import CONCURRENT_SERVICE
+from services.database import async_session_maker
+from services.task_event_bus import TASK_EVENT_BUS, get_citations_topic
+from services.webhook_service import WebhookService
+from utils.citations import citations_instance
+from utils.datetime_utils import get_current_utc_datetime
+
+
+TERMINAL_CITATIONS_STATUSES = ("completed", "error")
+ACTIVE_CITATIONS_STATUSES = ("pending", "running")
+
+
+def build_citations_event(presentation: PresentationModel) -> dict:
+    """将引用标记的计算状态转换为推送给客户端的事件"""
+    event = {
+        "type": "citations",
+        "presentation_id": str(presentation.id),
+        "status": presentation.citations_status,
+    }
+    if presentation.citations_status == "completed":
+        event["reference_markers"] = presentation.reference_markers or []
+    return event
+
+
+async def add_reference_markers(
+    presentation: PresentationModel, slides: List[SlideModel], api_key: str
+):
+    tavily_search_results_json = presentation.get_tavily_search_results_json()
+    search_content_map = tavily_search_results_json
+    source_embeddings,source_ids,source_contents,source_map = await citations_instance.get_source_embeddings_map(search_content_map,api_key)
+    reference_markers = []
+    if not source_embeddings:
+        # 没有联网搜索结果时无可引用的来源
+        return reference_markers
+    slide_index=1
+    for  slide in slides:
+        slide_content = slide.content
+        slide_title = slide_content.get("title", "")
+        reference_marker_index = await get_reference_marker(slide_title, source_embeddings,api_key)
+        if reference_marker_index != 0:
+            reference_markers.append({"slide_index":slide_index,"content":slide_title,"reference_marker_index":reference_marker_index})
+        slide_description = slide_content.get("bulletPoints") if "bulletPoints" in slide_content else slide_content.get("description", "")
+        if slide_description:
+            reference_marker_index = await get_reference_marker(str(slide_description), source_embeddings,api_key)
+            if reference_marker_index != 0:
+                reference_markers.append({"slide_index":slide_index,"content":str(slide_description),"reference_marker_index":reference_marker_index})
+
+        bulletPoints = slide_description if isinstance(slide_description, list) else slide_content.get("bulletPoints", [])
+        for bulletPoint in bulletPoints:
+            bulletPoint_title = bulletPoint.get("title", "")
+            reference_marker_index = await get_reference_marker(bulletPoint_title, source_embeddings,api_key)
+            if reference_marker_index!=0:
+                reference_markers.append({"slide_index":slide_index,"content":bulletPoint_title,"reference_marker_index":reference_marker_index})
+            bulletPoint_description = bulletPoint.get("description", "")
+            reference_marker_index = await get_reference_marker(bulletPoint_description, source_embeddings,api_key)
+            if reference_marker_index!=0:
+                reference_markers.append({"slide_index":slide_index,"content":bulletPoint_description,"reference_marker_index":reference_marker_index})
+        slide_index+=1
+    return reference_markers
+
+
+async def get_reference_marker(content: str,  source_embeddings:[],api_key: str):
+    reference_marker_index =0
+    if content:
+        similar_indexes, cosine_similarities, distances = await citations_instance.calculate_sentence_similarity(content, source_embeddings,api_key)
+        similarity_score = float(cosine_similarities[similar_indexes.index(similar_indexes[0])])
+        if similarity_score > 0.0001:
+                reference_marker_index=similar_indexes[0]
+    return reference_marker_index
+
+
+class CitationService:
+    """
+    在后台计算演示文稿的引用标记（reference_markers）。
+    幻灯片保存后即可返回给客户端，引用标记计算完成后写入演示文稿，
+    并通过 TASK_EVENT_BUS（主题 citations:{presentation_id}）和webhook通知。
+    计算在当前进程内执行，最长 TIMEOUT_SECONDS 秒；进程重启或崩溃后遗留的
+    pending/running 状态由 fail_stale 在超过该时长后标记为 error，避免客户端无限等待。
+    """
+
+    TIMEOUT_SECONDS = 600
+    SWEEP_INTERVAL_SECONDS = 60
+
+    def __init__(self, session_maker: async_sessionmaker):
+        self._session_maker = session_maker
+        # 演示文稿ID -> 正在执行的计算任务，同一演示文稿重新生成时取消旧任务
+        self._tasks: Dict[uuid.UUID, asyncio.Task] = {}
+
+    def schedule(self, presentation_id: uuid.UUID, api_key: Optional[str]):
+        """调用方需先将 citations_status 置为 pending 并提交"""
+        previous_task = self._tasks.get(presentation_id)
+        if previous_task is not None and not previous_task.done():
+            previous_task.cancel()
+
+        task = asyncio.create_task(
+            self.generate_reference_markers(presentation_id, api_key)
+        )
+        self._tasks[presentation_id] = task
+
+        def on_task_done(done_task: asyncio.Task):
+            if self._tasks.get(presentation_id) is done_task:
+                self._tasks.pop(presentation_id)
+
+        task.add_done_callback(on_task_done)
+        return task
+
+    async def generate_reference_markers(
+        self, presentation_id: uuid.UUID, api_key: Optional[str]
+    ):
+        async with self._session_maker() as sql_session:
+            presentation = await sql_session.get(PresentationModel, presentation_id)
+            if not presentation:
+                return
+
+            try:
+                async with asyncio.timeout(self.TIMEOUT_SECONDS):
+                    presentation.citations_status = "running"
+                    await sql_session.commit()
+                    await self._publish(presentation)
+
+                    slides = await sql_session.scalars(
+                        select(SlideModel)
+                        .where(SlideModel.presentation == presentation_id)
+                        .order_by(SlideModel.index)
+                    )
+                    reference_markers = await add_reference_markers(
+                        presentation, list(slides), api_key
+                    )
+                    presentation.set_reference_markers(reference_markers)
+                    presentation.citations_status = "completed"
+                    await sql_session.commit()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+                await sql_session.rollback()
+                await sql_session.refresh(presentation)
+                await self._fail(sql_session, presentation)
+                return
+
+            await self._publish(presentation)
+            CONCURRENT_SERVICE.run_task(
+                None,
+                WebhookService.send_webhook,
+                WebhookEvent.PRESENTATION_CITATIONS_COMPLETED,
+                build_citations_event(presentation),
+            )
+
+    async def _fail(self, sql_session: AsyncSession, presentation: PresentationModel):
+        presentation.citations_status = "error"
+        sql_session.add(presentation)
+        await sql_session.commit()
+        await self._notify_failed(presentation)
+
+    async def _notify_failed(self, presentation: PresentationModel):
+        await self._publish(presentation)
+        CONCURRENT_SERVICE.run_task(
+            None,
+            WebhookService.send_webhook,
+            WebhookEvent.PRESENTATION_CITATIONS_FAILED,
+            build_citations_event(presentation),
+        )
+
+    async def fail_stale(self, presentation_id: Optional[uuid.UUID] = None) -> int:
+        """
+        将超过 TIMEOUT_SECONDS 仍处于 pending/running 的计算标记为 error
+        （计算所在的进程已重启或崩溃），可指定只检查一个演示文稿，返回标记的数量
+        """
+        stale_before = get_current_utc_datetime() - timedelta(
+            seconds=self.TIMEOUT_SECONDS
+        )
+        stale_condition = and_(
+            PresentationModel.citations_status.in_(ACTIVE_CITATIONS_STATUSES),
+            PresentationModel.updated_at < stale_before,
+        )
+        query = select(PresentationModel.id).where(stale_condition)
+        if presentation_id is not None:
+            query = query.where(PresentationModel.id == presentation_id)
+
+        n_failed = 0
+        async with self._session_maker() as sql_session:
+            for stale_id in list(await sql_session.scalars(query)):
+                task = self._tasks.get(stale_id)
+                if task is not None and not task.done():
+                    continue
+                # 条件UPDATE，多个进程同时清理时只有一个会标记并发送webhook
+                result = await sql_session.execute(
+                    update(PresentationModel)
+                    .where(PresentationModel.id == stale_id, stale_condition)
+                    .values(citations_status="error")
+                    .execution_options(synchronize_session=False)
+                )
+                await sql_session.commit()
+                if result.rowcount != 1:
+                    continue
+                print(f"Citations for presentation {stale_id} are stale")
+                presentation = await sql_session.get(PresentationModel, stale_id)
+                await self._notify_failed(presentation)
+                n_failed += 1
+        return n_failed
+
+    async def run_sweeper(self):
+        """启动时及之后定期清理遗留的计算状态，直到任务被取消"""
+        while True:
+            try:
+                await self.fail_stale()
+            except Exception:
+                traceback.print_exc()
+            await asyncio.sleep(self.SWEEP_INTERVAL_SECONDS)
+
+    async def _publish(self, presentation: PresentationModel):
+        await TASK_EVENT_BUS.publish(
+            get_citations_topic(presentation.id), build_citations_event(presentation)
+        )
+
+
+CITATION_SERVICE = CitationService(async_session_maker)
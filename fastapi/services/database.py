@@ -1,5 +1,7 @@
 from collections.abc import AsyncGenerator
 import os
+from typing import Optional
+from sqlalchemy import Column, Connection, Table, inspect, text
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     create_async_engine,
@@ -13,14 +15,22 @@ from models.sql.async_presentation_generation_status import (
     AsyncPresentationGenerationTaskModel,
 )
 from models.sql.image_asset import ImageAsset
+from models.sql.generation_lease import GenerationLeaseModel
+from models.sql.image_backfill_job import ImageBackfillJobModel
 from models.sql.key_value import KeyValueSqlModel
+from models.sql.llm_response_cache import LLMResponseCacheModel
 from models.sql.ollama_pull_status import OllamaPullStatus
 from models.sql.presentation import PresentationModel
 from models.sql.slide import SlideModel
 from models.sql.presentation_layout_code import PresentationLayoutCodeModel
 from models.sql.template import TemplateModel
 from models.sql.webhook_subscription import WebhookSubscription
-from utils.db_utils import get_database_url_and_connect_args
+from utils.db_utils import (
+    configure_sqlite_engine,
+    get_database_engine_kwargs,
+    get_database_url_and_connect_args,
+    instrument_engine_pool,
+)
 
 # 获取环境变量中的应用数据目录
 app_data_dir = get_app_data_directory_env() or os.getcwd()
@@ -30,7 +40,12 @@ container_db_url = f"sqlite+aiosqlite:///{os.path.join(app_data_dir, 'container.
 
 database_url, connect_args = get_database_url_and_connect_args()
 
-sql_engine: AsyncEngine = create_async_engine(database_url, connect_args=connect_args)
+sql_engine: AsyncEngine = create_async_engine(
+    database_url, **get_database_engine_kwargs(database_url, connect_args)
+)
+if "sqlite" in database_url:
+    configure_sqlite_engine(sql_engine)
+instrument_engine_pool(sql_engine, "database_pool")
 async_session_maker = async_sessionmaker(sql_engine, expire_on_commit=False)
 
 
@@ -44,6 +59,8 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
 container_db_engine: AsyncEngine = create_async_engine(
     container_db_url, connect_args={"check_same_thread": False}
 )
+configure_sqlite_engine(container_db_engine)
+instrument_engine_pool(container_db_engine, "container_database_pool")
 container_db_async_session_maker = async_sessionmaker(
     container_db_engine, expire_on_commit=False
 )
@@ -54,23 +71,89 @@ async def get_container_db_async_session() -> AsyncGenerator[AsyncSession, None]
         yield session
 
 
+def _compile_server_default(column: Column, dialect) -> Optional[str]:
+    if column.server_default is None:
+        return None
+    default = column.server_default.arg
+    if isinstance(default, str):
+        return f"'{default}'"
+    return str(default.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+
+def add_missing_columns(sync_conn: Connection, tables: list[Table]):
+    """
+    为已存在的表补充模型中新增的列（create_all 不会修改已有的表）。
+    新列以可为空的方式添加；有服务端默认值的列同时带上默认值，
+    并将已有数据行（包括之前以无默认值方式补充的列）中的NULL更新为默认值。
+    """
+    inspector = inspect(sync_conn)
+    preparer = sync_conn.dialect.identifier_preparer
+    for table in tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            server_default = _compile_server_default(column, sync_conn.dialect)
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=sync_conn.dialect)
+                default_clause = f" DEFAULT {server_default}" if server_default else ""
+                sync_conn.execute(
+                    text(
+                        f"ALTER TABLE {preparer.quote(table.name)} "
+                        f"ADD COLUMN {preparer.quote(column.name)} {column_type}{default_clause}"
+                    )
+                )
+                print(f"Added missing column {table.name}.{column.name}")
+            if server_default and not column.nullable:
+                sync_conn.execute(
+                    text(
+                        f"UPDATE {preparer.quote(table.name)} "
+                        f"SET {preparer.quote(column.name)} = {server_default} "
+                        f"WHERE {preparer.quote(column.name)} IS NULL"
+                    )
+                )
+
+
+def add_missing_indexes(sync_conn: Connection, tables: list[Table]):
+    """
+    为已存在的表创建模型中新增的索引（create_all 只会为新建的表创建索引）。
+    """
+    inspector = inspect(sync_conn)
+    for table in tables:
+        if not inspector.has_table(table.name):
+            continue
+        # 按列比较而不是按名称，手工建表脚本（mysql_init.sql）中的索引名与模型不同
+        existing_indexes = {
+            tuple(index["column_names"]) for index in inspector.get_indexes(table.name)
+        }
+        for index in table.indexes:
+            if tuple(column.name for column in index.columns) in existing_indexes:
+                continue
+            index.create(sync_conn)
+            print(f"Created missing index {index.name} on {table.name}")
+
+
 # Create Database and Tables
 async def create_db_and_tables():
+    tables = [
+        PresentationModel.__table__,
+        SlideModel.__table__,
+        KeyValueSqlModel.__table__,
+        ImageAsset.__table__,
+        PresentationLayoutCodeModel.__table__,
+        TemplateModel.__table__,
+        WebhookSubscription.__table__,
+        AsyncPresentationGenerationTaskModel.__table__,
+        LLMResponseCacheModel.__table__,
+        ImageBackfillJobModel.__table__,
+        GenerationLeaseModel.__table__,
+    ]
+
     async with sql_engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: add_missing_columns(sync_conn, tables))
+        await conn.run_sync(lambda sync_conn: add_missing_indexes(sync_conn, tables))
         await conn.run_sync(
-            lambda sync_conn: SQLModel.metadata.create_all(
-                sync_conn,
-                tables=[
-                    PresentationModel.__table__,
-                    SlideModel.__table__,
-                    KeyValueSqlModel.__table__,
-                    ImageAsset.__table__,
-                    PresentationLayoutCodeModel.__table__,
-                    TemplateModel.__table__,
-                    WebhookSubscription.__table__,
-                    AsyncPresentationGenerationTaskModel.__table__,
-                ],
-            )
+            lambda sync_conn: SQLModel.metadata.create_all(sync_conn, tables=tables)
         )
 
     async with container_db_engine.begin() as conn:
@@ -0,0 +1,539 @@
+import asyncio
+from datetime import datetime, timedelta
+import os
+import random
+import socket
+import traceback
+from typing import Any, Callable, Coroutine, List, Optional, Set
+import uuid
+
+from fastapi import HTTPException
+from openai import RateLimitError
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlmodel import select
+
+from models.sql.async_presentation_generation_status import (
+    AsyncPresentationGenerationTaskModel,
+)
+from services.database import async_session_maker
+from services.task_event_bus import TASK_EVENT_BUS, get_generation_task_topic
+from utils.get_env import (
+    get_generation_job_lease_seconds_env,
+    get_generation_job_max_attempts_env,
+    get_generation_job_poll_interval_env,
+    get_generation_worker_concurrency_env,
+)
+from utils.parsers import parse_float_or_none, parse_int_or_none
+
+
+TERMINAL_TASK_STATUSES = ("completed", "error", "cancelled")
+
+
+def build_generation_task_event(task: AsyncPresentationGenerationTaskModel) -> dict:
+    """将任务状态转换为推送给客户端的事件，格式与SSE流中的 response 事件一致"""
+    if task.status == "completed":
+        return {"type": "complete", "presentation": task.data}
+    if task.status == "error":
+        error = task.error or {}
+        return {
+            "type": "error",
+            "detail": error.get("message") or error.get("detail") or task.message,
+        }
+    return {
+        "type": "status",
+        "status": task.status,
+        "message": task.message,
+        "attempts": task.attempts,
+        "updated_at": task.updated_at.isoformat() if task.updated_at else None,
+    }
+
+def is_retryable_error(e: Exception) -> bool:
+    """
+    只重试暂时性错误（服务端5xx、限流、超时、连接或数据库错误）；
+    4xx（布局无效、大纲为空、参数校验失败等）重试也会失败，直接标记失败以免重复消耗LLM调用
+    """
+    if isinstance(e, HTTPException):
+        return e.status_code >= 500 or e.status_code == 429
+    return isinstance(
+        e, (TimeoutError, ConnectionError, RateLimitError, OperationalError)
+    )
+
+
+class GenerationJobLostError(Exception):
+    """任务执行次数已用尽且租约过期（worker崩溃、被OOM终止或卡死），不再重新领取"""
+
+
+JobHandler = Callable[
+    [AsyncPresentationGenerationTaskModel, AsyncSession], Coroutine[Any, Any, Any]
+]
+JobFailureHandler = Callable[
+    [AsyncPresentationGenerationTaskModel, Exception], Coroutine[Any, Any, Any]
+]
+
+
+class GenerationJobQueue:
+    """
+    基于SQL数据库的演示文稿生成任务队列。
+    AsyncPresentationGenerationTaskModel 即为任务行，通过租约（lease）+ 心跳保证
+    同一任务同一时间只被一个worker执行，worker崩溃后租约过期即可被重新领取。
+    任务行中的API密钥加密保存，任务结束（完成、失败、取消）时清空。
+    """
+
+    def __init__(self, session_maker: async_sessionmaker):
+        self._session_maker = session_maker
+        self._wakeup = asyncio.Event()
+
+    @property
+    def lease_seconds(self) -> int:
+        return parse_int_or_none(get_generation_job_lease_seconds_env()) or 60
+
+    @property
+    def max_attempts(self) -> int:
+        return parse_int_or_none(get_generation_job_max_attempts_env()) or 3
+
+    async def enqueue(
+        self, sql_session: AsyncSession, task: AsyncPresentationGenerationTaskModel
+    ):
+        task.status = "pending"
+        task.max_attempts = self.max_attempts
+        task.available_at = datetime.now()
+        sql_session.add(task)
+        await sql_session.commit()
+        await self.publish(task)
+        # 本地模式下立即唤醒进程内worker，避免等待下一次轮询
+        self._wakeup.set()
+
+    async def publish(self, task: AsyncPresentationGenerationTaskModel):
+        await TASK_EVENT_BUS.publish(
+            get_generation_task_topic(task.id), build_generation_task_event(task)
+        )
+
+    async def publish_event(self, task_id: str, event: dict):
+        """发布任务执行过程中的细粒度事件（例如单页幻灯片进度）"""
+        await TASK_EVENT_BUS.publish(get_generation_task_topic(task_id), event)
+
+    async def update_progress(
+        self,
+        sql_session: AsyncSession,
+        task: AsyncPresentationGenerationTaskModel,
+        message: str,
+    ):
+        task.message = message
+        task.updated_at = datetime.now()
+        sql_session.add(task)
+        await sql_session.commit()
+        await self.publish(task)
+
+    async def mark_completed(
+        self,
+        sql_session: AsyncSession,
+        task: AsyncPresentationGenerationTaskModel,
+        data: dict,
+    ):
+        task.status = "completed"
+        task.message = "Presentation generation completed"
+        task.data = data
+        task.api_key = None
+        task.updated_at = datetime.now()
+        sql_session.add(task)
+        await sql_session.commit()
+        await self.publish(task)
+
+    async def wait_for_work(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    def _claimable_condition(self, now: datetime):
+        Task = AsyncPresentationGenerationTaskModel
+        return or_(
+            and_(Task.status == "pending", Task.available_at <= now),
+            # 执行次数已用尽的任务不再领取，避免导致worker崩溃的任务被无限重新执行
+            and_(
+                Task.status == "running",
+                Task.lease_expires_at < now,
+                Task.attempts < Task.max_attempts,
+            ),
+        )
+
+    def _exhausted_condition(self, now: datetime):
+        Task = AsyncPresentationGenerationTaskModel
+        return and_(
+            Task.status == "running",
+            Task.lease_expires_at < now,
+            Task.attempts >= Task.max_attempts,
+        )
+
+    async def claim(
+        self, worker_id: str
+    ) -> Optional[AsyncPresentationGenerationTaskModel]:
+        """
+        领取一个可执行的任务（待执行且已到重试时间，或租约已过期的执行中任务）。
+        使用带条件的UPDATE做比较并交换，多个worker并发领取时只有一个会成功。
+        """
+        Task = AsyncPresentationGenerationTaskModel
+        async with self._session_maker() as sql_session:
+            now = datetime.now()
+            candidate_ids = await sql_session.scalars(
+                select(Task.id)
+                .where(self._claimable_condition(now))
+                .order_by(Task.available_at)
+                .limit(5)
+            )
+            for task_id in list(candidate_ids):
+                now = datetime.now()
+                result = await sql_session.execute(
+                    update(Task)
+                    .where(Task.id == task_id, self._claimable_condition(now))
+                    .values(
+                        status="running",
+                        lease_owner=worker_id,
+                        lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                        heartbeat_at=now,
+                        attempts=Task.attempts + 1,
+                        message="Generation started",
+                        updated_at=now,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await sql_session.commit()
+                if result.rowcount == 1:
+                    task = await sql_session.get(Task, task_id)
+                    await self.publish(task)
+                    return task
+        return None
+
+    async def claim_exhausted(self, worker_id: str) -> List[str]:
+        """
+        领取执行次数已用尽且租约已过期的任务，由领取的worker将其标记为失败并发送失败webhook。
+        与 claim 相同使用带条件的UPDATE，每个任务只会被一个worker领取，领取时不增加执行次数。
+        """
+        Task = AsyncPresentationGenerationTaskModel
+        claimed = []
+        async with self._session_maker() as sql_session:
+            candidate_ids = await sql_session.scalars(
+                select(Task.id).where(self._exhausted_condition(datetime.now())).limit(5)
+            )
+            for task_id in list(candidate_ids):
+                now = datetime.now()
+                result = await sql_session.execute(
+                    update(Task)
+                    .where(Task.id == task_id, self._exhausted_condition(now))
+                    .values(
+                        lease_owner=worker_id,
+                        lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                        updated_at=now,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await sql_session.commit()
+                if result.rowcount == 1:
+                    claimed.append(task_id)
+        return claimed
+
+    async def heartbeat(self, task_id: str, worker_id: str) -> Optional[bool]:
+        """
+        续约任务租约。
+        返回是否请求了取消；租约已被其他worker接管时返回None。
+        """
+        Task = AsyncPresentationGenerationTaskModel
+        async with self._session_maker() as sql_session:
+            now = datetime.now()
+            result = await sql_session.execute(
+                update(Task)
+                .where(Task.id == task_id, Task.lease_owner == worker_id)
+                .values(
+                    lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                    heartbeat_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await sql_session.commit()
+            if result.rowcount != 1:
+                return None
+            cancel_requested = await sql_session.scalar(
+                select(Task.cancel_requested).where(Task.id == task_id)
+            )
+            return bool(cancel_requested)
+
+    async def release(self, task_id: str, worker_id: str):
+        """worker停止时归还未完成的任务，使其可以被立即重新领取"""
+        Task = AsyncPresentationGenerationTaskModel
+        async with self._session_maker() as sql_session:
+            now = datetime.now()
+            await sql_session.execute(
+                update(Task)
+                .where(
+                    Task.id == task_id,
+                    Task.lease_owner == worker_id,
+                    Task.status == "running",
+                )
+                .values(
+                    status="pending",
+                    # 被中断的执行不计入重试次数
+                    attempts=Task.attempts - 1,
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    available_at=now,
+                    message="Queued for generation",
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await sql_session.commit()
+            await self._publish_by_id(sql_session, task_id)
+
+    async def mark_cancelled(self, task_id: str):
+        Task = AsyncPresentationGenerationTaskModel
+        async with self._session_maker() as sql_session:
+            now = datetime.now()
+            await sql_session.execute(
+                update(Task)
+                .where(Task.id == task_id, Task.status.not_in(TERMINAL_TASK_STATUSES))
+                .values(
+                    status="cancelled",
+                    message="Presentation generation cancelled",
+                    api_key=None,
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await sql_session.commit()
+            await self._publish_by_id(sql_session, task_id)
+
+    async def _publish_by_id(self, sql_session: AsyncSession, task_id: str):
+        task = await sql_session.get(AsyncPresentationGenerationTaskModel, task_id)
+        if task is not None:
+            await self.publish(task)
+
+    async def request_cancel(
+        self, sql_session: AsyncSession, task: AsyncPresentationGenerationTaskModel
+    ):
+        """
+        取消任务：未开始的任务直接标记为已取消，执行中的任务由持有租约的worker在下一次心跳时取消。
+        """
+        if task.status in TERMINAL_TASK_STATUSES:
+            return
+        task.cancel_requested = True
+        task.updated_at = datetime.now()
+        if task.status == "pending":
+            task.status = "cancelled"
+            task.message = "Presentation generation cancelled"
+            task.api_key = None
+        sql_session.add(task)
+        await sql_session.commit()
+        await self.publish(task)
+
+    def get_retry_delay(self, attempts: int) -> float:
+        # 指数退避 + 抖动：5s, 10s, 20s ... 最长5分钟
+        delay = min(5 * (2 ** max(attempts - 1, 0)), 300)
+        return delay + random.uniform(0, delay / 4)
+
+    async def schedule_retry(
+        self,
+        sql_session: AsyncSession,
+        task: AsyncPresentationGenerationTaskModel,
+        error: dict,
+    ):
+        now = datetime.now()
+        task.status = "pending"
+        task.message = f"Retrying presentation generation ({task.attempts}/{task.max_attempts})"
+        task.error = error
+        task.lease_owner = None
+        task.lease_expires_at = None
+        task.available_at = now + timedelta(seconds=self.get_retry_delay(task.attempts))
+        task.updated_at = now
+        sql_session.add(task)
+        await sql_session.commit()
+        await self.publish(task)
+
+    async def mark_failed(
+        self,
+        sql_session: AsyncSession,
+        task: AsyncPresentationGenerationTaskModel,
+        error: dict,
+    ):
+        task.status = "error"
+        task.message = "Presentation generation failed"
+        task.error = error
+        task.api_key = None
+        task.lease_owner = None
+        task.lease_expires_at = None
+        task.updated_at = datetime.now()
+        sql_session.add(task)
+        await sql_session.commit()
+        await self.publish(task)
+
+
+class GenerationWorker:
+    """
+    从 GenerationJobQueue 领取并执行生成任务。
+    既可以在Web进程内运行（本地模式），也可以通过 worker.py 作为独立进程运行。
+    """
+
+    def __init__(
+        self,
+        queue: GenerationJobQueue,
+        session_maker: async_sessionmaker,
+        handler: JobHandler,
+        on_failure: Optional[JobFailureHandler] = None,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+    ):
+        self.queue = queue
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.concurrency = (
+            concurrency
+            or parse_int_or_none(get_generation_worker_concurrency_env())
+            or 2
+        )
+        self.poll_interval = (
+            poll_interval
+            or parse_float_or_none(get_generation_job_poll_interval_env())
+            or 2.0
+        )
+        self._session_maker = session_maker
+        self._handler = handler
+        self._on_failure = on_failure
+        self._slots: Set[asyncio.Task] = set()
+        self._stopping = False
+
+    def start(self):
+        self._stopping = False
+        for _ in range(self.concurrency):
+            slot = asyncio.create_task(self._slot_loop())
+            self._slots.add(slot)
+            slot.add_done_callback(self._slots.discard)
+        print(f"Generation worker {self.worker_id} started with {self.concurrency} slot(s)")
+
+    async def stop(self):
+        self._stopping = True
+        for slot in list(self._slots):
+            slot.cancel()
+        await asyncio.gather(*self._slots, return_exceptions=True)
+        print(f"Generation worker {self.worker_id} stopped")
+
+    async def run_forever(self):
+        self.start()
+        try:
+            await asyncio.gather(*self._slots)
+        finally:
+            await self.stop()
+
+    async def _slot_loop(self):
+        while not self._stopping:
+            try:
+                task = await self.queue.claim(self.worker_id)
+            except Exception:
+                traceback.print_exc()
+                task = None
+
+            if task is None:
+                await self._fail_exhausted_tasks()
+                await self.queue.wait_for_work(self.poll_interval)
+                continue
+
+            await self._run_task(task.id)
+
+    async def _fail_exhausted_tasks(self):
+        try:
+            task_ids = await self.queue.claim_exhausted(self.worker_id)
+        except Exception:
+            traceback.print_exc()
+            return
+        for task_id in task_ids:
+            async with self._session_maker() as sql_session:
+                task = await sql_session.get(AsyncPresentationGenerationTaskModel, task_id)
+                print(f"Generation task {task_id} exhausted its attempts, marking failed")
+                await self._mark_failed(
+                    sql_session,
+                    task,
+                    GenerationJobLostError(
+                        "Presentation generation was interrupted too many times"
+                    ),
+                )
+
+    async def _heartbeat_loop(self, task_id: str, job: asyncio.Task):
+        interval = max(self.queue.lease_seconds / 3, 1)
+        while not job.done():
+            await asyncio.sleep(interval)
+            try:
+                cancel_requested = await self.queue.heartbeat(task_id, self.worker_id)
+            except Exception:
+                traceback.print_exc()
+                continue
+            if cancel_requested is None or cancel_requested:
+                # 请求取消，或租约已被其他worker接管
+                job.cancel()
+                return
+
+    async def _run_task(self, task_id: str):
+        async with self._session_maker() as sql_session:
+            task = await sql_session.get(AsyncPresentationGenerationTaskModel, task_id)
+            if task is None:
+                return
+
+            if task.cancel_requested:
+                await self.queue.mark_cancelled(task_id)
+                return
+
+            job = asyncio.create_task(self._handler(task, sql_session))
+            heartbeat = asyncio.create_task(self._heartbeat_loop(task_id, job))
+            try:
+                await asyncio.shield(job)
+            except asyncio.CancelledError:
+                if not job.done():
+                    # worker正在停止：中止当前任务并归还
+                    job.cancel()
+                    await asyncio.gather(job, return_exceptions=True)
+                    await self.queue.release(task_id, self.worker_id)
+                    raise
+                await self._on_job_cancelled(sql_session, task_id)
+            except Exception as e:
+                await self._on_job_failed(sql_session, task, e)
+            finally:
+                heartbeat.cancel()
+
+    async def _on_job_cancelled(self, sql_session: AsyncSession, task_id: str):
+        await sql_session.rollback()
+        task = await sql_session.get(AsyncPresentationGenerationTaskModel, task_id)
+        await sql_session.refresh(task)
+        if task.cancel_requested:
+            await self.queue.mark_cancelled(task_id)
+        # 否则租约已被其他worker接管，由新的持有者继续执行
+
+    async def _on_job_failed(
+        self,
+        sql_session: AsyncSession,
+        task: AsyncPresentationGenerationTaskModel,
+        e: Exception,
+    ):
+        await sql_session.rollback()
+        await sql_session.refresh(task)
+        if task.attempts < task.max_attempts and is_retryable_error(e):
+            error = {"type": type(e).__name__, "detail": getattr(e, "detail", str(e))}
+            print(f"Generation task {task.id} failed, retrying: {error}")
+            await self.queue.schedule_retry(sql_session, task, error)
+            return
+
+        await self._mark_failed(sql_session, task, e)
+
+    async def _mark_failed(
+        self,
+        sql_session: AsyncSession,
+        task: AsyncPresentationGenerationTaskModel,
+        e: Exception,
+    ):
+        error = {"type": type(e).__name__, "detail": getattr(e, "detail", str(e))}
+        if self._on_failure:
+            error = await self._on_failure(task, e) or error
+        await self.queue.mark_failed(sql_session, task, error)
+
+
+GENERATION_JOB_QUEUE = GenerationJobQueue(async_session_maker)
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import select
+
+from models.sql.generation_lease import GenerationLeaseModel
+from services.database import async_session_maker
+from services.redis_service import REDIS_SERVICE
+
+
+# 仅当租约仍属于 owner 时续约/释放
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class GenerationLeaseService:
+    """
+    跨worker的生成过程租约，保证同一演示文稿同一时间只在一个worker上生成。
+    配置 REDIS_URL 时使用 SET NX PX，否则使用数据库表 generation_leases（条件UPDATE + 主键冲突）。
+    持有者需在 TTL_SECONDS 内续约，worker崩溃后租约过期即可被其他worker获取。
+    """
+
+    TTL_SECONDS = 60
+
+    def __init__(self, session_maker: async_sessionmaker):
+        self._session_maker = session_maker
+
+    def _redis_key(self, name: str) -> str:
+        return f"presenton:leases:{name}"
+
+    async def acquire(self, name: str, owner: str) -> bool:
+        if REDIS_SERVICE.enabled:
+            return bool(
+                await REDIS_SERVICE.client.set(
+                    self._redis_key(name),
+                    owner,
+                    nx=True,
+                    px=self.TTL_SECONDS * 1000,
+                )
+            )
+
+        Lease = GenerationLeaseModel
+        async with self._session_maker() as sql_session:
+            now = datetime.now()
+            expires_at = now + timedelta(seconds=self.TTL_SECONDS)
+            # 接管已过期的租约
+            result = await sql_session.execute(
+                update(Lease)
+                .where(Lease.name == name, Lease.expires_at < now)
+                .values(owner=owner, expires_at=expires_at)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                await sql_session.commit()
+                return True
+            sql_session.add(Lease(name=name, owner=owner, expires_at=expires_at))
+            try:
+                await sql_session.commit()
+            except IntegrityError:
+                await sql_session.rollback()
+                return False
+            return True
+
+    async def renew(self, name: str, owner: str) -> bool:
+        if REDIS_SERVICE.enabled:
+            return bool(
+                await REDIS_SERVICE.client.eval(
+                    _RENEW_SCRIPT,
+                    1,
+                    self._redis_key(name),
+                    owner,
+                    self.TTL_SECONDS * 1000,
+                )
+            )
+
+        Lease = GenerationLeaseModel
+        async with self._session_maker() as sql_session:
+            result = await sql_session.execute(
+                update(Lease)
+                .where(Lease.name == name, Lease.owner == owner)
+                .values(expires_at=datetime.now() + timedelta(seconds=self.TTL_SECONDS))
+                .execution_options(synchronize_session=False)
+            )
+            await sql_session.commit()
+            return result.rowcount == 1
+
+    async def release(self, name: str, owner: str):
+        if REDIS_SERVICE.enabled:
+            await REDIS_SERVICE.client.eval(
+                _RELEASE_SCRIPT, 1, self._redis_key(name), owner
+            )
+            return
+
+        Lease = GenerationLeaseModel
+        async with self._session_maker() as sql_session:
+            await sql_session.execute(
+                delete(Lease).where(Lease.name == name, Lease.owner == owner)
+            )
+            await sql_session.commit()
+
+    async def is_held(self, name: str) -> bool:
+        if REDIS_SERVICE.enabled:
+            return bool(await REDIS_SERVICE.client.exists(self._redis_key(name)))
+
+        Lease = GenerationLeaseModel
+        async with self._session_maker() as sql_session:
+            expires_at = await sql_session.scalar(
+                select(Lease.expires_at).where(Lease.name == name)
+            )
+            return expires_at is not None and expires_at >= datetime.now()
+
+
+GENERATION_LEASE_SERVICE = GenerationLeaseService(async_session_maker)
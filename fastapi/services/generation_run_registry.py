@@ -0,0 +1,272 @@
+import asyncio
+from collections import deque
+import os
+import socket
+import time
+import traceback
+from typing import (
+    AsyncGenerator,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    Optional,
+    Tuple,
+)
+import uuid
+
+from models.sse_response import SSEErrorResponse, SSEStatusResponse
+from services.generation_lease_service import (
+    GENERATION_LEASE_SERVICE,
+    GenerationLeaseService,
+)
+from services.metrics_service import METRICS_SERVICE
+from utils.get_env import (
+    get_generation_detach_cancel_seconds_env,
+    get_generation_event_buffer_size_env,
+)
+from utils.parsers import parse_float_or_none, parse_int_or_none
+
+
+EventsFactory = Callable[[], AsyncGenerator[str, None]]
+
+
+def parse_last_event_id(last_event_id: Optional[str]) -> Optional[int]:
+    if last_event_id is None:
+        return None
+    return parse_int_or_none(last_event_id.strip())
+
+
+class GenerationRun:
+    """一次生成过程：独立于HTTP连接执行，输出的SSE事件编号后写入环形缓冲区"""
+
+    def __init__(self, key: Hashable, buffer_size: int):
+        self.key = key
+        self.events: Deque[Tuple[int, str]] = deque(maxlen=buffer_size)
+        self.last_event_id = 0
+        self.n_listeners = 0
+        self.task: Optional[asyncio.Task] = None
+        self.finished_at: Optional[float] = None
+        self._changed = asyncio.Event()
+        self._cancel_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def done(self) -> bool:
+        return self.task is not None and self.task.done()
+
+    def append(self, data: str):
+        self.last_event_id += 1
+        self.events.append((self.last_event_id, data))
+        self._notify()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def listen(
+        self, last_event_id: int, on_detached: Callable[["GenerationRun"], None]
+    ) -> AsyncGenerator[str, None]:
+        """回放 last_event_id 之后的事件，然后持续推送新事件直到生成结束"""
+        self.n_listeners += 1
+        if self._cancel_handle is not None:
+            self._cancel_handle.cancel()
+            self._cancel_handle = None
+        try:
+            while True:
+                changed = self._changed
+                for event_id, data in list(self.events):
+                    if event_id > last_event_id:
+                        last_event_id = event_id
+                        yield f"id: {event_id}\n{data}"
+                if self.done and last_event_id >= self.last_event_id:
+                    return
+                try:
+                    await asyncio.wait_for(changed.wait(), 15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            self.n_listeners -= 1
+            if self.n_listeners == 0:
+                on_detached(self)
+
+
+class GenerationRunRegistry:
+    """
+    按键（例如 ("presentation", id)）管理进程内的生成过程，使生成与HTTP流解耦：
+    - 客户端断开后生成继续执行，事件保存在环形缓冲区（GENERATION_EVENT_BUFFER_SIZE，默认2000）
+    - 客户端携带 Last-Event-ID 重连时回放错过的事件；生成仍在进行时，
+      不带 Last-Event-ID 的新连接（例如刷新页面）从头回放而不是重复生成
+    - 配置 GENERATION_DETACH_CANCEL_SECONDS 时，没有任何连接超过该时长后取消生成以节省LLM调用
+    - 结束的生成保留 RETENTION_SECONDS 秒，供断开的客户端取回最后的事件
+    - 配置 lease_service 时，开始生成前先获取跨worker租约；同一键已在其他worker上生成时
+      不重复生成，而是等待对方释放租约后通过 remote_result_factory 从数据库返回结果
+    """
+
+    RETENTION_SECONDS = 60
+    REMOTE_POLL_SECONDS = 2
+
+    def __init__(self, lease_service: Optional[GenerationLeaseService] = None):
+        self._runs: Dict[Hashable, GenerationRun] = {}
+        self._lease_service = lease_service
+        self.owner_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        METRICS_SERVICE.register_collector("generation_runs", self.get_stats)
+
+    @property
+    def buffer_size(self) -> int:
+        return parse_int_or_none(get_generation_event_buffer_size_env()) or 2000
+
+    @property
+    def detach_cancel_seconds(self) -> Optional[float]:
+        return parse_float_or_none(get_generation_detach_cancel_seconds_env())
+
+    def get(self, key: Hashable) -> Optional[GenerationRun]:
+        return self._runs.get(key)
+
+    def attach(
+        self,
+        key: Hashable,
+        events_factory: EventsFactory,
+        last_event_id: Optional[str] = None,
+        remote_result_factory: Optional[EventsFactory] = None,
+    ) -> AsyncGenerator[str, None]:
+        """
+        连接到 key 对应的生成过程，不存在（或已结束且不是断线重连）时用 events_factory 开始新的生成。
+        remote_result_factory 用于该键正在其他worker上生成的情况，在对方结束后输出结果事件。
+        返回推送给客户端的SSE字符串流
+        """
+        resume_from = parse_last_event_id(last_event_id)
+        run = self._runs.get(key)
+        if run is None or (run.done and resume_from is None):
+            run = self.start(key, events_factory, remote_result_factory)
+            resume_from = 0
+        else:
+            METRICS_SERVICE.increment("generation_runs.reattached")
+        return run.listen(resume_from or 0, self._on_detached)
+
+    def start(
+        self,
+        key: Hashable,
+        events_factory: EventsFactory,
+        remote_result_factory: Optional[EventsFactory] = None,
+    ) -> GenerationRun:
+        previous = self._runs.get(key)
+        if previous is not None and not previous.done:
+            previous.task.cancel()
+        # 先同步登记再异步获取租约，同一进程内的并发请求都会连接到这一个生成过程
+        run = GenerationRun(key, self.buffer_size)
+        run.task = asyncio.create_task(
+            self._run(run, events_factory, remote_result_factory)
+        )
+        self._runs[key] = run
+        return run
+
+    def _lease_name(self, key: Hashable) -> str:
+        if isinstance(key, tuple):
+            return ":".join(str(part) for part in key)
+        return str(key)
+
+    async def _run(
+        self,
+        run: GenerationRun,
+        events_factory: EventsFactory,
+        remote_result_factory: Optional[EventsFactory],
+    ):
+        lease_name = self._lease_name(run.key)
+        lease_keepalive: Optional[asyncio.Task] = None
+        try:
+            if self._lease_service is None:
+                source = events_factory()
+            elif await self._lease_service.acquire(lease_name, self.owner_id):
+                lease_keepalive = asyncio.create_task(self._keep_lease(lease_name, run))
+                source = events_factory()
+            else:
+                METRICS_SERVICE.increment("generation_runs.remote_attached")
+                source = self._follow_remote(lease_name, remote_result_factory)
+
+            async for data in source:
+                run.append(data)
+        except asyncio.CancelledError:
+            METRICS_SERVICE.increment("generation_runs.cancelled")
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            run.append(SSEErrorResponse(detail=str(e) or "Generation failed").to_string())
+        finally:
+            if lease_keepalive is not None:
+                lease_keepalive.cancel()
+                try:
+                    await self._lease_service.release(lease_name, self.owner_id)
+                except Exception:
+                    traceback.print_exc()
+            run.finished_at = time.monotonic()
+            run._notify()
+            asyncio.get_running_loop().call_later(
+                self.RETENTION_SECONDS, self._remove, run
+            )
+
+    async def _keep_lease(self, lease_name: str, run: GenerationRun):
+        """
+        定期续约；租约已被其他worker获取，或续约失败持续超过租约时长（租约可能已过期）时，
+        停止本地生成，避免两个worker同时生成并保存同一演示文稿
+        """
+        interval = max(self._lease_service.TTL_SECONDS / 3, 1)
+        renewed_at = time.monotonic()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                lost = not await self._lease_service.renew(lease_name, self.owner_id)
+                if not lost:
+                    renewed_at = time.monotonic()
+            except Exception:
+                traceback.print_exc()
+                lost = time.monotonic() - renewed_at >= self._lease_service.TTL_SECONDS
+            if lost:
+                print(f"Generation lease {lease_name} was lost, stopping generation")
+                METRICS_SERVICE.increment("generation_runs.lease_lost")
+                run.append(
+                    SSEErrorResponse(
+                        detail="Generation was interrupted, please try again"
+                    ).to_string()
+                )
+                run.task.cancel()
+                return
+
+    async def _follow_remote(
+        self, lease_name: str, remote_result_factory: Optional[EventsFactory]
+    ) -> AsyncGenerator[str, None]:
+        """等待其他worker上的生成结束，再输出保存在数据库中的结果"""
+        yield SSEStatusResponse(
+            status="Generation is already in progress, waiting for it to finish..."
+        ).to_string()
+        while await self._lease_service.is_held(lease_name):
+            await asyncio.sleep(self.REMOTE_POLL_SECONDS)
+        if remote_result_factory is not None:
+            async for data in remote_result_factory():
+                yield data
+
+    def _remove(self, run: GenerationRun):
+        if self._runs.get(run.key) is run:
+            self._runs.pop(run.key)
+
+    def _on_detached(self, run: GenerationRun):
+        grace = self.detach_cancel_seconds
+        if grace is None or run.done:
+            return
+        run._cancel_handle = asyncio.get_running_loop().call_later(
+            grace, self._cancel_if_detached, run
+        )
+
+    def _cancel_if_detached(self, run: GenerationRun):
+        run._cancel_handle = None
+        if run.n_listeners == 0 and not run.done:
+            print(f"Cancelling generation {run.key}: no listeners")
+            run.task.cancel()
+
+    def get_stats(self) -> dict:
+        return {
+            "running": sum(1 for run in self._runs.values() if not run.done),
+            "listeners": sum(run.n_listeners for run in self._runs.values()),
+        }
+
+
+GENERATION_RUN_REGISTRY = GenerationRunRegistry(GENERATION_LEASE_SERVICE)
@@ -0,0 +1,434 @@
+import asyncio
+import copy
+from datetime import datetime, timedelta
+import os
+import random
+import socket
+import traceback
+from typing import List, Optional, Set
+import uuid
+
+from sqlalchemy import and_, delete, func, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlmodel import select
+
+from constants.presentation import PLACEHOLDER_IMAGE_URL
+from models.image_prompt import ImagePrompt
+from models.sql.image_asset import ImageAsset
+from models.sql.image_backfill_job import ImageBackfillJobModel
+from models.sql.presentation import PresentationModel
+from models.sql.slide import SlideModel
+from services.database import async_session_maker
+from services.image_generation_service import ImageGenerationService
+from services.llm_rate_limiter import LLM_RATE_LIMITER
+from services.metrics_service import METRICS_SERVICE
+from services.task_event_bus import TASK_EVENT_BUS, get_presentation_assets_topic
+from utils.asset_directory_utils import (
+    get_image_url_from_asset_path,
+    get_images_directory,
+)
+from utils.credential_crypto import decrypt_credential, encrypt_credential
+from utils.dict_utils import (
+    get_dict_at_path,
+    get_dict_paths_with_key,
+    json_path_to_list,
+    list_to_json_path,
+)
+from utils.get_env import (
+    get_image_backfill_concurrency_env,
+    get_image_backfill_max_attempts_env,
+)
+from utils.parsers import parse_int_or_none
+from utils.slide_persistence import compute_slide_content_hash
+
+
+ACTIVE_BACKFILL_STATUSES = ("pending", "running")
+
+
+def get_placeholder_image_paths(content: dict) -> List[List[str | int]]:
+    """幻灯片内容中仍为占位图、且有图片提示词的图片路径"""
+    paths = []
+    for path in get_dict_paths_with_key(content, "__image_prompt__"):
+        image_dict = get_dict_at_path(content, path)
+        if (
+            image_dict.get("__image_prompt__")
+            and image_dict.get("__image_url__") == PLACEHOLDER_IMAGE_URL
+        ):
+            paths.append(json_path_to_list(path))
+    return paths
+
+
+class ImageBackfillQueue:
+    """
+    占位图补全队列：图片生成失败时幻灯片先使用占位图完成，
+    每张占位图记录为一个任务，由 ImageBackfillWorker 按指数退避重试，
+    成功后写回幻灯片内容并通知正在编辑该演示文稿的客户端。
+    任务领取方式与 GenerationJobQueue 相同（条件UPDATE + 租约），可由多个worker并发处理。
+    """
+
+    LEASE_SECONDS = 300
+    INITIAL_DELAY_SECONDS = 10
+
+    def __init__(self, session_maker: async_sessionmaker):
+        self._session_maker = session_maker
+
+    @property
+    def max_attempts(self) -> int:
+        return parse_int_or_none(get_image_backfill_max_attempts_env()) or 5
+
+    async def enqueue_slides(
+        self,
+        sql_session: AsyncSession,
+        presentation_id: uuid.UUID,
+        slides: List[SlideModel],
+        api_key: Optional[str],
+        image_model: Optional[dict],
+    ) -> int:
+        """
+        为幻灯片中的占位图创建补全任务，并作废该演示文稿中已不存在的幻灯片的任务。
+        调用方负责提交事务，返回创建的任务数
+        """
+        await sql_session.execute(
+            delete(ImageBackfillJobModel).where(
+                ImageBackfillJobModel.presentation_id == presentation_id,
+                ImageBackfillJobModel.status == "pending",
+                ImageBackfillJobModel.slide_id.not_in([slide.id for slide in slides]),
+            )
+        )
+        now = datetime.now()
+        encrypted_api_key = encrypt_credential(api_key)
+        jobs = []
+        for slide in slides:
+            for path in get_placeholder_image_paths(slide.content):
+                image_dict = get_dict_at_path(slide.content, list_to_json_path(path))
+                jobs.append(
+                    ImageBackfillJobModel(
+                        presentation_id=presentation_id,
+                        slide_id=slide.id,
+                        path=path,
+                        prompt=image_dict["__image_prompt__"],
+                        image_model=image_model,
+                        api_key=encrypted_api_key,
+                        max_attempts=self.max_attempts,
+                        # 刚刚失败的请求立即重试大概率仍会失败
+                        available_at=now + timedelta(seconds=self.INITIAL_DELAY_SECONDS),
+                    )
+                )
+        sql_session.add_all(jobs)
+        return len(jobs)
+
+    def _claimable_condition(self, now: datetime):
+        Job = ImageBackfillJobModel
+        return or_(
+            and_(Job.status == "pending", Job.available_at <= now),
+            and_(
+                Job.status == "running",
+                Job.lease_expires_at < now,
+                Job.attempts < Job.max_attempts,
+            ),
+        )
+
+    async def fail_exhausted(self) -> int:
+        """
+        将执行次数已用尽且租约已过期（worker在执行中崩溃）的任务标记为失败，
+        这些任务不会再被领取，返回标记的任务数
+        """
+        Job = ImageBackfillJobModel
+        async with self._session_maker() as sql_session:
+            now = datetime.now()
+            exhausted = (
+                await sql_session.execute(
+                    select(Job.id, Job.presentation_id).where(
+                        Job.status == "running",
+                        Job.lease_expires_at < now,
+                        Job.attempts >= Job.max_attempts,
+                    )
+                )
+            ).all()
+            if not exhausted:
+                return 0
+            await sql_session.execute(
+                update(Job)
+                .where(
+                    Job.id.in_([job_id for job_id, _ in exhausted]),
+                    Job.status == "running",
+                )
+                .values(
+                    status="failed",
+                    error="Image backfill was interrupted too many times",
+                    api_key=None,
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await sql_session.commit()
+        METRICS_SERVICE.increment("image_backfill.failed", len(exhausted))
+        for presentation_id in {presentation_id for _, presentation_id in exhausted}:
+            await self._update_presentation_fill_in(presentation_id)
+        return len(exhausted)
+
+    async def claim(self, worker_id: str) -> Optional[ImageBackfillJobModel]:
+        Job = ImageBackfillJobModel
+        async with self._session_maker() as sql_session:
+            now = datetime.now()
+            candidate_ids = await sql_session.scalars(
+                select(Job.id)
+                .where(self._claimable_condition(now))
+                .order_by(Job.available_at)
+                .limit(5)
+            )
+            for job_id in list(candidate_ids):
+                now = datetime.now()
+                result = await sql_session.execute(
+                    update(Job)
+                    .where(Job.id == job_id, self._claimable_condition(now))
+                    .values(
+                        status="running",
+                        lease_owner=worker_id,
+                        lease_expires_at=now + timedelta(seconds=self.LEASE_SECONDS),
+                        attempts=Job.attempts + 1,
+                        updated_at=now,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await sql_session.commit()
+                if result.rowcount == 1:
+                    return await sql_session.get(Job, job_id)
+        return None
+
+    def get_retry_delay(self, attempts: int) -> float:
+        # 指数退避 + 抖动：30s, 60s, 120s ... 最长30分钟
+        delay = min(30 * (2 ** max(attempts - 1, 0)), 1800)
+        return delay + random.uniform(0, delay / 4)
+
+    async def complete(
+        self, job: ImageBackfillJobModel, url: str, asset: Optional[ImageAsset]
+    ):
+        """将生成的图片写回幻灯片；幻灯片已删除或该图片已被修改时放弃写入"""
+        async with self._session_maker() as sql_session:
+            slide = await self._patch_slide_image(sql_session, job, url)
+            status = "completed" if slide else "skipped"
+            if slide and asset is not None:
+                sql_session.add(asset)
+            await self._finish(sql_session, job, status)
+            await sql_session.commit()
+
+        if slide:
+            METRICS_SERVICE.increment("image_backfill.completed")
+            await TASK_EVENT_BUS.publish(
+                get_presentation_assets_topic(job.presentation_id),
+                {
+                    "type": "asset",
+                    "slide_id": str(slide.id),
+                    "slide_index": slide.index,
+                    "asset_type": "image",
+                    "path": job.path,
+                    "url": url,
+                },
+            )
+        await self._update_presentation_fill_in(job.presentation_id)
+
+    async def _patch_slide_image(
+        self, sql_session: AsyncSession, job: ImageBackfillJobModel, url: str
+    ) -> Optional[SlideModel]:
+        # 以内容哈希做比较并交换，避免覆盖同时发生的编辑或同一幻灯片其他图片的写入
+        for _ in range(3):
+            slide = await sql_session.get(SlideModel, job.slide_id)
+            if slide is None:
+                return None
+            # 通过条件UPDATE写入，不由会话跟踪该对象的修改；下一次循环重新读取
+            sql_session.expunge(slide)
+            content = copy.deepcopy(slide.content)
+            try:
+                image_dict = get_dict_at_path(content, list_to_json_path(job.path))
+            except (KeyError, IndexError, TypeError):
+                return None
+            if (
+                not isinstance(image_dict, dict)
+                or image_dict.get("__image_prompt__") != job.prompt
+                or image_dict.get("__image_url__") != PLACEHOLDER_IMAGE_URL
+            ):
+                return None
+
+            image_dict["__image_url__"] = url
+            previous_hash = slide.content_hash
+            slide.content = content
+            content_hash = compute_slide_content_hash(slide)
+            result = await sql_session.execute(
+                update(SlideModel)
+                .where(
+                    SlideModel.id == slide.id,
+                    (
+                        SlideModel.content_hash == previous_hash
+                        if previous_hash
+                        else SlideModel.content_hash.is_(None)
+                    ),
+                )
+                .values(content=content, content_hash=content_hash)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                return slide
+        return None
+
+    async def fail(self, job: ImageBackfillJobModel, error: str):
+        async with self._session_maker() as sql_session:
+            if job.attempts < job.max_attempts:
+                METRICS_SERVICE.increment("image_backfill.retries")
+                now = datetime.now()
+                await sql_session.execute(
+                    update(ImageBackfillJobModel)
+                    .where(ImageBackfillJobModel.id == job.id)
+                    .values(
+                        status="pending",
+                        error=error,
+                        lease_owner=None,
+                        lease_expires_at=None,
+                        available_at=now
+                        + timedelta(seconds=self.get_retry_delay(job.attempts)),
+                        updated_at=now,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await sql_session.commit()
+                return
+
+            METRICS_SERVICE.increment("image_backfill.failed")
+            await self._finish(sql_session, job, "failed", error)
+            await sql_session.commit()
+        await self._update_presentation_fill_in(job.presentation_id)
+
+    async def _finish(
+        self,
+        sql_session: AsyncSession,
+        job: ImageBackfillJobModel,
+        status: str,
+        error: Optional[str] = None,
+    ):
+        await sql_session.execute(
+            update(ImageBackfillJobModel)
+            .where(ImageBackfillJobModel.id == job.id)
+            .values(
+                status=status,
+                error=error,
+                api_key=None,
+                lease_owner=None,
+                lease_expires_at=None,
+                updated_at=datetime.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _update_presentation_fill_in(self, presentation_id: uuid.UUID):
+        """演示文稿的补全任务全部结束后清除 needs_fill_in 标记"""
+        async with self._session_maker() as sql_session:
+            n_active = await sql_session.scalar(
+                select(func.count())
+                .select_from(ImageBackfillJobModel)
+                .where(
+                    ImageBackfillJobModel.presentation_id == presentation_id,
+                    ImageBackfillJobModel.status.in_(ACTIVE_BACKFILL_STATUSES),
+                )
+            )
+            if n_active:
+                return
+            result = await sql_session.execute(
+                update(PresentationModel)
+                .where(
+                    PresentationModel.id == presentation_id,
+                    PresentationModel.needs_fill_in == True,
+                )
+                .values(needs_fill_in=False)
+                .execution_options(synchronize_session=False)
+            )
+            await sql_session.commit()
+        if result.rowcount:
+            await TASK_EVENT_BUS.publish(
+                get_presentation_assets_topic(presentation_id),
+                {"type": "fill_in_completed", "presentation_id": str(presentation_id)},
+            )
+
+
+class ImageBackfillWorker:
+    """
+    从 ImageBackfillQueue 领取并重试图片生成。
+    与生成任务worker一起运行：本地模式在Web进程内，外部模式在 worker.py 中。
+    图片请求经过共享限流器，与同一密钥和模型的其他请求共用并发上限。
+    """
+
+    def __init__(
+        self,
+        queue: ImageBackfillQueue,
+        concurrency: Optional[int] = None,
+        poll_interval: float = 5.0,
+    ):
+        self.queue = queue
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.concurrency = (
+            concurrency
+            or parse_int_or_none(get_image_backfill_concurrency_env())
+            or 2
+        )
+        self.poll_interval = poll_interval
+        self._slots: Set[asyncio.Task] = set()
+        self._stopping = False
+
+    def start(self):
+        self._stopping = False
+        for _ in range(self.concurrency):
+            slot = asyncio.create_task(self._slot_loop())
+            self._slots.add(slot)
+            slot.add_done_callback(self._slots.discard)
+
+    async def stop(self):
+        self._stopping = True
+        for slot in list(self._slots):
+            slot.cancel()
+        await asyncio.gather(*self._slots, return_exceptions=True)
+
+    async def _slot_loop(self):
+        while not self._stopping:
+            try:
+                job = await self.queue.claim(self.worker_id)
+                if job is None:
+                    await self.queue.fail_exhausted()
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                await self.run_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+                await asyncio.sleep(self.poll_interval)
+
+    async def run_job(self, job: ImageBackfillJobModel):
+        api_key = decrypt_credential(job.api_key)
+        image_generation_service = ImageGenerationService(
+            output_directory=get_images_directory(),
+            api_key=api_key,
+            model=job.image_model,
+        )
+        try:
+            async with asyncio.timeout(self.queue.LEASE_SECONDS / 2):
+                async with LLM_RATE_LIMITER.limit(
+                    api_key, image_generation_service.model["name"], 0
+                ):
+                    result = await image_generation_service.generate_image(
+                        ImagePrompt(prompt=job.prompt)
+                    )
+        except TimeoutError:
+            result = PLACEHOLDER_IMAGE_URL
+
+        if isinstance(result, ImageAsset):
+            await self.queue.complete(
+                job, get_image_url_from_asset_path(result.path), result
+            )
+        elif result and result != PLACEHOLDER_IMAGE_URL:
+            await self.queue.complete(job, result, None)
+        else:
+            await self.queue.fail(job, "Image generation returned a placeholder")
+
+
+IMAGE_BACKFILL_QUEUE = ImageBackfillQueue(async_session_maker)
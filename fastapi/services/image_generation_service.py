@@ -2,6 +2,7 @@ import asyncio
 import os
 import aiohttp
 from openai import api_key
+from constants.presentation import PLACEHOLDER_IMAGE_URL
 from models.image_prompt import ImagePrompt
 from models.sql.image_asset import ImageAsset
 from utils.download_helpers import download_file
@@ -66,7 +67,7 @@ class ImageGenerationService:
 
         except Exception as e:
             print(f"Error generating image: {e}")
-            return "/static/images/placeholder.jpg"
+            return PLACEHOLDER_IMAGE_URL
 
     async def _generate_image_google(self, prompt: str, output_directory: str) -> str:
         """使用Google的Gemini模型生成图像
@@ -94,7 +95,7 @@ class ImageGenerationService:
                 ) as response:
                     print(f"Response Status: {response.status}")
                     if response.status != 200:
-                        return "/static/images/placeholder.jpg"
+                        return PLACEHOLDER_IMAGE_URL
                     result = await response.json()
                     for idx, choice in enumerate(result["choices"]):
                         contents = choice["message"]["content"]
@@ -115,4 +116,4 @@ class ImageGenerationService:
                     return image_path
             except Exception as e:
                 print(f"Error generating image: {e}")
-                return "/static/images/placeholder.jpg"
\ No newline at end of file
+                return PLACEHOLDER_IMAGE_URL
\ No newline at end of file
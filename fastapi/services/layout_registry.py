@@ -0,0 +1,140 @@
+import asyncio
+from dataclasses import dataclass
+import time
+from typing import Dict, Optional
+import uuid
+
+import aiohttp
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlmodel import select
+
+from models.presentation_layout import PresentationLayoutModel
+from models.sql.presentation_layout_code import PresentationLayoutCodeModel
+from services.database import async_session_maker
+from services.metrics_service import METRICS_SERVICE
+from utils.get_env import get_layout_cache_revalidate_seconds_env
+from utils.parsers import parse_int_or_none
+
+
+CUSTOM_TEMPLATE_PREFIX = "custom-"
+
+
+@dataclass
+class CachedLayout:
+    layout: PresentationLayoutModel
+    # 自定义模板的版本（布局代码的数量、最大ID和最后修改时间），内置模板为None
+    version: Optional[str]
+    validated_at: float
+
+
+class LayoutRegistry:
+    """
+    模板布局注册表：按模板名缓存 PresentationLayoutModel，避免每次生成都请求Next.js渲染模板。
+
+    - 内置模板在运行期间不会变化，加载后一直使用缓存
+    - 自定义模板（custom-<presentation_id>）在保存/删除时主动失效；
+      超过 LAYOUT_CACHE_REVALIDATE_SECONDS 后查询数据库中布局代码的版本重新验证，
+      版本不变时不请求Next.js（渲染模板需要启动浏览器），覆盖其他worker进程修改模板的情况
+    - 同一模板的并发加载只发起一次请求
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, CachedLayout] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # 每次失效时递增，避免失效前发起的加载把旧数据写回缓存
+        self._versions: Dict[str, int] = {}
+
+    @property
+    def revalidate_seconds(self) -> int:
+        value = parse_int_or_none(get_layout_cache_revalidate_seconds_env())
+        return 300 if value is None else value
+
+    def _needs_revalidation(self, layout_name: str, entry: CachedLayout) -> bool:
+        if not layout_name.startswith(CUSTOM_TEMPLATE_PREFIX):
+            return False
+        return time.monotonic() - entry.validated_at >= self.revalidate_seconds
+
+    async def get(self, layout_name: str) -> PresentationLayoutModel:
+        entry = self._entries.get(layout_name)
+        if entry and not self._needs_revalidation(layout_name, entry):
+            METRICS_SERVICE.increment("layout_registry.hits")
+            # 返回副本，调用方可以自由修改
+            return entry.layout.model_copy(deep=True)
+
+        future = self._inflight.get(layout_name)
+        if future is None:
+            future = asyncio.ensure_future(self._load(layout_name, entry))
+            self._inflight[layout_name] = future
+            future.add_done_callback(
+                lambda done: self._inflight.get(layout_name) is done
+                and self._inflight.pop(layout_name)
+            )
+
+        layout = await asyncio.shield(future)
+        return layout.model_copy(deep=True)
+
+    async def _load(
+        self, layout_name: str, entry: Optional[CachedLayout]
+    ) -> PresentationLayoutModel:
+        invalidation_version = self._versions.get(layout_name, 0)
+        # 先读取版本再加载，加载期间发生的修改会在下一次重新验证时发现
+        version = await self._get_version(layout_name)
+
+        if entry and entry.version is not None and entry.version == version:
+            METRICS_SERVICE.increment("layout_registry.revalidated")
+            entry.validated_at = time.monotonic()
+            return entry.layout
+
+        layout = await self._fetch(layout_name)
+        METRICS_SERVICE.increment("layout_registry.misses")
+        if self._versions.get(layout_name, 0) == invalidation_version:
+            self._entries[layout_name] = CachedLayout(
+                layout=layout, version=version, validated_at=time.monotonic()
+            )
+        return layout
+
+    async def _get_version(self, layout_name: str) -> Optional[str]:
+        if not layout_name.startswith(CUSTOM_TEMPLATE_PREFIX):
+            return None
+        try:
+            presentation_id = uuid.UUID(layout_name[len(CUSTOM_TEMPLATE_PREFIX) :])
+        except ValueError:
+            return None
+
+        Layout = PresentationLayoutCodeModel
+        async with async_session_maker() as sql_session:
+            count, max_id, updated_at = (
+                await sql_session.execute(
+                    select(
+                        func.count(Layout.id),
+                        func.max(Layout.id),
+                        func.max(Layout.updated_at),
+                    ).where(Layout.presentation == presentation_id)
+                )
+            ).one()
+        return f"{count}:{max_id}:{updated_at}"
+
+    async def _fetch(self, layout_name: str) -> PresentationLayoutModel:
+        url = "http://localhost/api/template"
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url, params={"group": layout_name}) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise HTTPException(
+                        status_code=404,
+                        detail=f"Template '{layout_name}' not found: {error_text}"
+                    )
+                layout_json = await response.json()
+                return PresentationLayoutModel(**layout_json)
+
+    def invalidate(self, layout_name: str):
+        self._entries.pop(layout_name, None)
+        self._inflight.pop(layout_name, None)
+        self._versions[layout_name] = self._versions.get(layout_name, 0) + 1
+
+    def invalidate_custom_template(self, presentation_id) -> None:
+        self.invalidate(f"{CUSTOM_TEMPLATE_PREFIX}{presentation_id}")
+
+
+LAYOUT_REGISTRY = LayoutRegistry()
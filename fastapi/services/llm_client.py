@@ -1,7 +1,8 @@
 import asyncio
 import dirtyjson
+from functools import partial
 import json
-from typing import AsyncGenerator, List, Optional
+from typing import AsyncGenerator, Callable, List, Optional
 from fastapi import HTTPException
 from openai import AsyncOpenAI
 from openai.types.chat.chat_completion_chunk import (
@@ -39,7 +40,12 @@ from models.llm_tool_call import (
     OpenAIToolCallFunction,
 )
 from models.llm_tools import LLMDynamicTool, LLMTool
+from services.llm_rate_limiter import LLM_RATE_LIMITER, estimate_tokens
+from services.llm_request_hedger import LLM_REQUEST_HEDGER
+from services.llm_response_cache import LLM_RESPONSE_CACHE
 from services.llm_tool_calls_handler import LLMToolCallsHandler
+from services.llm_usage_metrics import record_prompt_cache_usage
+from services.user_config_service import USER_CONFIG_SERVICE
 from utils.async_iterator import iterator_to_async
 from utils.dummy_functions import do_nothing_async
 from utils.get_env import (
@@ -49,20 +55,41 @@ from utils.get_env import (
     get_disable_thinking_env,
     get_comparegpt_api_url_env,
     get_google_api_key_env,
+    get_llm_prompt_cache_control_env,
     get_ollama_url_env,
     get_openai_api_key_env,
-    get_tool_calls_env,
     get_web_grounding_env,
 )
 from utils.llm_provider import get_model
 from utils.parsers import parse_bool_or_none
 from utils.schema_utils import (
-    ensure_strict_json_schema,
     flatten_json_schema,
     remove_titles_from_schema,
+    to_strict_json_schema,
 )
 
 
+def serialize_messages(messages: List[LLMMessage]) -> List[dict]:
+    """
+    转换为请求参数。配置 LLM_PROMPT_CACHE_CONTROL 时，标记为 cacheable 的消息
+    以带 cache_control 的内容块发送，供支持显式缓存控制的服务商缓存提示词前缀
+    """
+    use_cache_control = parse_bool_or_none(get_llm_prompt_cache_control_env())
+    serialized = []
+    for message in messages:
+        data = message.model_dump()
+        if use_cache_control and getattr(message, "cacheable", False):
+            data["content"] = [
+                {
+                    "type": "text",
+                    "text": message.content,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ]
+        serialized.append(data)
+    return serialized
+
+
 class LLMClient:
     def __init__(self, api_key: str):
         self.api_key = api_key
@@ -71,7 +98,7 @@ class LLMClient:
 
     # ? Use tool calls
     def use_tool_calls_for_structured_output(self) -> bool:
-        return parse_bool_or_none(get_tool_calls_env()) or False
+        return USER_CONFIG_SERVICE.snapshot.TOOL_CALLS or False
 
     # Compare GPT Client
     def _get_client(self, api_key: str):
@@ -98,13 +125,20 @@ class LLMClient:
         depth: int = 0,
     ) -> str | None:
         client: AsyncOpenAI = self._client
-        response = await client.chat.completions.create(
-            model=model,
-            messages=[message.model_dump() for message in messages],
-            max_completion_tokens=max_tokens,
-            tools=tools,
-            extra_body=extra_body,
+        response = await LLM_RATE_LIMITER.run(
+            self.api_key,
+            model,
+            estimate_tokens(messages, max_tokens),
+            partial(
+                client.chat.completions.create,
+                model=model,
+                messages=serialize_messages(messages),
+                max_completion_tokens=max_tokens,
+                tools=tools,
+                extra_body=extra_body,
+            ),
         )
+        record_prompt_cache_usage(getattr(response, "usage", None))
         tool_calls = response.choices[0].message.tool_calls
         if tool_calls:
             parsed_tool_calls = [
@@ -186,11 +220,7 @@ class LLMClient:
             self.use_tool_calls_for_structured_output()
         )
         if strict and depth == 0:
-            response_schema = ensure_strict_json_schema(
-                response_schema,
-                path=(),
-                root=response_schema,
-            )
+            response_schema = to_strict_json_schema(response_schema)
         if use_tool_calls_for_structured_output and depth == 0:
             if all_tools is None:
                 all_tools = []
@@ -206,28 +236,41 @@ class LLMClient:
                 )
             )
 
-        response = await client.chat.completions.create(
-            model=model,
-            messages=[message.model_dump() for message in messages],
-            response_format=(
-                {
-                    "type": "json_schema",
-                    "json_schema": (
+        # 在限流名额内执行对冲：开启请求对冲时，上游请求超过该模型p90延迟未返回会再发送一次，
+        # 取先返回的结果；排队等待名额和429退避的时间不计入延迟，也不会触发对冲
+        response = await LLM_RATE_LIMITER.run(
+            self.api_key,
+            model,
+            estimate_tokens(messages, max_tokens),
+            partial(
+                LLM_REQUEST_HEDGER.run,
+                model,
+                partial(
+                    client.chat.completions.create,
+                    model=model,
+                    messages=serialize_messages(messages),
+                    response_format=(
                         {
-                            "name": "ResponseSchema",
-                            "strict": strict,
-                            "schema": response_schema,
+                            "type": "json_schema",
+                            "json_schema": (
+                                {
+                                    "name": "ResponseSchema",
+                                    "strict": strict,
+                                    "schema": response_schema,
+                                }
+                            ),
                         }
+                        if not use_tool_calls_for_structured_output
+                        else None
                     ),
-                }
-                if not use_tool_calls_for_structured_output
-                else None
+                    max_completion_tokens=max_tokens,
+                    tools=all_tools,
+                    extra_body=extra_body,
+                    stream=False
+                ),
             ),
-            max_completion_tokens=max_tokens,
-            tools=all_tools,
-            extra_body=extra_body,
-            stream=False
         )
+        record_prompt_cache_usage(getattr(response, "usage", None))
 
         content = None
         tool_calls = None
@@ -293,28 +336,80 @@ class LLMClient:
         strict: bool = False,
         tools: Optional[List[type[LLMTool] | LLMDynamicTool]] = None,
         max_tokens: Optional[int] = None,
+        on_chunk: Optional[Callable[[str], None]] = None,
     ) -> dict:
+        """
+        生成结构化输出。传入 on_chunk 时以流式请求生成，每收到一块文本即回调，
+        调用方可据此增量展示；返回值与非流式请求相同（命中缓存时不会回调）
+        """
         if model is None or "name" not in model or not model["name"]:
             model = {"name": get_comparegpt_api_model_env()}
         parsed_tools = self.tool_calls_handler.parse_tools(tools)
 
+        cache_key = None
+        if LLM_RESPONSE_CACHE.enabled:
+            cache_key = LLM_RESPONSE_CACHE.build_key(
+                model["name"], messages, response_format, strict, parsed_tools
+            )
+            cached_content = await LLM_RESPONSE_CACHE.get(cache_key)
+            if cached_content is not None:
+                return cached_content
+
         # 统一使用comparegpt客户端（兼容OpenAI SDK）
-        content = await self._generate_openai_structured(
-            model=model["name"],
-            messages=messages,
-            response_format=response_format,
-            strict=strict,
-            tools=parsed_tools,
-            max_tokens=max_tokens,
-        )
+        if on_chunk is None:
+            content = await self._generate_openai_structured(
+                model=model["name"],
+                messages=messages,
+                response_format=response_format,
+                strict=strict,
+                tools=parsed_tools,
+                max_tokens=max_tokens,
+            )
+        else:
+            content = await self._collect_openai_structured_stream(
+                model=model["name"],
+                messages=messages,
+                response_format=response_format,
+                strict=strict,
+                tools=parsed_tools,
+                max_tokens=max_tokens,
+                on_chunk=on_chunk,
+            )
 
         if content is None:
             raise HTTPException(
                 status_code=400,
                 detail="LLM did not return any content",
             )
+        if cache_key is not None:
+            await LLM_RESPONSE_CACHE.set(cache_key, model["name"], content)
         return content
 
+    async def _collect_openai_structured_stream(
+        self,
+        model: str,
+        messages: List[LLMMessage],
+        response_format: dict,
+        on_chunk: Callable[[str], None],
+        strict: bool = False,
+        tools: Optional[List[dict]] = None,
+        max_tokens: Optional[int] = None,
+    ) -> dict | None:
+        text = ""
+        async for chunk in self._stream_openai_structured(
+            model=model,
+            messages=messages,
+            response_format=response_format,
+            strict=strict,
+            tools=tools,
+            max_tokens=max_tokens,
+        ):
+            text += chunk
+            on_chunk(chunk)
+        if not text:
+            return None
+        return dict(dirtyjson.loads(text))
+
     # abandoned
     async def _stream_openai(
         self,
@@ -332,15 +427,22 @@ class LLMClient:
         current_id = None
         current_name = None
         current_arguments = None
-        async for event in await client.chat.completions.create(
-            model=model,
-            messages=[message.model_dump() for message in messages],
-            max_completion_tokens=max_tokens,
-            tools=tools,
-            extra_body=extra_body,
-            stream=True,
+        async for event in LLM_RATE_LIMITER.stream(
+            self.api_key,
+            model,
+            estimate_tokens(messages, max_tokens),
+            partial(
+                client.chat.completions.create,
+                model=model,
+                messages=serialize_messages(messages),
+                max_completion_tokens=max_tokens,
+                tools=tools,
+                extra_body=extra_body,
+                stream=True,
+            ),
         ):
             event: OpenAIChatCompletionChunk = event
+            record_prompt_cache_usage(getattr(event, "usage", None))
             if not event.choices:
                 continue
 
@@ -452,11 +554,7 @@ class LLMClient:
             self.use_tool_calls_for_structured_output()
         )
         if strict and depth == 0:
-            response_schema = ensure_strict_json_schema(
-                response_schema,
-                path=(),
-                root=response_schema,
-            )
+            response_schema = to_strict_json_schema(response_schema)
 
         if use_tool_calls_for_structured_output and depth == 0:
             if all_tools is None:
@@ -481,29 +579,36 @@ class LLMClient:
 
         has_response_schema_tool_call = False
         
-        async for event in await client.chat.completions.create(
-            model=model,
-            messages=[message.model_dump() for message in messages],
-            response_format=(
-                {
-                    "type": "json_schema",
-                    "json_schema": (
-                        {
-                            "name": "ResponseSchema",
-                            "strict": strict,
-                            "schema": response_schema,
-                        }
-                    ),
-                }
-                if not use_tool_calls_for_structured_output
-                else None
+        async for event in LLM_RATE_LIMITER.stream(
+            self.api_key,
+            model,
+            estimate_tokens(messages, max_tokens),
+            partial(
+                client.chat.completions.create,
+                model=model,
+                messages=serialize_messages(messages),
+                response_format=(
+                    {
+                        "type": "json_schema",
+                        "json_schema": (
+                            {
+                                "name": "ResponseSchema",
+                                "strict": strict,
+                                "schema": response_schema,
+                            }
+                        ),
+                    }
+                    if not use_tool_calls_for_structured_output
+                    else None
+                ),
+                max_completion_tokens=max_tokens,
+                tools=all_tools,
+                extra_body=extra_body,
+                stream=True,
             ),
-            max_completion_tokens=max_tokens,
-            tools=all_tools,
-            extra_body=extra_body,
-            stream=True,
         ):
             event: OpenAIChatCompletionChunk = event
+            record_prompt_cache_usage(getattr(event, "usage", None))
             if not event.choices:
                 continue
 
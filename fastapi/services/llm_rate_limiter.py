@@ -0,0 +1,318 @@
+import asyncio
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+import hashlib
+import json
+import time
+from typing import (
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from openai import RateLimitError
+
+from services.metrics_service import METRICS_SERVICE
+from utils.get_env import (
+    get_llm_latency_target_seconds_env,
+    get_llm_max_concurrency_env,
+    get_llm_rate_limit_retries_env,
+    get_llm_rate_limit_rpm_env,
+    get_llm_rate_limit_tpm_env,
+)
+from utils.parsers import parse_float_or_none, parse_int_or_none
+
+
+# 发起LLM请求的用户，用于在等待队列中按用户轮转分配并发
+_rate_limit_user: ContextVar[Optional[str]] = ContextVar(
+    "llm_rate_limit_user", default=None
+)
+
+
+def set_llm_rate_limit_user(user_id: Optional[str]):
+    _rate_limit_user.set(user_id)
+
+
+def estimate_tokens(messages: List[Any], max_tokens: Optional[int] = None) -> int:
+    """粗略估算一次请求消耗的token数（约4个字符1个token），请求完成后按实际用量修正"""
+    serialized = json.dumps(
+        [
+            message.model_dump() if hasattr(message, "model_dump") else message
+            for message in messages
+        ],
+        ensure_ascii=False,
+        default=str,
+    )
+    return len(serialized) // 4 + (max_tokens or 1024)
+
+
+class TokenBucket:
+    """每分钟补充 capacity 个令牌的令牌桶"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._rate = capacity / 60
+        self._updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated_at) * self._rate
+        )
+        self._updated_at = now
+
+    async def acquire(self, amount: float):
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self._rate)
+
+    def adjust(self, delta: float):
+        """按实际用量修正（delta为正表示多消耗），最多透支一个周期的容量"""
+        self._refill()
+        self.tokens = max(-self.capacity, min(self.capacity, self.tokens - delta))
+
+
+class _LimiterState:
+    def __init__(self, max_concurrency: int, rpm: Optional[int], tpm: Optional[int]):
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        # 用户 -> 等待中的请求，按用户轮转唤醒
+        self.waiters: OrderedDict[Optional[str], Deque[asyncio.Future]] = OrderedDict()
+
+    @property
+    def n_waiting(self) -> int:
+        return sum(len(queue) for queue in self.waiters.values())
+
+    def has_capacity(self) -> bool:
+        return self.in_flight < max(1, int(self.limit))
+
+    def dispatch(self):
+        while self.waiters and self.has_capacity():
+            user, queue = next(iter(self.waiters.items()))
+            future = queue.popleft()
+            if queue:
+                # 该用户还有等待的请求，排到队尾，让其他用户先执行
+                self.waiters.move_to_end(user)
+            else:
+                self.waiters.pop(user)
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+
+class LLMRateLimitSlot:
+    """一次LLM请求占用的并发名额，退出时根据结果调整并发上限"""
+
+    def __init__(self, limiter: "LLMRateLimiter", key: Tuple[str, str], tokens: int):
+        self._limiter = limiter
+        self._key = key
+        self._estimated_tokens = tokens
+        self._started_at = 0.0
+        self.retry_after: Optional[float] = None
+
+    def record_usage(self, total_tokens: Optional[int]):
+        state = self._limiter._states.get(self._key)
+        if total_tokens is None or state is None or state.tokens is None:
+            return
+        state.tokens.adjust(total_tokens - self._estimated_tokens)
+
+    async def __aenter__(self):
+        await self._limiter._acquire(self._key, self._estimated_tokens)
+        self._started_at = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        latency = time.monotonic() - self._started_at
+        if isinstance(exc, RateLimitError):
+            self.retry_after = self._limiter._on_rate_limited(self._key, exc)
+        elif exc is None:
+            self._limiter._on_success(self._key, latency)
+        self._limiter._release(self._key)
+
+
+class LLMRateLimiter:
+    """
+    CompareGPT请求的共享限流器，按 (API密钥, 模型) 分别限流：
+    - LLM_RATE_LIMIT_RPM / LLM_RATE_LIMIT_TPM：每分钟请求数/token数的令牌桶（未设置时不限制）
+    - 并发上限按AIMD自适应：请求成功且延迟低于 LLM_LATENCY_TARGET_SECONDS 时缓慢增加，
+      延迟过高时小幅降低，收到429时减半并暂停该键的新请求，上限不超过 LLM_MAX_CONCURRENCY
+    - 超出并发上限的请求按用户轮转排队，单个用户的大量请求不会阻塞其他用户
+    """
+
+    MAX_STATES = 1000
+
+    def __init__(self):
+        self._states: OrderedDict[Tuple[str, str], _LimiterState] = OrderedDict()
+        METRICS_SERVICE.register_collector("llm_rate_limiter", self.get_stats)
+
+    @property
+    def max_concurrency(self) -> int:
+        return parse_int_or_none(get_llm_max_concurrency_env()) or 16
+
+    @property
+    def latency_target_seconds(self) -> float:
+        return parse_float_or_none(get_llm_latency_target_seconds_env()) or 90
+
+    @property
+    def max_retries(self) -> int:
+        value = parse_int_or_none(get_llm_rate_limit_retries_env())
+        return 3 if value is None else value
+
+    def _get_state(self, key: Tuple[str, str]) -> _LimiterState:
+        state = self._states.get(key)
+        if state is None:
+            state = _LimiterState(
+                self.max_concurrency,
+                parse_int_or_none(get_llm_rate_limit_rpm_env()),
+                parse_int_or_none(get_llm_rate_limit_tpm_env()),
+            )
+            self._states[key] = state
+            self._evict_idle_states()
+        return state
+
+    def _evict_idle_states(self):
+        for key in list(self._states.keys()):
+            if len(self._states) <= self.MAX_STATES:
+                return
+            state = self._states[key]
+            if state.in_flight == 0 and not state.waiters:
+                self._states.pop(key)
+
+    def limit(
+        self, api_key: Optional[str], model: str, estimated_tokens: int
+    ) -> LLMRateLimitSlot:
+        """
+        用法：
+            async with LLM_RATE_LIMITER.limit(api_key, model, tokens) as slot:
+                response = await client.chat.completions.create(...)
+                slot.record_usage(response.usage.total_tokens)
+        """
+        return LLMRateLimitSlot(self, (api_key or "", model), estimated_tokens)
+
+    async def run(
+        self,
+        api_key: Optional[str],
+        model: str,
+        estimated_tokens: int,
+        create: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """在限流下执行非流式请求，收到429时等待后重试"""
+        for attempt in range(self.max_retries + 1):
+            slot = self.limit(api_key, model, estimated_tokens)
+            try:
+                async with slot:
+                    response = await create()
+                    usage = getattr(response, "usage", None)
+                    slot.record_usage(getattr(usage, "total_tokens", None))
+                    return response
+            except RateLimitError:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(slot.retry_after or 2**attempt)
+
+    async def stream(
+        self,
+        api_key: Optional[str],
+        model: str,
+        estimated_tokens: int,
+        create: Callable[[], Awaitable[Any]],
+    ) -> AsyncGenerator[Any, None]:
+        """在限流下执行流式请求，整个流式输出期间占用并发名额"""
+        async with self.limit(api_key, model, estimated_tokens):
+            async for event in await create():
+                yield event
+
+    async def _acquire(self, key: Tuple[str, str], estimated_tokens: int):
+        state = self._get_state(key)
+        self._states.move_to_end(key)
+
+        if state.has_capacity() and not state.waiters:
+            state.in_flight += 1
+        else:
+            METRICS_SERVICE.increment("llm_rate_limiter.queued")
+            future = asyncio.get_running_loop().create_future()
+            state.waiters.setdefault(_rate_limit_user.get(), deque()).append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # 已分配名额但调用方被取消，归还名额
+                    self._release(key)
+                raise
+
+        try:
+            cooldown = state.cooldown_until - time.monotonic()
+            if cooldown > 0:
+                await asyncio.sleep(cooldown)
+            if state.requests is not None:
+                await state.requests.acquire(1)
+            if state.tokens is not None:
+                await state.tokens.acquire(estimated_tokens)
+        except BaseException:
+            self._release(key)
+            raise
+
+    def _release(self, key: Tuple[str, str]):
+        state = self._states.get(key)
+        if state is None:
+            return
+        state.in_flight = max(0, state.in_flight - 1)
+        state.dispatch()
+
+    def _on_success(self, key: Tuple[str, str], latency: float):
+        state = self._states.get(key)
+        if state is None:
+            return
+        if latency > self.latency_target_seconds:
+            state.limit = max(1.0, state.limit * 0.9)
+        else:
+            state.limit = min(state.max_concurrency, state.limit + 1 / state.limit)
+
+    def _on_rate_limited(self, key: Tuple[str, str], error: RateLimitError) -> float:
+        METRICS_SERVICE.increment("llm_rate_limiter.rate_limited")
+        retry_after = _get_retry_after(error) or 1.0
+        state = self._states.get(key)
+        if state is not None:
+            state.limit = max(1.0, state.limit / 2)
+            state.cooldown_until = max(
+                state.cooldown_until, time.monotonic() + retry_after
+            )
+        return retry_after
+
+    def get_stats(self) -> Dict[str, dict]:
+        stats = {}
+        for (api_key, model), state in self._states.items():
+            # 不导出API密钥本身
+            key_hash = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:8]
+            stats[f"{model}:{key_hash}"] = {
+                "limit": round(state.limit, 2),
+                "in_flight": state.in_flight,
+                "waiting": state.n_waiting,
+            }
+        return stats
+
+
+def _get_retry_after(error: RateLimitError) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    return parse_float_or_none(response.headers.get("retry-after"))
+
+
+LLM_RATE_LIMITER = LLMRateLimiter()
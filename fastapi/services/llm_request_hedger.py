@@ -0,0 +1,124 @@
+import asyncio
+from collections import OrderedDict, deque
+import math
+import time
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from services.metrics_service import METRICS_SERVICE
+from utils.get_env import (
+    get_llm_hedge_budget_percent_env,
+    get_llm_hedge_requests_env,
+)
+from utils.parsers import parse_bool_or_none, parse_float_or_none
+
+
+class LatencyTracker:
+    """记录最近 max_samples 次成功请求的延迟，样本不足 min_samples 时不提供分位数"""
+
+    def __init__(self, max_samples: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=max_samples)
+
+    def record(self, latency: float):
+        self._samples.append(latency)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        samples = sorted(self._samples)
+        index = min(len(samples) - 1, math.ceil(percent / 100 * len(samples)) - 1)
+        return samples[index]
+
+
+class LLMRequestHedger:
+    """
+    LLM请求对冲：请求在该模型最近的p90延迟内未返回时，再发送一个相同的请求，
+    采用先成功返回的结果并取消另一个。
+    只包装上游请求本身（在已获取的限流名额内调用），排队和429退避时间不计入延迟。
+    - LLM_HEDGE_REQUESTS：是否开启（默认关闭）
+    - LLM_HEDGE_BUDGET_PERCENT：对冲请求占最近请求数的比例上限（默认5%）
+    """
+
+    WINDOW_SIZE = 1000
+    MAX_MODELS = 100
+
+    def __init__(self):
+        self._trackers: OrderedDict[str, LatencyTracker] = OrderedDict()
+        # 最近的请求是否发送了对冲请求，用于计算对冲预算
+        self._recent_requests: Deque[bool] = deque(maxlen=self.WINDOW_SIZE)
+        METRICS_SERVICE.register_collector("llm_request_hedger", self.get_stats)
+
+    @property
+    def enabled(self) -> bool:
+        return parse_bool_or_none(get_llm_hedge_requests_env()) or False
+
+    @property
+    def budget_percent(self) -> float:
+        value = parse_float_or_none(get_llm_hedge_budget_percent_env())
+        return 5.0 if value is None else value
+
+    def _get_tracker(self, model: str) -> LatencyTracker:
+        tracker = self._trackers.get(model)
+        if tracker is None:
+            tracker = LatencyTracker()
+            self._trackers[model] = tracker
+            while len(self._trackers) > self.MAX_MODELS:
+                self._trackers.popitem(last=False)
+        self._trackers.move_to_end(model)
+        return tracker
+
+    def _has_budget(self) -> bool:
+        n_hedged = sum(self._recent_requests)
+        return n_hedged < len(self._recent_requests) * self.budget_percent / 100
+
+    async def run(self, model: str, create: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.enabled:
+            return await create()
+
+        tracker = self._get_tracker(model)
+        hedge_delay = tracker.percentile(90)
+        started_at = time.monotonic()
+        primary = asyncio.ensure_future(create())
+        tasks = {primary}
+        hedged = False
+        try:
+            if hedge_delay is not None:
+                await asyncio.wait(tasks, timeout=hedge_delay)
+                if not primary.done() and self._has_budget():
+                    hedged = True
+                    METRICS_SERVICE.increment("llm_request_hedger.hedges")
+                    hedge_started_at = time.monotonic()
+                    hedge = asyncio.ensure_future(create())
+                    tasks.add(hedge)
+            self._recent_requests.append(hedged)
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is not None:
+                        continue
+                    if task is primary:
+                        tracker.record(time.monotonic() - started_at)
+                    else:
+                        tracker.record(time.monotonic() - hedge_started_at)
+                        METRICS_SERVICE.increment("llm_request_hedger.hedge_wins")
+                    return task.result()
+
+            # 全部失败时抛出原始请求的异常
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def get_stats(self) -> Dict[str, dict]:
+        return {
+            model: {"p90_seconds": tracker.percentile(90)}
+            for model, tracker in self._trackers.items()
+        }
+
+
+LLM_REQUEST_HEDGER = LLMRequestHedger()
@@ -0,0 +1,156 @@
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+import hashlib
+import json
+import traceback
+from typing import Any, List, Optional
+
+from sqlalchemy import delete, func
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import select
+
+from models.llm_message import LLMMessage
+from models.sql.llm_response_cache import LLMResponseCacheModel
+from services.database import async_session_maker
+from services.metrics_service import METRICS_SERVICE
+from utils.get_env import (
+    get_llm_response_cache_env,
+    get_llm_response_cache_max_entries_env,
+    get_llm_response_cache_ttl_env,
+)
+from utils.parsers import parse_bool_or_none, parse_int_or_none
+
+
+# 当前请求的缓存命中统计，由 start_llm_response_cache_tracking() 设置
+_request_cache_stats: ContextVar[Optional[dict]] = ContextVar(
+    "llm_response_cache_stats", default=None
+)
+
+
+def start_llm_response_cache_tracking() -> dict:
+    """
+    开始统计当前请求的LLM响应缓存命中情况，返回的dict会随缓存读取实时更新。
+    每个请求/worker任务运行在独立的asyncio任务中，统计范围只包含当前任务及其创建的子任务。
+    """
+    stats = {"hits": 0, "misses": 0}
+    _request_cache_stats.set(stats)
+    return stats
+
+
+def _record(result: str):
+    METRICS_SERVICE.increment(f"llm_response_cache.{result}")
+    stats = _request_cache_stats.get()
+    if stats is not None:
+        stats[result] += 1
+
+
+def _hash_json(value: Any) -> str:
+    serialized = json.dumps(
+        value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    结构化输出的LLM响应缓存（默认关闭，LLM_RESPONSE_CACHE=true 开启）。
+    以 (模型, 消息哈希, 响应schema哈希, 工具) 为键，将解析后的dict保存在数据库中，
+    重新生成或基于相同大纲和布局派生演示文稿时直接返回，不再请求大模型。
+
+    - LLM_RESPONSE_CACHE_TTL：缓存有效期（秒，默认86400）
+    - LLM_RESPONSE_CACHE_MAX_ENTRIES：最多保留的条目数（默认10000），超出时删除最早的条目
+    缓存读写失败只记录日志，不影响正常的生成流程。
+    """
+
+    def __init__(self, session_maker: async_sessionmaker):
+        self._session_maker = session_maker
+
+    @property
+    def enabled(self) -> bool:
+        return parse_bool_or_none(get_llm_response_cache_env()) or False
+
+    @property
+    def ttl_seconds(self) -> int:
+        value = parse_int_or_none(get_llm_response_cache_ttl_env())
+        return 86400 if value is None else value
+
+    @property
+    def max_entries(self) -> int:
+        value = parse_int_or_none(get_llm_response_cache_max_entries_env())
+        return 10000 if value is None else value
+
+    def build_key(
+        self,
+        model: str,
+        messages: List[LLMMessage],
+        response_format: dict,
+        strict: bool = False,
+        tools: Optional[List[dict]] = None,
+    ) -> str:
+        return _hash_json(
+            {
+                "model": model,
+                "messages": _hash_json([message.model_dump() for message in messages]),
+                "response_format": _hash_json(response_format),
+                "strict": strict,
+                "tools": _hash_json(tools or []),
+            }
+        )
+
+    async def get(self, key: str) -> Optional[dict]:
+        try:
+            async with self._session_maker() as sql_session:
+                entry = await sql_session.get(LLMResponseCacheModel, key)
+        except Exception:
+            traceback.print_exc()
+            return None
+
+        if entry is None or entry.expires_at <= datetime.now():
+            _record("misses")
+            return None
+        _record("hits")
+        return entry.response
+
+    async def set(self, key: str, model: str, response: dict):
+        now = datetime.now()
+        try:
+            async with self._session_maker() as sql_session:
+                await sql_session.merge(
+                    LLMResponseCacheModel(
+                        key=key,
+                        model=model,
+                        response=response,
+                        created_at=now,
+                        expires_at=now + timedelta(seconds=self.ttl_seconds),
+                    )
+                )
+                await self._prune(sql_session, now)
+                await sql_session.commit()
+        except Exception:
+            traceback.print_exc()
+
+    async def _prune(self, sql_session, now: datetime):
+        await sql_session.execute(
+            delete(LLMResponseCacheModel).where(LLMResponseCacheModel.expires_at <= now)
+        )
+        count = await sql_session.scalar(
+            select(func.count()).select_from(LLMResponseCacheModel)
+        )
+        overflow = (count or 0) - self.max_entries
+        if overflow > 0:
+            oldest_keys = (
+                await sql_session.scalars(
+                    select(LLMResponseCacheModel.key)
+                    .order_by(LLMResponseCacheModel.created_at)
+                    .limit(overflow)
+                )
+            ).all()
+            await sql_session.execute(
+                delete(LLMResponseCacheModel).where(
+                    LLMResponseCacheModel.key.in_(oldest_keys)
+                )
+            )
+            METRICS_SERVICE.increment("llm_response_cache.evictions", len(oldest_keys))
+
+
+LLM_RESPONSE_CACHE = LLMResponseCache(async_session_maker)
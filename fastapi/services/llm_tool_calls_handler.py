@@ -8,7 +8,7 @@ from models.llm_message import (
 from models.llm_tool_call import OpenAIToolCall
 from models.llm_tools import LLMDynamicTool, LLMTool, SearchWebTool
 from utils.schema_utils import (
-    ensure_strict_json_schema,
+    to_strict_json_schema,
 )
 
 
@@ -66,7 +66,7 @@ class LLMToolCallsHandler:
             parameters = tool.model_json_schema()
 
         if strict:
-            parameters = ensure_strict_json_schema(parameters, path=(), root=parameters)
+            parameters = to_strict_json_schema(parameters)
 
         return {
             "type": "function",
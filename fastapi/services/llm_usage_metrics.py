@@ -0,0 +1,34 @@
+from typing import Any, Optional
+
+from services.metrics_service import METRICS_SERVICE
+
+
+PROMPT_TOKENS_COUNTER = "llm.prompt_tokens"
+CACHED_PROMPT_TOKENS_COUNTER = "llm.cached_prompt_tokens"
+
+
+def record_prompt_cache_usage(usage: Optional[Any]):
+    """记录一次请求的输入token数及其中命中服务商提示词缓存的token数"""
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    if not prompt_tokens:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", None)
+    if cached_tokens is None:
+        # Anthropic兼容接口返回的字段
+        cached_tokens = getattr(usage, "cache_read_input_tokens", None)
+    METRICS_SERVICE.increment(PROMPT_TOKENS_COUNTER, prompt_tokens)
+    METRICS_SERVICE.increment(CACHED_PROMPT_TOKENS_COUNTER, cached_tokens or 0)
+
+
+def get_prompt_cache_stats() -> dict:
+    prompt_tokens = METRICS_SERVICE.get_counter(PROMPT_TOKENS_COUNTER)
+    cached_tokens = METRICS_SERVICE.get_counter(CACHED_PROMPT_TOKENS_COUNTER)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "cached_ratio": round(cached_tokens / prompt_tokens, 4) if prompt_tokens else 0.0,
+    }
+
+
+METRICS_SERVICE.register_collector("llm_prompt_cache", get_prompt_cache_stats)
@@ -0,0 +1,35 @@
+from collections import defaultdict
+import traceback
+from typing import Callable, Dict
+
+
+class MetricsService:
+    """
+    进程内的运行指标：计数器 + 按需采集的指标（例如连接池状态）。
+    通过 /api/v1/metrics 导出，供监控系统采集。
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._collectors: Dict[str, Callable[[], dict]] = {}
+
+    def increment(self, name: str, value: float = 1):
+        self._counters[name] += value
+
+    def get_counter(self, name: str) -> float:
+        return self._counters.get(name, 0)
+
+    def register_collector(self, name: str, collector: Callable[[], dict]):
+        self._collectors[name] = collector
+
+    def snapshot(self) -> dict:
+        collected = {}
+        for name, collector in self._collectors.items():
+            try:
+                collected[name] = collector()
+            except Exception:
+                traceback.print_exc()
+        return {"counters": dict(self._counters), **collected}
+
+
+METRICS_SERVICE = MetricsService()
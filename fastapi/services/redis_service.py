@@ -0,0 +1,32 @@
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from utils.get_env import get_redis_url_env
+
+
+class RedisService:
+    """
+    共享的Redis连接。未配置 REDIS_URL 时 client 为None，调用方应回退到进程内实现。
+    """
+
+    def __init__(self):
+        self._client: Optional[Redis] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(get_redis_url_env())
+
+    @property
+    def client(self) -> Optional[Redis]:
+        if self._client is None and self.enabled:
+            self._client = Redis.from_url(get_redis_url_env(), decode_responses=True)
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+REDIS_SERVICE = RedisService()
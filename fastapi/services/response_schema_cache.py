@@ -0,0 +1,91 @@
+from collections import OrderedDict
+import hashlib
+import json
+from typing import Tuple
+
+from models.presentation_layout import SlideLayoutModel
+from services.metrics_service import METRICS_SERVICE
+from utils.schema_utils import (
+    FrozenSchema,
+    add_field_in_schema,
+    ensure_strict_json_schema,
+    freeze_schema,
+    remove_fields_from_schema,
+)
+
+
+# 由服务端填充的字段，不需要大模型生成
+SLIDE_SCHEMA_FIELDS_TO_REMOVE = ["__image_url__", "__icon_url__"]
+
+SPEAKER_NOTE_FIELD = {
+    "__speaker_note__": {
+        "type": "string",
+        "minLength": 100,
+        "maxLength": 250,
+        "description": "Speaker note for the slide",
+    }
+}
+
+
+def compute_schema_hash(schema: dict) -> str:
+    serialized = json.dumps(
+        schema, sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def compile_slide_response_schema(json_schema: dict, strict: bool = False) -> dict:
+    """把布局schema转换为生成幻灯片内容时使用的响应schema"""
+    response_schema = remove_fields_from_schema(
+        json_schema, SLIDE_SCHEMA_FIELDS_TO_REMOVE
+    )
+    response_schema = add_field_in_schema(response_schema, SPEAKER_NOTE_FIELD, True)
+    if strict:
+        response_schema = ensure_strict_json_schema(
+            response_schema, path=(), root=response_schema
+        )
+    return response_schema
+
+
+class ResponseSchemaCache:
+    """
+    幻灯片内容生成的响应schema缓存。
+    schema的转换只取决于布局，按 (布局id, schema哈希, strict) 缓存编译结果，
+    返回只读的 FrozenSchema，多个请求共享同一份对象，不再逐张幻灯片复制和遍历schema。
+    """
+
+    MAX_ENTRIES = 512
+
+    def __init__(self):
+        self._entries: OrderedDict[Tuple[str, str, bool], FrozenSchema] = (
+            OrderedDict()
+        )
+
+    def get_slide_response_schema(
+        self, slide_layout: SlideLayoutModel, strict: bool = False
+    ) -> FrozenSchema:
+        key = (slide_layout.id, compute_schema_hash(slide_layout.json_schema), strict)
+        schema = self._entries.get(key)
+        if schema is not None:
+            METRICS_SERVICE.increment("response_schema_cache.hits")
+            self._entries.move_to_end(key)
+            return schema
+
+        METRICS_SERVICE.increment("response_schema_cache.misses")
+        schema = freeze_schema(
+            compile_slide_response_schema(slide_layout.json_schema, strict),
+            strict=strict,
+        )
+        self._entries[key] = schema
+        while len(self._entries) > self.MAX_ENTRIES:
+            self._entries.popitem(last=False)
+        return schema
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+RESPONSE_SCHEMA_CACHE = ResponseSchemaCache()
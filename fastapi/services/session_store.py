@@ -0,0 +1,158 @@
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import json
+import traceback
+from typing import Any, Dict, Optional
+
+from services.redis_service import REDIS_SERVICE
+from utils.credential_crypto import decrypt_credential, encrypt_credential
+from utils.get_env import (
+    get_session_max_entries_env,
+    get_session_store_env,
+    get_session_sweep_interval_env,
+)
+from utils.parsers import parse_int_or_none
+
+
+SESSION_TTL = timedelta(hours=12)
+
+# 会话中以datetime保存的字段，Redis中以ISO字符串存储
+SESSION_DATETIME_FIELDS = ("created_at", "expires_at")
+
+# 会话中的用户凭据，Redis中使用服务端密钥加密存储（utils/credential_crypto.py）
+SESSION_ENCRYPTED_FIELDS = ("api_key",)
+
+
+class InMemorySessionStore:
+    """
+    进程内会话存储：带过期时间的LRU，读取为O(1)。
+    超过最大数量时淘汰最久未访问的会话，过期会话由后台清理任务定期删除。
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._sessions: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if datetime.now() > session["expires_at"]:
+            self._sessions.pop(session_id, None)
+            return None
+        self._sessions.move_to_end(session_id)
+        return session
+
+    async def set(self, session_id: str, session: Dict[str, Any]):
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+
+    async def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    async def sweep(self) -> int:
+        now = datetime.now()
+        expired = [
+            session_id
+            for session_id, session in self._sessions.items()
+            if now > session["expires_at"]
+        ]
+        for session_id in expired:
+            self._sessions.pop(session_id, None)
+        return len(expired)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class RedisSessionStore:
+    """
+    Redis会话存储：多个worker/节点共享会话，过期由Redis TTL处理。
+    用户的API密钥加密后写入Redis，无法解密（例如服务端密钥已更换）的会话视为不存在，需要重新登录。
+    """
+
+    def _key(self, session_id: str) -> str:
+        return f"presenton:session:{session_id}"
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        data = await REDIS_SERVICE.client.get(self._key(session_id))
+        if not data:
+            return None
+        session = json.loads(data)
+        for field in SESSION_DATETIME_FIELDS:
+            if session.get(field):
+                session[field] = datetime.fromisoformat(session[field])
+        for field in SESSION_ENCRYPTED_FIELDS:
+            if session.get(field):
+                session[field] = decrypt_credential(session[field])
+                if session[field] is None:
+                    return None
+        return session
+
+    async def set(self, session_id: str, session: Dict[str, Any]):
+        ttl = max(int((session["expires_at"] - datetime.now()).total_seconds()), 1)
+        stored = dict(session)
+        for field in SESSION_ENCRYPTED_FIELDS:
+            if stored.get(field):
+                stored[field] = encrypt_credential(stored[field])
+        await REDIS_SERVICE.client.set(
+            self._key(session_id), json.dumps(stored, default=str), ex=ttl
+        )
+
+    async def delete(self, session_id: str):
+        await REDIS_SERVICE.client.delete(self._key(session_id))
+
+    async def sweep(self) -> int:
+        return 0
+
+
+class SessionStore:
+    """
+    用户会话存储。
+    SESSION_STORE=redis（或配置了 REDIS_URL 且未指定）时使用Redis，否则使用进程内存储。
+    """
+
+    def __init__(self):
+        self._backend = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            store = get_session_store_env() or ("redis" if REDIS_SERVICE.enabled else "memory")
+            if store == "redis":
+                self._backend = RedisSessionStore()
+            else:
+                self._backend = InMemorySessionStore(
+                    parse_int_or_none(get_session_max_entries_env()) or 10000
+                )
+        return self._backend
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await self.backend.get(session_id)
+
+    async def create(self, session_id: str, session: Dict[str, Any]):
+        now = datetime.now()
+        session.setdefault("created_at", now)
+        session.setdefault("expires_at", now + SESSION_TTL)
+        await self.backend.set(session_id, session)
+
+    async def delete(self, session_id: str):
+        await self.backend.delete(session_id)
+
+    async def run_sweeper(self):
+        """后台定期清理过期会话，直到任务被取消"""
+        interval = parse_int_or_none(get_session_sweep_interval_env()) or 300
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                removed = await self.backend.sweep()
+                if removed:
+                    print(f"Removed {removed} expired session(s)")
+            except Exception:
+                traceback.print_exc()
+
+
+SESSION_STORE = SessionStore()
@@ -0,0 +1,150 @@
+import asyncio
+from collections import OrderedDict
+import json
+import traceback
+from typing import Dict, Optional, Set
+
+from services.redis_service import REDIS_SERVICE
+
+
+class TaskEventSubscription:
+    """进程内订阅：每个订阅者拥有独立的队列"""
+
+    def __init__(self, bus: "TaskEventBus", topic: str):
+        self._bus = bus
+        self._topic = topic
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=256)
+
+    def put(self, event: dict):
+        if self._queue.full():
+            # 慢订阅者只保留最新的事件
+            self._queue.get_nowait()
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def __aenter__(self):
+        self._bus._subscribers.setdefault(self._topic, set()).add(self)
+        last_event = self._bus._last_events.get(self._topic)
+        if last_event is not None:
+            self.put(last_event)
+        return self
+
+    async def __aexit__(self, *args):
+        subscribers = self._bus._subscribers.get(self._topic)
+        if subscribers is not None:
+            subscribers.discard(self)
+            if not subscribers:
+                self._bus._subscribers.pop(self._topic, None)
+
+
+class RedisTaskEventSubscription:
+    """Redis订阅：跨进程接收worker发布的事件"""
+
+    def __init__(self, bus: "TaskEventBus", topic: str):
+        self._bus = bus
+        self._topic = topic
+        self._pubsub = None
+        self._pending: Optional[dict] = None
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        if self._pending is not None:
+            event, self._pending = self._pending, None
+            return event
+        message = await self._pubsub.get_message(
+            ignore_subscribe_messages=True, timeout=timeout
+        )
+        if not message or message.get("type") != "message":
+            return None
+        return json.loads(message["data"])
+
+    async def __aenter__(self):
+        client = REDIS_SERVICE.client
+        self._pubsub = client.pubsub()
+        await self._pubsub.subscribe(self._bus.channel(self._topic))
+        # 先订阅再读取最后一个事件，避免两者之间发布的事件丢失
+        last_event = await client.get(self._bus.last_event_key(self._topic))
+        if last_event:
+            self._pending = json.loads(last_event)
+        return self
+
+    async def __aexit__(self, *args):
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe()
+            await self._pubsub.aclose()
+
+
+class TaskEventBus:
+    """
+    任务进度事件的发布/订阅。
+    配置 REDIS_URL 时通过Redis pub/sub分发（支持独立worker进程），否则在进程内分发。
+    每个主题保留最后一个事件，新订阅者会立即收到当前状态。
+    """
+
+    LAST_EVENT_TTL_SECONDS = 24 * 60 * 60
+    MAX_CACHED_TOPICS = 1000
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[TaskEventSubscription]] = {}
+        self._last_events: OrderedDict[str, dict] = OrderedDict()
+
+    @property
+    def is_distributed(self) -> bool:
+        return REDIS_SERVICE.enabled
+
+    def channel(self, topic: str) -> str:
+        return f"presenton:events:{topic}"
+
+    def last_event_key(self, topic: str) -> str:
+        return f"presenton:events:{topic}:last"
+
+    async def publish(self, topic: str, event: dict):
+        """发布事件。发布失败只记录日志，不影响任务本身的执行"""
+        if self.is_distributed:
+            try:
+                data = json.dumps(event, default=str)
+                client = REDIS_SERVICE.client
+                await client.set(
+                    self.last_event_key(topic), data, ex=self.LAST_EVENT_TTL_SECONDS
+                )
+                await client.publish(self.channel(topic), data)
+            except Exception:
+                traceback.print_exc()
+            return
+
+        self._last_events[topic] = event
+        self._last_events.move_to_end(topic)
+        while len(self._last_events) > self.MAX_CACHED_TOPICS:
+            self._last_events.popitem(last=False)
+
+        for subscription in list(self._subscribers.get(topic, ())):
+            subscription.put(event)
+
+    def subscribe(self, topic: str):
+        """
+        订阅主题，用法：
+            async with TASK_EVENT_BUS.subscribe(topic) as subscription:
+                event = await subscription.get(timeout)
+        """
+        if self.is_distributed:
+            return RedisTaskEventSubscription(self, topic)
+        return TaskEventSubscription(self, topic)
+
+
+def get_generation_task_topic(task_id: str) -> str:
+    return f"generation_task:{task_id}"
+
+
+def get_presentation_assets_topic(presentation_id) -> str:
+    return f"presentation_assets:{presentation_id}"
+
+
+def get_citations_topic(presentation_id) -> str:
+    return f"citations:{presentation_id}"
+
+
+TASK_EVENT_BUS = TaskEventBus()
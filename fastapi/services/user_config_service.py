@@ -0,0 +1,63 @@
+import asyncio
+import os
+import traceback
+from typing import Optional
+
+from models.user_config import UserConfigSnapshot
+from utils.get_env import get_user_config_path_env, get_user_config_watch_interval_env
+from utils.parsers import parse_float_or_none
+from utils.user_config import get_user_config, update_env_with_user_config
+
+
+class UserConfigService:
+    """
+    用户配置的内存快照。
+    配置只在启动、配置文件变化（后台监听文件修改时间）或调用重新加载接口时读取一次，
+    LLM和图片服务直接读取不可变快照，请求处理路径上不再读取配置文件或改写环境变量。
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[UserConfigSnapshot] = None
+        self._mtime: Optional[float] = None
+
+    @property
+    def snapshot(self) -> UserConfigSnapshot:
+        if self._snapshot is None:
+            self.reload()
+        return self._snapshot
+
+    def _get_config_file_mtime(self) -> Optional[float]:
+        user_config_path = get_user_config_path_env()
+        try:
+            return os.path.getmtime(user_config_path) if user_config_path else None
+        except OSError:
+            return None
+
+    def reload(self) -> UserConfigSnapshot:
+        mtime = self._get_config_file_mtime()
+        user_config = get_user_config()
+        # 同步写入环境变量，兼容仍直接读取环境变量的代码
+        update_env_with_user_config(user_config)
+        self._snapshot = UserConfigSnapshot(**user_config.model_dump())
+        self._mtime = mtime
+        return self._snapshot
+
+    def reload_if_changed(self) -> bool:
+        if self._snapshot is not None and self._get_config_file_mtime() == self._mtime:
+            return False
+        self.reload()
+        return True
+
+    async def run_watcher(self):
+        """后台监听配置文件修改时间，变化后重新加载，直到任务被取消"""
+        interval = parse_float_or_none(get_user_config_watch_interval_env()) or 5
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if self.reload_if_changed():
+                    print("User config reloaded")
+            except Exception:
+                traceback.print_exc()
+
+
+USER_CONFIG_SERVICE = UserConfigService()
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+
+
+@pytest.fixture
+def sqlite_engine(request, tmp_path):
+    """
+    临时SQLite数据库（aiosqlite）引擎，只创建测试需要的表，测试结束后释放，
+    避免残留的aiosqlite线程阻止解释器退出。
+
+    要创建的表由测试模块的 SQLITE_TABLES 指定，也可以通过间接参数化覆盖：
+        @pytest.mark.parametrize("sqlite_engine", [[SlideModel.__table__]], indirect=True)
+    """
+    tables = getattr(request, "param", None) or request.module.SQLITE_TABLES
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+
+    async def _create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                lambda sync_conn: SQLModel.metadata.create_all(sync_conn, tables=tables)
+            )
+
+    asyncio.run(_create_tables())
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def session_maker(sqlite_engine):
+    return async_sessionmaker(sqlite_engine, expire_on_commit=False)
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+from fastapi import Depends, FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from api.middlewares.auth_middleware import AuthMiddleware
+from api.v1.auth.router import get_current_api_key, get_current_user
+from services.session_store import SESSION_STORE, InMemorySessionStore
+
+
+class CountingSessionStore(InMemorySessionStore):
+    def __init__(self):
+        super().__init__(max_entries=10)
+        self.lookups = 0
+
+    async def get(self, session_id):
+        self.lookups += 1
+        return await super().get(session_id)
+
+
+def _create_app():
+    app = FastAPI()
+
+    @app.get("/whoami")
+    async def whoami(
+        current_user=Depends(get_current_user),
+        api_key=Depends(get_current_api_key),
+    ):
+        return {"user_id": current_user, "api_key": api_key}
+
+    @app.get("/api/v1/metrics")
+    async def metrics():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream(current_user=Depends(get_current_user)):
+        async def inner():
+            for i in range(3):
+                yield f"data: {i}\n\n"
+
+        return StreamingResponse(inner(), media_type="text/event-stream")
+
+    app.add_middleware(AuthMiddleware)
+    return app
+
+
+def test_session_is_resolved_once_per_request(monkeypatch):
+    store = CountingSessionStore()
+    monkeypatch.setattr(SESSION_STORE, "_backend", store)
+    now = datetime.now()
+    store._sessions["s1"] = {
+        "user_id": "u1",
+        "api_key": "key",
+        "role": "card",
+        "created_at": now,
+        "expires_at": now + timedelta(hours=1),
+    }
+
+    client = TestClient(_create_app())
+    client.cookies.set("user_session", "s1")
+    response = client.get("/whoami")
+
+    assert response.status_code == 200
+    assert response.json() == {"user_id": "u1", "api_key": "key"}
+    assert store.lookups == 1
+
+    stream_response = client.get("/stream")
+    assert stream_response.text == "data: 0\n\ndata: 1\n\ndata: 2\n\n"
+
+
+def test_unauthenticated_request_is_rejected(monkeypatch):
+    monkeypatch.setattr(SESSION_STORE, "_backend", CountingSessionStore())
+
+    response = TestClient(_create_app()).get("/whoami")
+
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Authentication required"}
+
+
+def test_metrics_require_login_or_scrape_token(monkeypatch):
+    monkeypatch.setattr(SESSION_STORE, "_backend", CountingSessionStore())
+    client = TestClient(_create_app())
+
+    monkeypatch.delenv("METRICS_SCRAPE_TOKEN", raising=False)
+    assert client.get("/api/v1/metrics").status_code == 401
+    assert client.get(
+        "/api/v1/metrics", headers={"Authorization": "Bearer "}
+    ).status_code == 401
+
+    monkeypatch.setenv("METRICS_SCRAPE_TOKEN", "scrape-secret")
+    assert client.get(
+        "/api/v1/metrics", headers={"Authorization": "Bearer wrong"}
+    ).status_code == 401
+    response = client.get(
+        "/api/v1/metrics", headers={"Authorization": "Bearer scrape-secret"}
+    )
+    assert response.status_code == 200
+    # 采集令牌只能访问监控指标
+    assert client.get(
+        "/whoami", headers={"Authorization": "Bearer scrape-secret"}
+    ).status_code == 401
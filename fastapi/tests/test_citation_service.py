@@ -0,0 +1,126 @@
+import asyncio
+import os
+import tempfile
+import uuid
+
+import pytest
+
+os.environ.setdefault("APP_DATA_DIRECTORY", tempfile.mkdtemp())
+
+from models.sql.presentation import PresentationModel
+from models.sql.slide import SlideModel
+from services import citation_service
+from services.citation_service import CitationService
+from services.concurrent_service import CONCURRENT_SERVICE
+from services.task_event_bus import TASK_EVENT_BUS, get_citations_topic
+
+
+SQLITE_TABLES = [PresentationModel.__table__, SlideModel.__table__]
+
+
+@pytest.fixture(autouse=True)
+def _local_events(monkeypatch):
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    # 不发送webhook
+    monkeypatch.setattr(CONCURRENT_SERVICE, "run_task", lambda *args, **kwargs: None)
+
+
+async def _create_presentation(session_maker) -> uuid.UUID:
+    presentation_id = uuid.uuid4()
+    async with session_maker() as sql_session:
+        sql_session.add(
+            PresentationModel(
+                id=presentation_id,
+                content="",
+                n_slides=1,
+                language="English",
+                citations_status="pending",
+            )
+        )
+        sql_session.add(
+            SlideModel(
+                presentation=presentation_id,
+                layout_group="general",
+                layout="general:title",
+                index=0,
+                content={"title": "Solar power"},
+            )
+        )
+        await sql_session.commit()
+    return presentation_id
+
+
+def test_reference_markers_are_written_and_published(session_maker, monkeypatch):
+    async def add_reference_markers(presentation, slides, api_key):
+        return [
+            {
+                "slide_index": 1,
+                "content": slides[0].content["title"],
+                "reference_marker_index": 2,
+            }
+        ]
+
+    monkeypatch.setattr(citation_service, "add_reference_markers", add_reference_markers)
+
+    async def _run():
+        service = CitationService(session_maker)
+        presentation_id = await _create_presentation(session_maker)
+
+        async with TASK_EVENT_BUS.subscribe(get_citations_topic(presentation_id)) as subscription:
+            await service.schedule(presentation_id, "key")
+            events = [await subscription.get(timeout=1) for _ in range(2)]
+
+        async with session_maker() as sql_session:
+            presentation = await sql_session.get(PresentationModel, presentation_id)
+        return events, presentation
+
+    events, presentation = asyncio.run(_run())
+
+    assert [event["status"] for event in events] == ["running", "completed"]
+    assert events[-1]["reference_markers"] == presentation.reference_markers
+    assert presentation.citations_status == "completed"
+    assert presentation.reference_markers[0]["content"] == "Solar power"
+
+
+def test_failure_marks_citations_as_error(session_maker, monkeypatch):
+    async def add_reference_markers(presentation, slides, api_key):
+        raise RuntimeError("embedding service unavailable")
+
+    monkeypatch.setattr(citation_service, "add_reference_markers", add_reference_markers)
+
+    async def _run():
+        service = CitationService(session_maker)
+        presentation_id = await _create_presentation(session_maker)
+        await service.schedule(presentation_id, "key")
+
+        async with session_maker() as sql_session:
+            return await sql_session.get(PresentationModel, presentation_id)
+
+    presentation = asyncio.run(_run())
+
+    assert presentation.citations_status == "error"
+    assert presentation.reference_markers is None
+
+
+def test_stale_citations_left_by_a_restart_are_marked_as_error(session_maker):
+    async def _run():
+        service = CitationService(session_maker)
+        presentation_id = await _create_presentation(session_maker)
+
+        # 刚开始的计算不算遗留
+        assert await service.fail_stale() == 0
+
+        service.TIMEOUT_SECONDS = 0
+        async with TASK_EVENT_BUS.subscribe(get_citations_topic(presentation_id)) as subscription:
+            assert await service.fail_stale(presentation_id) == 1
+            event = await subscription.get(timeout=1)
+        # 已标记的不会重复处理
+        assert await service.fail_stale() == 0
+
+        async with session_maker() as sql_session:
+            return event, await sql_session.get(PresentationModel, presentation_id)
+
+    event, presentation = asyncio.run(_run())
+
+    assert event["status"] == "error"
+    assert presentation.citations_status == "error"
@@ -0,0 +1,84 @@
+from datetime import datetime
+import os
+import tempfile
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlmodel import Session, select
+
+os.environ.setdefault("APP_DATA_DIRECTORY", tempfile.mkdtemp())
+
+from models.presentation_with_slides import PresentationWithSlides
+from models.sql.presentation import PresentationModel
+from models.sql.slide import SlideModel
+from services.database import add_missing_columns, add_missing_indexes
+
+
+def test_missing_columns_and_indexes_are_added_to_existing_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE presentations (id CHAR(32) PRIMARY KEY)"))
+        conn.execute(
+            text(
+                "CREATE TABLE slides (id CHAR(32) PRIMARY KEY, presentation CHAR(32), "
+                '"index" INTEGER, user_id VARCHAR)'
+            )
+        )
+        # 旧库中已存在、但名称与模型不同的索引不应被重复创建
+        conn.execute(text("CREATE INDEX idx_slides_user_id ON slides (user_id)"))
+
+    tables = [PresentationModel.__table__, SlideModel.__table__]
+    with engine.begin() as conn:
+        add_missing_columns(conn, tables)
+        add_missing_indexes(conn, tables)
+        # 再次执行应当是幂等的
+        add_missing_indexes(conn, tables)
+
+        slide_indexes = {
+            row[1]: row for row in conn.execute(text("PRAGMA index_list(slides)"))
+        }
+        presentation_columns = {
+            row[1] for row in conn.execute(text("PRAGMA table_info(presentations)"))
+        }
+        plan = conn.execute(
+            text(
+                'EXPLAIN QUERY PLAN SELECT * FROM slides WHERE presentation = :id ORDER BY "index"'
+            ),
+            {"id": "x"},
+        ).all()
+
+    assert "idx_slides_presentation_index" in slide_indexes
+    assert "ix_slides_user_id" not in slide_indexes
+    assert "created_at" in presentation_columns
+    assert any("idx_slides_presentation_index" in row[-1] for row in plan)
+    assert not any("TEMP B-TREE" in row[-1] for row in plan)
+
+
+@pytest.mark.parametrize("previously_added_as_nullable", [False, True])
+def test_presentation_created_before_upgrade_still_loads(
+    tmp_path, previously_added_as_nullable
+):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        PresentationModel.__table__.create(conn)
+        conn.execute(text("ALTER TABLE presentations DROP COLUMN needs_fill_in"))
+        if previously_added_as_nullable:
+            # 旧版本的 add_missing_columns 以无默认值方式补充了此列
+            conn.execute(text("ALTER TABLE presentations ADD COLUMN needs_fill_in BOOLEAN"))
+        conn.execute(
+            text(
+                "INSERT INTO presentations (id, content, n_slides, language, created_at, updated_at) "
+                "VALUES (:id, 'content', 1, 'English', :now, :now)"
+            ),
+            {"id": uuid.uuid4().hex, "now": datetime.now()},
+        )
+
+    with engine.begin() as conn:
+        add_missing_columns(conn, [PresentationModel.__table__])
+
+    with Session(engine) as session:
+        presentation = session.exec(select(PresentationModel)).one()
+        loaded = PresentationWithSlides(**presentation.model_dump(), slides=[])
+
+    assert loaded.needs_fill_in is False
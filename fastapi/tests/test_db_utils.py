@@ -0,0 +1,58 @@
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from utils.db_utils import (
+    configure_sqlite_engine,
+    get_database_engine_kwargs,
+    get_pool_stats,
+)
+
+
+def test_engine_kwargs_from_env(monkeypatch):
+    monkeypatch.setenv("DATABASE_POOL_SIZE", "5")
+    monkeypatch.setenv("DATABASE_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DATABASE_POOL_RECYCLE", "600")
+    monkeypatch.setenv("DATABASE_STATEMENT_CACHE_SIZE", "0")
+    monkeypatch.delenv("DATABASE_POOL_PRE_PING", raising=False)
+
+    connect_args = {}
+    kwargs = get_database_engine_kwargs(
+        "postgresql+asyncpg://user@localhost/db", connect_args
+    )
+
+    assert kwargs["pool_size"] == 5
+    assert kwargs["max_overflow"] == 0
+    assert kwargs["pool_recycle"] == 600
+    assert kwargs["pool_pre_ping"] is True
+    assert kwargs["query_cache_size"] == 0
+    assert connect_args["prepared_statement_cache_size"] == 0
+
+
+def test_memory_sqlite_skips_pool_arguments():
+    kwargs = get_database_engine_kwargs("sqlite+aiosqlite:///:memory:", {})
+    assert kwargs == {"connect_args": {}}
+
+
+def test_sqlite_pragmas_are_applied(tmp_path):
+    database_url = f"sqlite+aiosqlite:///{tmp_path / 'pragmas.db'}"
+    engine = create_async_engine(
+        database_url, **get_database_engine_kwargs(database_url, {})
+    )
+    configure_sqlite_engine(engine)
+
+    async def _run():
+        async with engine.connect() as conn:
+            journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+            synchronous = (await conn.execute(text("PRAGMA synchronous"))).scalar()
+            busy_timeout = (await conn.execute(text("PRAGMA busy_timeout"))).scalar()
+            stats = get_pool_stats(engine.sync_engine.pool)
+        await engine.dispose()
+        return journal_mode, synchronous, busy_timeout, stats
+
+    journal_mode, synchronous, busy_timeout, stats = asyncio.run(_run())
+    assert journal_mode == "wal"
+    assert synchronous == 1
+    assert busy_timeout == 5000
+    assert stats["checkedout"] == 1
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from utils.deadline import (
+    RequestDeadlineExceeded,
+    get_generation_deadline_seconds,
+    get_request_deadline,
+    get_request_deadline_remaining,
+    is_request_deadline_exceeded,
+    request_deadline_scope,
+    set_request_deadline,
+)
+
+
+def test_generation_deadline_env(monkeypatch):
+    monkeypatch.delenv("GENERATION_DEADLINE_SECONDS", raising=False)
+    assert get_generation_deadline_seconds() == 420
+
+    monkeypatch.setenv("GENERATION_DEADLINE_SECONDS", "90")
+    assert get_generation_deadline_seconds() == 90
+
+    monkeypatch.setenv("GENERATION_DEADLINE_SECONDS", "0")
+    assert get_generation_deadline_seconds() is None
+
+
+def test_deadline_is_inherited_by_child_tasks():
+    async def _run():
+        set_request_deadline(10)
+        deadline = get_request_deadline()
+
+        async def child():
+            return get_request_deadline()
+
+        assert await asyncio.create_task(child()) == deadline
+        # 预留时间最多占剩余时间的20%
+        assert deadline - get_request_deadline(reserve=60) == pytest.approx(2, abs=0.1)
+        assert 9 < get_request_deadline_remaining() <= 10
+        assert not is_request_deadline_exceeded()
+
+    asyncio.run(_run())
+
+
+def test_scope_cancels_stragglers_when_deadline_passes():
+    async def _run():
+        deadline = set_request_deadline(0.05)
+        straggler = asyncio.Event()
+
+        with pytest.raises(RequestDeadlineExceeded):
+            async with request_deadline_scope(deadline):
+                await straggler.wait()
+        assert is_request_deadline_exceeded()
+
+        # 其他原因的超时不会被当作截止时间到达
+        set_request_deadline(10)
+        with pytest.raises(TimeoutError) as exc_info:
+            async with request_deadline_scope(get_request_deadline()):
+                await asyncio.wait_for(straggler.wait(), 0.01)
+        assert not isinstance(exc_info.value, RequestDeadlineExceeded)
+
+    asyncio.run(_run())
+
+
+def test_no_deadline_does_not_limit():
+    async def _run():
+        set_request_deadline(None)
+        assert get_request_deadline_remaining() is None
+        async with request_deadline_scope(get_request_deadline()):
+            await asyncio.sleep(0)
+
+    asyncio.run(_run())
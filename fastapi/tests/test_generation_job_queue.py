@@ -0,0 +1,279 @@
+import asyncio
+from datetime import datetime, timedelta
+import os
+import tempfile
+
+from fastapi import HTTPException
+import httpx
+import openai
+import pytest
+
+os.environ.setdefault("APP_DATA_DIRECTORY", tempfile.mkdtemp())
+
+from models.sql.async_presentation_generation_status import (
+    AsyncPresentationGenerationTaskModel,
+)
+from services.generation_job_queue import GenerationJobQueue, GenerationWorker
+from utils.credential_crypto import decrypt_credential, encrypt_credential
+from utils.llm_client_error_handler import handle_llm_client_exceptions
+
+
+SQLITE_TABLES = [AsyncPresentationGenerationTaskModel.__table__]
+
+
+async def _enqueue(queue, session_maker, **kwargs):
+    async with session_maker() as sql_session:
+        task = AsyncPresentationGenerationTaskModel(status="pending", **kwargs)
+        await queue.enqueue(sql_session, task)
+        return task.id
+
+
+async def _get(session_maker, task_id):
+    async with session_maker() as sql_session:
+        return await sql_session.get(AsyncPresentationGenerationTaskModel, task_id)
+
+
+def test_task_is_claimed_by_only_one_worker(session_maker):
+    async def _run():
+        queue = GenerationJobQueue(session_maker)
+        task_id = await _enqueue(queue, session_maker)
+
+        first = await queue.claim("worker-1")
+        second = await queue.claim("worker-2")
+
+        assert first.id == task_id
+        assert second is None
+        task = await _get(session_maker, task_id)
+        assert task.status == "running"
+        assert task.lease_owner == "worker-1"
+        assert task.attempts == 1
+
+    asyncio.run(_run())
+
+
+def test_expired_lease_can_be_reclaimed(session_maker):
+    async def _run():
+        queue = GenerationJobQueue(session_maker)
+        task_id = await _enqueue(queue, session_maker)
+        await queue.claim("worker-1")
+
+        async with session_maker() as sql_session:
+            task = await sql_session.get(AsyncPresentationGenerationTaskModel, task_id)
+            task.lease_expires_at = datetime.now() - timedelta(seconds=1)
+            await sql_session.commit()
+
+        reclaimed = await queue.claim("worker-2")
+        assert reclaimed.id == task_id
+        assert reclaimed.lease_owner == "worker-2"
+        assert reclaimed.attempts == 2
+        # 原worker的心跳发现租约已被接管
+        assert await queue.heartbeat(task_id, "worker-1") is None
+
+    asyncio.run(_run())
+
+
+def test_failed_task_is_retried_with_backoff_then_marked_failed(session_maker):
+    async def _run():
+        queue = GenerationJobQueue(session_maker)
+        task_id = await _enqueue(queue, session_maker)
+        async with session_maker() as sql_session:
+            task = await sql_session.get(AsyncPresentationGenerationTaskModel, task_id)
+            task.max_attempts = 2
+            await sql_session.commit()
+
+        failures = []
+
+        async def handler(task, sql_session):
+            raise HTTPException(status_code=503, detail="boom")
+
+        async def on_failure(task, e):
+            failures.append(task.id)
+            return {"detail": e.detail}
+
+        worker = GenerationWorker(
+            queue, session_maker, handler=handler, on_failure=on_failure
+        )
+
+        claimed = await queue.claim(worker.worker_id)
+        await worker._run_task(claimed.id)
+        task = await _get(session_maker, task_id)
+        assert task.status == "pending"
+        assert task.available_at > datetime.now()
+        assert failures == []
+
+        # 退避时间内不可领取
+        assert await queue.claim(worker.worker_id) is None
+
+        async with session_maker() as sql_session:
+            task = await sql_session.get(AsyncPresentationGenerationTaskModel, task_id)
+            task.available_at = datetime.now() - timedelta(seconds=1)
+            await sql_session.commit()
+
+        claimed = await queue.claim(worker.worker_id)
+        await worker._run_task(claimed.id)
+        task = await _get(session_maker, task_id)
+        assert task.status == "error"
+        assert task.error == {"detail": "boom"}
+        assert failures == [task_id]
+
+    asyncio.run(_run())
+
+
+def _openai_error(error_class, status_code):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status_code, request=request)
+    return error_class("upstream error", response=response, body=None)
+
+
+def _raise_through_llm_handler(error):
+    async def handler(task, sql_session):
+        try:
+            raise error
+        except Exception as e:
+            raise handle_llm_client_exceptions(e)
+
+    return handler
+
+
+async def _raise_raw(task, sql_session):
+    raise ValueError("programming error")
+
+
+@pytest.mark.parametrize(
+    "handler, retried",
+    [
+        (_raise_through_llm_handler(_openai_error(openai.AuthenticationError, 401)), False),
+        (_raise_through_llm_handler(_openai_error(openai.BadRequestError, 400)), False),
+        (_raise_through_llm_handler(_openai_error(openai.RateLimitError, 429)), True),
+        (_raise_through_llm_handler(_openai_error(openai.InternalServerError, 503)), True),
+        (_raise_through_llm_handler(openai.APITimeoutError(httpx.Request("POST", "https://x"))), True),
+        (_raise_raw, False),
+    ],
+)
+def test_only_transient_errors_are_retried(session_maker, handler, retried):
+    async def _run():
+        queue = GenerationJobQueue(session_maker)
+        task_id = await _enqueue(queue, session_maker)
+        failures = []
+
+        async def on_failure(task, e):
+            failures.append(task.id)
+
+        worker = GenerationWorker(
+            queue, session_maker, handler=handler, on_failure=on_failure
+        )
+        claimed = await queue.claim(worker.worker_id)
+        await worker._run_task(claimed.id)
+
+        task = await _get(session_maker, task_id)
+        assert task.attempts == 1
+        if retried:
+            assert task.status == "pending"
+            assert failures == []
+        else:
+            assert task.status == "error"
+            assert failures == [task_id]
+
+    asyncio.run(_run())
+
+
+def test_exhausted_task_with_expired_lease_is_marked_failed(session_maker):
+    async def _run():
+        queue = GenerationJobQueue(session_maker)
+        task_id = await _enqueue(queue, session_maker)
+        await queue.claim("worker-1")
+
+        # 最后一次执行的worker崩溃，租约过期
+        async with session_maker() as sql_session:
+            task = await sql_session.get(AsyncPresentationGenerationTaskModel, task_id)
+            task.attempts = task.max_attempts
+            task.lease_expires_at = datetime.now() - timedelta(seconds=1)
+            await sql_session.commit()
+
+        failures = []
+
+        async def on_failure(task, e):
+            failures.append(task.id)
+
+        async def handler(task, sql_session):
+            raise AssertionError("exhausted task must not run again")
+
+        worker = GenerationWorker(
+            queue, session_maker, handler=handler, on_failure=on_failure
+        )
+        assert await queue.claim(worker.worker_id) is None
+        await worker._fail_exhausted_tasks()
+        # 其他worker不会重复处理
+        assert await queue.claim_exhausted("worker-3") == []
+
+        task = await _get(session_maker, task_id)
+        assert task.status == "error"
+        assert task.error["type"] == "GenerationJobLostError"
+        assert failures == [task_id]
+
+    asyncio.run(_run())
+
+
+def test_cancel_pending_and_running_tasks(session_maker):
+    async def _run():
+        queue = GenerationJobQueue(session_maker)
+
+        pending_id = await _enqueue(queue, session_maker)
+        async with session_maker() as sql_session:
+            task = await sql_session.get(AsyncPresentationGenerationTaskModel, pending_id)
+            await queue.request_cancel(sql_session, task)
+        assert (await _get(session_maker, pending_id)).status == "cancelled"
+        assert await queue.claim("worker-1") is None
+
+        running_id = await _enqueue(queue, session_maker)
+        started = asyncio.Event()
+
+        async def handler(task, sql_session):
+            started.set()
+            await asyncio.sleep(60)
+
+        worker = GenerationWorker(queue, session_maker, handler=handler)
+        claimed = await queue.claim(worker.worker_id)
+        run = asyncio.create_task(worker._run_task(claimed.id))
+        await started.wait()
+
+        async with session_maker() as sql_session:
+            task = await sql_session.get(AsyncPresentationGenerationTaskModel, running_id)
+            await queue.request_cancel(sql_session, task)
+        assert await queue.heartbeat(running_id, worker.worker_id) is True
+
+        # 模拟心跳循环发现取消请求
+        run.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await run
+        task = await _get(session_maker, running_id)
+        # worker停止时任务被归还，但由于已请求取消，不会再被执行
+        assert task.cancel_requested
+
+    asyncio.run(_run())
+
+
+def test_api_key_is_encrypted_and_cleared_when_task_finishes(session_maker):
+    async def _run():
+        queue = GenerationJobQueue(session_maker)
+        task_id = await _enqueue(
+            queue, session_maker, api_key=encrypt_credential("sk-user")
+        )
+
+        claimed = await queue.claim("worker-1")
+        assert claimed.api_key != "sk-user"
+        assert decrypt_credential(claimed.api_key) == "sk-user"
+        assert decrypt_credential("sk-user") is None
+
+        async with session_maker() as sql_session:
+            task = await sql_session.get(AsyncPresentationGenerationTaskModel, task_id)
+            await queue.mark_completed(sql_session, task, {"id": "1"})
+        assert (await _get(session_maker, task_id)).api_key is None
+
+        cancelled_id = await _enqueue(
+            queue, session_maker, api_key=encrypt_credential("sk-user")
+        )
+        await queue.mark_cancelled(cancelled_id)
+        assert (await _get(session_maker, cancelled_id)).api_key is None
+
+    asyncio.run(_run())
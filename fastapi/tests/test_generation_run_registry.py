@@ -0,0 +1,192 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault("APP_DATA_DIRECTORY", tempfile.mkdtemp())
+
+from models.sql.generation_lease import GenerationLeaseModel
+from services.generation_lease_service import GenerationLeaseService
+from services.generation_run_registry import GenerationRunRegistry
+
+SQLITE_TABLES = [GenerationLeaseModel.__table__]
+
+
+def _event(n: int) -> str:
+    return f"event: response\ndata: {n}\n\n"
+
+
+def _make_factory(release: asyncio.Event, calls: list, n_events: int = 4):
+    async def events():
+        calls.append(1)
+        for n in range(1, n_events + 1):
+            if n == 3:
+                # 前两个事件之后等待，模拟仍在进行的生成
+                await release.wait()
+            yield _event(n)
+
+    return events
+
+
+async def _take(stream, n: int) -> list:
+    messages = []
+    async for message in stream:
+        messages.append(message)
+        if len(messages) == n:
+            break
+    return messages
+
+
+def test_reconnect_replays_missed_events(monkeypatch):
+    monkeypatch.delenv("GENERATION_DETACH_CANCEL_SECONDS", raising=False)
+
+    async def _run():
+        registry = GenerationRunRegistry()
+        release, calls = asyncio.Event(), []
+        factory = _make_factory(release, calls)
+
+        first = registry.attach("key", factory)
+        assert await _take(first, 2) == ["id: 1\n" + _event(1), "id: 2\n" + _event(2)]
+        # 客户端断开，生成继续
+        await first.aclose()
+        release.set()
+        await asyncio.sleep(0.01)
+        assert registry.get("key").done
+
+        messages = [message async for message in registry.attach("key", factory, "2")]
+        assert messages == ["id: 3\n" + _event(3), "id: 4\n" + _event(4)]
+        assert len(calls) == 1
+
+    asyncio.run(_run())
+
+
+def test_new_connection_joins_running_generation(monkeypatch):
+    monkeypatch.delenv("GENERATION_DETACH_CANCEL_SECONDS", raising=False)
+
+    async def _run():
+        registry = GenerationRunRegistry()
+        release, calls = asyncio.Event(), []
+        factory = _make_factory(release, calls)
+
+        first = registry.attach("key", factory)
+        await _take(first, 2)
+
+        # 刷新页面：不带 Last-Event-ID，从头回放而不是重新生成
+        second = registry.attach("key", factory)
+        release.set()
+        messages = [message async for message in second]
+        assert [message.split("\n")[0] for message in messages] == [
+            "id: 1", "id: 2", "id: 3", "id: 4"
+        ]
+        assert len(calls) == 1
+        await first.aclose()
+
+        # 已结束的生成只用于断线重连，新连接重新开始生成
+        [message async for message in registry.attach("key", factory)]
+        assert len(calls) == 2
+
+    asyncio.run(_run())
+
+
+def test_generation_is_cancelled_after_grace_period_without_listeners(monkeypatch):
+    monkeypatch.setenv("GENERATION_DETACH_CANCEL_SECONDS", "0.01")
+
+    async def _run():
+        registry = GenerationRunRegistry()
+        release, calls = asyncio.Event(), []
+
+        stream = registry.attach("key", _make_factory(release, calls))
+        await _take(stream, 2)
+        await stream.aclose()
+
+        await asyncio.sleep(0.05)
+        run = registry.get("key")
+        assert run.done and run.task.cancelled()
+
+    asyncio.run(_run())
+
+
+@pytest.fixture
+def lease_service(session_maker, monkeypatch):
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    return GenerationLeaseService(session_maker)
+
+
+def test_database_lease_has_a_single_owner(lease_service):
+    async def _run():
+        assert await lease_service.acquire("presentation:1", "worker-a")
+        assert not await lease_service.acquire("presentation:1", "worker-b")
+        assert await lease_service.renew("presentation:1", "worker-a")
+        assert not await lease_service.renew("presentation:1", "worker-b")
+        assert await lease_service.is_held("presentation:1")
+
+        # 只有持有者可以释放
+        await lease_service.release("presentation:1", "worker-b")
+        assert await lease_service.is_held("presentation:1")
+        await lease_service.release("presentation:1", "worker-a")
+        assert not await lease_service.is_held("presentation:1")
+
+        # 过期的租约可以被其他worker接管
+        lease_service.TTL_SECONDS = -1
+        assert await lease_service.acquire("presentation:1", "worker-a")
+        lease_service.TTL_SECONDS = 60
+        assert await lease_service.acquire("presentation:1", "worker-b")
+        assert not await lease_service.renew("presentation:1", "worker-a")
+
+    asyncio.run(_run())
+
+
+def test_duplicate_request_on_another_worker_waits_for_result(lease_service, monkeypatch):
+    monkeypatch.delenv("GENERATION_DETACH_CANCEL_SECONDS", raising=False)
+
+    async def _run():
+        first_worker = GenerationRunRegistry(lease_service)
+        second_worker = GenerationRunRegistry(lease_service)
+        second_worker.REMOTE_POLL_SECONDS = 0.01
+        release, calls = asyncio.Event(), []
+        factory = _make_factory(release, calls)
+
+        async def remote_result():
+            yield _event("saved")
+
+        first = first_worker.attach("key", factory, remote_result_factory=remote_result)
+        await _take(first, 2)
+
+        second = second_worker.attach("key", factory, remote_result_factory=remote_result)
+        status = await _take(second, 1)
+        assert "already in progress" in status[0]
+
+        release.set()
+        assert len([message async for message in first]) == 2
+        assert [message async for message in second] == ["id: 2\n" + _event("saved")]
+        # 只有持有租约的worker执行了生成
+        assert len(calls) == 1
+        assert not await lease_service.is_held("key")
+
+    asyncio.run(_run())
+
+
+def test_generation_stops_when_lease_is_lost(lease_service, monkeypatch):
+    monkeypatch.delenv("GENERATION_DETACH_CANCEL_SECONDS", raising=False)
+
+    async def _run():
+        registry = GenerationRunRegistry(lease_service)
+        lease_service.TTL_SECONDS = 0.03
+        release, calls = asyncio.Event(), []
+        stream = registry.attach("key", _make_factory(release, calls))
+        await _take(stream, 2)
+
+        # 租约过期后被其他worker获取，续约失败
+        await asyncio.sleep(0.05)
+        lease_service.TTL_SECONDS = 60
+        assert await lease_service.acquire("key", "other-worker")
+
+        messages = [message async for message in stream]
+        assert '"type": "error"' in messages[-1]
+        run = registry.get("key")
+        assert run.done and run.task.cancelled()
+        # 只释放自己持有的租约
+        assert await lease_service.is_held("key")
+
+    asyncio.run(_run())
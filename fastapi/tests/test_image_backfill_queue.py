@@ -0,0 +1,187 @@
+import asyncio
+from datetime import datetime, timedelta
+import os
+import tempfile
+import uuid
+
+import pytest
+
+os.environ.setdefault("APP_DATA_DIRECTORY", tempfile.mkdtemp())
+
+from constants.presentation import PLACEHOLDER_IMAGE_URL
+from models.sql.image_asset import ImageAsset
+from models.sql.image_backfill_job import ImageBackfillJobModel
+from models.sql.presentation import PresentationModel
+from models.sql.slide import SlideModel
+from services.image_backfill_queue import ImageBackfillQueue, ImageBackfillWorker
+from services.image_generation_service import ImageGenerationService
+from services.task_event_bus import TASK_EVENT_BUS, get_presentation_assets_topic
+from utils.credential_crypto import decrypt_credential
+
+
+SQLITE_TABLES = [
+    PresentationModel.__table__,
+    SlideModel.__table__,
+    ImageAsset.__table__,
+    ImageBackfillJobModel.__table__,
+]
+
+
+@pytest.fixture
+def queue(session_maker, monkeypatch):
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    queue = ImageBackfillQueue(session_maker)
+    queue.INITIAL_DELAY_SECONDS = 0
+    return queue
+
+
+def _set_image_result(monkeypatch, result):
+    async def generate_image(self, prompt):
+        return result
+
+    monkeypatch.setattr(ImageGenerationService, "generate_image", generate_image)
+
+
+async def _create_presentation(queue: ImageBackfillQueue):
+    presentation_id = uuid.uuid4()
+    slide = SlideModel(
+        presentation=presentation_id,
+        layout_group="general",
+        layout="general:image",
+        index=0,
+        content={
+            "title": "Solar",
+            "image": {
+                "__image_prompt__": "solar panels",
+                "__image_url__": PLACEHOLDER_IMAGE_URL,
+            },
+            "items": [
+                {"image": {"__image_prompt__": "sun", "__image_url__": "/app_data/images/sun.jpg"}}
+            ],
+        },
+    )
+    async with queue._session_maker() as sql_session:
+        presentation = PresentationModel(
+            id=presentation_id, content="", n_slides=1, language="English"
+        )
+        sql_session.add(presentation)
+        sql_session.add(slide)
+        presentation.needs_fill_in = (
+            await queue.enqueue_slides(sql_session, presentation_id, [slide], "key", None)
+            > 0
+        )
+        await sql_session.commit()
+    return presentation_id, slide.id
+
+
+def test_backfilled_image_is_written_to_slide(queue, monkeypatch):
+    _set_image_result(monkeypatch, "https://images.example.com/solar.jpg")
+
+    async def _run():
+        presentation_id, slide_id = await _create_presentation(queue)
+        worker = ImageBackfillWorker(queue)
+
+        async with TASK_EVENT_BUS.subscribe(
+            get_presentation_assets_topic(presentation_id)
+        ) as subscription:
+            job = await queue.claim(worker.worker_id)
+            assert job.path == ["image"]
+            # API密钥加密保存
+            assert job.api_key != "key"
+            assert decrypt_credential(job.api_key) == "key"
+            # 只有占位图会创建任务
+            assert await queue.claim(worker.worker_id) is None
+            await worker.run_job(job)
+
+            asset_event = await subscription.get(timeout=1)
+            completed_event = await subscription.get(timeout=1)
+
+        assert asset_event["slide_id"] == str(slide_id)
+        assert asset_event["url"] == "https://images.example.com/solar.jpg"
+        assert completed_event["type"] == "fill_in_completed"
+
+        async with queue._session_maker() as sql_session:
+            slide = await sql_session.get(SlideModel, slide_id)
+            presentation = await sql_session.get(PresentationModel, presentation_id)
+            job = await sql_session.get(ImageBackfillJobModel, job.id)
+        assert slide.content["image"]["__image_url__"] == "https://images.example.com/solar.jpg"
+        assert slide.content["items"][0]["image"]["__image_url__"] == "/app_data/images/sun.jpg"
+        assert slide.content_hash is not None
+        assert not presentation.needs_fill_in
+        assert job.status == "completed"
+        assert job.api_key is None
+
+    asyncio.run(_run())
+
+
+def test_failed_image_is_retried_with_backoff_then_given_up(queue, monkeypatch):
+    _set_image_result(monkeypatch, PLACEHOLDER_IMAGE_URL)
+
+    async def _run():
+        presentation_id, _ = await _create_presentation(queue)
+        worker = ImageBackfillWorker(queue)
+
+        job = await queue.claim(worker.worker_id)
+        await worker.run_job(job)
+        async with queue._session_maker() as sql_session:
+            job = await sql_session.get(ImageBackfillJobModel, job.id)
+        assert job.status == "pending"
+        assert job.available_at > job.updated_at
+        assert await queue.claim(worker.worker_id) is None
+
+        job.attempts = job.max_attempts
+        await queue.fail(job, "still failing")
+        async with queue._session_maker() as sql_session:
+            job = await sql_session.get(ImageBackfillJobModel, job.id)
+            presentation = await sql_session.get(PresentationModel, presentation_id)
+        assert job.status == "failed"
+        assert not presentation.needs_fill_in
+
+    asyncio.run(_run())
+
+
+def test_edited_image_is_not_overwritten(queue, monkeypatch):
+    _set_image_result(monkeypatch, "https://images.example.com/solar.jpg")
+
+    async def _run():
+        _, slide_id = await _create_presentation(queue)
+        worker = ImageBackfillWorker(queue)
+        job = await queue.claim(worker.worker_id)
+
+        async with queue._session_maker() as sql_session:
+            slide = await sql_session.get(SlideModel, slide_id)
+            slide.content = {**slide.content, "image": {"__image_prompt__": "wind", "__image_url__": PLACEHOLDER_IMAGE_URL}}
+            await sql_session.commit()
+
+        await worker.run_job(job)
+        async with queue._session_maker() as sql_session:
+            slide = await sql_session.get(SlideModel, slide_id)
+            job = await sql_session.get(ImageBackfillJobModel, job.id)
+        assert slide.content["image"]["__image_url__"] == PLACEHOLDER_IMAGE_URL
+        assert job.status == "skipped"
+
+    asyncio.run(_run())
+
+
+def test_job_that_keeps_crashing_its_worker_is_not_reclaimed(queue):
+    async def _run():
+        presentation_id, _ = await _create_presentation(queue)
+        job = await queue.claim("worker-1")
+
+        # 最后一次执行时worker崩溃，租约过期
+        async with queue._session_maker() as sql_session:
+            job = await sql_session.get(ImageBackfillJobModel, job.id)
+            job.attempts = job.max_attempts
+            job.lease_expires_at = datetime.now() - timedelta(seconds=1)
+            await sql_session.commit()
+
+        assert await queue.claim("worker-2") is None
+        assert await queue.fail_exhausted() == 1
+        async with queue._session_maker() as sql_session:
+            job = await sql_session.get(ImageBackfillJobModel, job.id)
+            presentation = await sql_session.get(PresentationModel, presentation_id)
+        assert job.status == "failed"
+        assert job.api_key is None
+        assert not presentation.needs_fill_in
+
+    asyncio.run(_run())
@@ -0,0 +1,57 @@
+import asyncio
+
+from models.presentation_layout import PresentationLayoutModel
+from services.layout_registry import LayoutRegistry
+
+
+class FakeLayoutRegistry(LayoutRegistry):
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+        self.version = "v1"
+
+    async def _get_version(self, layout_name):
+        if not layout_name.startswith("custom-"):
+            return None
+        return self.version
+
+    async def _fetch(self, layout_name):
+        self.requests.append(layout_name)
+        await asyncio.sleep(0.01)
+        return PresentationLayoutModel(name=layout_name, ordered=False, slides=[])
+
+
+def test_builtin_layout_is_fetched_once_for_concurrent_and_repeat_requests():
+    async def _run():
+        registry = FakeLayoutRegistry()
+        layouts = await asyncio.gather(*[registry.get("general") for _ in range(5)])
+        again = await registry.get("general")
+        return registry, layouts, again
+
+    registry, layouts, again = asyncio.run(_run())
+
+    assert registry.requests == ["general"]
+    assert all(layout.name == "general" for layout in layouts)
+    # 每次返回独立副本
+    assert again is not layouts[0]
+
+
+def test_custom_template_is_invalidated_and_revalidated_by_version(monkeypatch):
+    monkeypatch.setenv("LAYOUT_CACHE_REVALIDATE_SECONDS", "0")
+
+    async def _run():
+        registry = FakeLayoutRegistry()
+        await registry.get("custom-123")
+        # 版本未变化：重新验证不请求Next.js
+        await registry.get("custom-123")
+        assert len(registry.requests) == 1
+        # 其他worker修改了模板
+        registry.version = "v2"
+        await registry.get("custom-123")
+        registry.invalidate_custom_template("123")
+        await registry.get("custom-123")
+        return registry
+
+    registry = asyncio.run(_run())
+
+    assert registry.requests == ["custom-123"] * 3
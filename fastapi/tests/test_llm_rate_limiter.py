@@ -0,0 +1,105 @@
+import asyncio
+
+import httpx
+from openai import RateLimitError
+import pytest
+
+from services.llm_rate_limiter import (
+    LLMRateLimiter,
+    TokenBucket,
+    set_llm_rate_limit_user,
+)
+
+
+def _rate_limit_error(retry_after: str = "0.01") -> RateLimitError:
+    response = httpx.Response(
+        429,
+        headers={"retry-after": retry_after},
+        request=httpx.Request("POST", "http://comparegpt.io/api/chat/completions"),
+    )
+    return RateLimitError("Rate limit exceeded", response=response, body=None)
+
+
+def test_waiting_requests_are_served_round_robin_across_users(monkeypatch):
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "1")
+
+    async def _run():
+        limiter = LLMRateLimiter()
+        order = []
+        release = asyncio.Event()
+
+        async def request(user, name):
+            set_llm_rate_limit_user(user)
+            async with limiter.limit("key", "gpt-4.1", 10):
+                order.append(name)
+                if name == "first":
+                    await release.wait()
+
+        first = asyncio.create_task(request("a", "first"))
+        await asyncio.sleep(0)
+        # 用户a先排入3个请求，用户b随后排入1个
+        tasks = [asyncio.create_task(request("a", f"a{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request("b", "b0")))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, *tasks)
+        return order
+
+    assert asyncio.run(_run()) == ["first", "a0", "b0", "a1", "a2"]
+
+
+def test_rate_limit_halves_concurrency_and_retries(monkeypatch):
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "8")
+
+    async def _run():
+        limiter = LLMRateLimiter()
+        calls = []
+
+        async def create():
+            calls.append(1)
+            if len(calls) == 1:
+                raise _rate_limit_error()
+            return "ok"
+
+        result = await limiter.run("key", "gpt-4.1", 10, create)
+        state = limiter._states[("key", "gpt-4.1")]
+        return result, len(calls), state.limit, state.in_flight
+
+    result, n_calls, limit, in_flight = asyncio.run(_run())
+
+    assert result == "ok"
+    assert n_calls == 2
+    # 429后减半，随后一次成功请求加法增加
+    assert limit == pytest.approx(4 + 1 / 4)
+    assert in_flight == 0
+
+
+def test_rate_limit_error_is_raised_after_max_retries(monkeypatch):
+    monkeypatch.setenv("LLM_RATE_LIMIT_RETRIES", "1")
+
+    async def _run():
+        limiter = LLMRateLimiter()
+
+        async def create():
+            raise _rate_limit_error()
+
+        with pytest.raises(RateLimitError):
+            await limiter.run("key", "gpt-4.1", 10, create)
+        return limiter._states[("key", "gpt-4.1")]
+
+    state = asyncio.run(_run())
+    assert state.in_flight == 0
+    assert state.limit < state.max_concurrency
+
+
+def test_token_bucket_waits_for_refill():
+    async def _run():
+        bucket = TokenBucket(600)  # 每秒补充10个
+        await bucket.acquire(600)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await bucket.acquire(2)
+        return loop.time() - started
+
+    assert 0.15 <= asyncio.run(_run()) < 1
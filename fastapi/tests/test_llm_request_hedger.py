@@ -0,0 +1,134 @@
+import asyncio
+from functools import partial
+
+from services.llm_rate_limiter import LLMRateLimiter
+from services.llm_request_hedger import LatencyTracker, LLMRequestHedger
+from services.metrics_service import METRICS_SERVICE
+
+
+def _warm_up(hedger: LLMRequestHedger, model: str, latency: float):
+    tracker = hedger._get_tracker(model)
+    for _ in range(tracker.min_samples):
+        tracker.record(latency)
+    # 预算按最近的请求数计算
+    hedger._recent_requests.extend([False] * 100)
+
+
+def test_slow_request_is_hedged_and_faster_duplicate_wins(monkeypatch):
+    monkeypatch.setenv("LLM_HEDGE_REQUESTS", "true")
+
+    async def _run():
+        hedger = LLMRequestHedger()
+        _warm_up(hedger, "gpt-4.1", 0.02)
+        calls = []
+        cancelled = []
+
+        async def create():
+            attempt = len(calls)
+            calls.append(attempt)
+            try:
+                # 第一次请求很慢，对冲请求很快返回
+                await asyncio.sleep(1 if attempt == 0 else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(attempt)
+                raise
+            return attempt
+
+        wins = METRICS_SERVICE.get_counter("llm_request_hedger.hedge_wins")
+        result = await hedger.run("gpt-4.1", create)
+        await asyncio.sleep(0)
+        return (
+            result,
+            calls,
+            cancelled,
+            METRICS_SERVICE.get_counter("llm_request_hedger.hedge_wins") - wins,
+        )
+
+    result, calls, cancelled, new_wins = asyncio.run(_run())
+
+    assert result == 1
+    assert calls == [0, 1]
+    assert cancelled == [0]
+    assert new_wins == 1
+
+
+def test_no_hedge_without_budget_or_when_disabled(monkeypatch):
+    async def _run():
+        hedger = LLMRequestHedger()
+        _warm_up(hedger, "gpt-4.1", 0.01)
+        calls = []
+
+        async def create():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        monkeypatch.setenv("LLM_HEDGE_REQUESTS", "false")
+        await hedger.run("gpt-4.1", create)
+        monkeypatch.setenv("LLM_HEDGE_REQUESTS", "true")
+        monkeypatch.setenv("LLM_HEDGE_BUDGET_PERCENT", "0")
+        await hedger.run("gpt-4.1", create)
+        return len(calls)
+
+    assert asyncio.run(_run()) == 2
+
+
+def test_failed_hedge_falls_back_to_primary_result(monkeypatch):
+    monkeypatch.setenv("LLM_HEDGE_REQUESTS", "true")
+
+    async def _run():
+        hedger = LLMRequestHedger()
+        _warm_up(hedger, "gpt-4.1", 0.01)
+        calls = []
+
+        async def create():
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError("upstream error")
+            await asyncio.sleep(0.05)
+            return "primary"
+
+        return await hedger.run("gpt-4.1", create)
+
+    assert asyncio.run(_run()) == "primary"
+
+
+def test_p90_requires_enough_samples():
+    tracker = LatencyTracker(min_samples=10)
+    for latency in range(1, 10):
+        tracker.record(latency)
+    assert tracker.percentile(90) is None
+
+    tracker.record(10)
+    assert tracker.percentile(90) == 9
+
+
+def test_time_queued_in_rate_limiter_does_not_trigger_hedge(monkeypatch):
+    monkeypatch.setenv("LLM_HEDGE_REQUESTS", "true")
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "1")
+
+    async def _run():
+        hedger = LLMRequestHedger()
+        limiter = LLMRateLimiter()
+        _warm_up(hedger, "gpt-4.1", 0.02)
+        calls = []
+
+        async def create():
+            calls.append(1)
+            await asyncio.sleep(0.015)
+            return len(calls)
+
+        # 与 LLMClient 相同：在限流名额内对冲，第二个请求排队等待的时间不触发对冲
+        def request():
+            return limiter.run(
+                "key", "gpt-4.1", 0, partial(hedger.run, "gpt-4.1", create)
+            )
+
+        await asyncio.gather(request(), request())
+        return calls, hedger._get_tracker("gpt-4.1").percentile(100)
+
+    calls, max_latency = asyncio.run(_run())
+
+    assert len(calls) == 2
+    # 记录的是上游请求本身的延迟，不含排队时间
+    assert max_latency < 0.03
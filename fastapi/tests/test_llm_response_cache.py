@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime, timedelta
+import os
+import tempfile
+
+os.environ.setdefault("APP_DATA_DIRECTORY", tempfile.mkdtemp())
+
+from models.llm_message import LLMSystemMessage, LLMUserMessage
+from models.sql.llm_response_cache import LLMResponseCacheModel
+from services.llm_response_cache import (
+    LLMResponseCache,
+    start_llm_response_cache_tracking,
+)
+
+
+SQLITE_TABLES = [LLMResponseCacheModel.__table__]
+
+
+def _messages(outline: str):
+    return [
+        LLMSystemMessage(content="Generate structured slide"),
+        LLMUserMessage(content=outline),
+    ]
+
+
+def test_key_depends_on_model_messages_schema_and_tools():
+    cache = LLMResponseCache(None)
+    schema = {"type": "object", "properties": {"title": {"type": "string"}}}
+    key = cache.build_key("gpt-4.1", _messages("A"), schema)
+
+    assert key == cache.build_key("gpt-4.1", _messages("A"), dict(schema))
+    assert key != cache.build_key("gpt-5", _messages("A"), schema)
+    assert key != cache.build_key("gpt-4.1", _messages("B"), schema)
+    assert key != cache.build_key("gpt-4.1", _messages("A"), {"type": "object"})
+    assert key != cache.build_key("gpt-4.1", _messages("A"), schema, strict=True)
+    assert key != cache.build_key(
+        "gpt-4.1", _messages("A"), schema, tools=[{"type": "function"}]
+    )
+
+
+def test_cached_response_is_returned_until_it_expires(session_maker, monkeypatch):
+    monkeypatch.setenv("LLM_RESPONSE_CACHE_TTL", "60")
+
+    async def _run():
+        cache = LLMResponseCache(session_maker)
+        stats = start_llm_response_cache_tracking()
+
+        assert await cache.get("key") is None
+        await cache.set("key", "gpt-4.1", {"title": "Hello"})
+        assert await cache.get("key") == {"title": "Hello"}
+
+        async with session_maker() as sql_session:
+            entry = await sql_session.get(LLMResponseCacheModel, "key")
+            entry.expires_at = datetime.now() - timedelta(seconds=1)
+            await sql_session.commit()
+
+        assert await cache.get("key") is None
+        return stats
+
+    assert asyncio.run(_run()) == {"hits": 1, "misses": 2}
+
+
+def test_oldest_entries_are_evicted_over_max_entries(session_maker, monkeypatch):
+    monkeypatch.setenv("LLM_RESPONSE_CACHE_MAX_ENTRIES", "2")
+
+    async def _run():
+        cache = LLMResponseCache(session_maker)
+        for index in range(3):
+            await cache.set(f"key-{index}", "gpt-4.1", {"index": index})
+            await asyncio.sleep(0.01)
+        return [await cache.get(f"key-{index}") for index in range(3)]
+
+    assert asyncio.run(_run()) == [None, {"index": 1}, {"index": 2}]
@@ -0,0 +1,23 @@
+from datetime import datetime, timezone
+import uuid
+
+from fastapi import HTTPException
+import pytest
+
+from utils.pagination import decode_created_at_cursor, encode_created_at_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc)
+    id = uuid.uuid4()
+
+    cursor = encode_created_at_cursor(created_at, id)
+
+    assert "=" not in cursor
+    assert decode_created_at_cursor(cursor) == (created_at, id)
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(HTTPException) as exc_info:
+        decode_created_at_cursor("not-a-cursor")
+    assert exc_info.value.status_code == 400
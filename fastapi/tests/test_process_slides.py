@@ -0,0 +1,51 @@
+import asyncio
+
+from models.sql.slide import SlideModel
+from services.icon_finder_service import ICON_FINDER_SERVICE
+from utils.process_slides import process_slide_and_fetch_assets
+
+
+class FakeImageGenerationService:
+    async def generate_image(self, prompt):
+        # 第一张图片较慢，用于验证资产按完成顺序回调
+        await asyncio.sleep(0.05 if prompt.prompt == "slow" else 0)
+        return f"https://images.example.com/{prompt.prompt}.png"
+
+
+def test_each_asset_is_reported_as_soon_as_it_is_fetched(monkeypatch):
+    async def search_icons(query):
+        return [f"/static/icons/{query}.svg"]
+
+    monkeypatch.setattr(ICON_FINDER_SERVICE, "search_icons", search_icons)
+
+    slide = SlideModel(
+        presentation="00000000-0000-0000-0000-000000000000",
+        layout_group="general",
+        layout="general:image-and-icons",
+        index=0,
+        content={
+            "image": {"__image_prompt__": "slow"},
+            "items": [
+                {"icon": {"__icon_query__": "chart"}},
+                {"image": {"__image_prompt__": "fast"}},
+            ],
+        },
+    )
+    events = []
+
+    asyncio.run(
+        process_slide_and_fetch_assets(
+            FakeImageGenerationService(), slide, on_asset=events.append
+        )
+    )
+
+    assert events[-1] == {
+        "asset_type": "image",
+        "path": ["image"],
+        "url": "https://images.example.com/slow.png",
+    }
+    assert {"asset_type": "icon", "path": ["items", 0, "icon"], "url": "/static/icons/chart.svg"} in events
+    assert slide.content["items"][1]["image"]["__image_url__"] == (
+        "https://images.example.com/fast.png"
+    )
+    assert slide.content["items"][0]["icon"]["__icon_url__"] == "/static/icons/chart.svg"
@@ -0,0 +1,74 @@
+import os
+import tempfile
+from types import SimpleNamespace
+
+os.environ.setdefault("APP_DATA_DIRECTORY", tempfile.mkdtemp())
+
+from models.llm_message import LLMSystemMessage, LLMUserMessage
+from services.llm_client import serialize_messages
+from services.llm_usage_metrics import get_prompt_cache_stats, record_prompt_cache_usage
+from services.metrics_service import METRICS_SERVICE
+from utils.llm_calls import edit_slide, generate_slide_content
+
+
+def test_system_prompt_does_not_depend_on_request_fields():
+    first = generate_slide_content.get_messages(
+        "Outline A", "English", tone="casual", verbosity="concise", instructions="Be brief"
+    )
+    second = generate_slide_content.get_messages("Outline B", "Chinese")
+
+    assert first[0].content == second[0].content
+    assert first[0].cacheable
+    # 请求相关内容放在用户消息末尾，日期在最后
+    user_prompt = first[1].content
+    assert user_prompt.index("Outline A") < user_prompt.index("Be brief")
+    assert user_prompt.rstrip().splitlines()[-2] == "## Current Date"
+
+
+def test_edit_system_prompt_is_static():
+    first = edit_slide.get_messages("Shorter", {"title": "A"}, "English", tone="funny")
+    second = edit_slide.get_messages("Longer", {"title": "B"}, "English")
+
+    assert first[0].content == second[0].content
+    assert "funny" in first[1].content
+
+
+def test_cacheable_messages_get_cache_control_only_when_enabled(monkeypatch):
+    messages = [
+        LLMSystemMessage(content="static", cacheable=True),
+        LLMUserMessage(content="dynamic"),
+    ]
+
+    monkeypatch.delenv("LLM_PROMPT_CACHE_CONTROL", raising=False)
+    assert serialize_messages(messages) == [
+        {"role": "system", "content": "static"},
+        {"role": "user", "content": "dynamic"},
+    ]
+
+    monkeypatch.setenv("LLM_PROMPT_CACHE_CONTROL", "true")
+    serialized = serialize_messages(messages)
+    assert serialized[0]["content"] == [
+        {"type": "text", "text": "static", "cache_control": {"type": "ephemeral"}}
+    ]
+    assert serialized[1] == {"role": "user", "content": "dynamic"}
+
+
+def test_cached_token_ratio_is_reported(monkeypatch):
+    monkeypatch.setattr(METRICS_SERVICE, "_counters", type(METRICS_SERVICE._counters)(float))
+
+    record_prompt_cache_usage(
+        SimpleNamespace(
+            prompt_tokens=1000,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=750),
+        )
+    )
+    record_prompt_cache_usage(
+        SimpleNamespace(prompt_tokens=1000, prompt_tokens_details=None)
+    )
+    record_prompt_cache_usage(None)
+
+    assert get_prompt_cache_stats() == {
+        "prompt_tokens": 2000,
+        "cached_tokens": 750,
+        "cached_ratio": 0.375,
+    }
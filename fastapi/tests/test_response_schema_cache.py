@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from models.presentation_layout import SlideLayoutModel
+from services.response_schema_cache import (
+    ResponseSchemaCache,
+    compile_slide_response_schema,
+)
+from utils.schema_utils import thaw_schema, to_strict_json_schema
+
+
+def _slide_layout(title_max_length: int = 50) -> SlideLayoutModel:
+    return SlideLayoutModel(
+        id="general:basic-info",
+        json_schema={
+            "type": "object",
+            "properties": {
+                "title": {"type": "string", "maxLength": title_max_length},
+                "image": {
+                    "type": "object",
+                    "properties": {
+                        "__image_url__": {"type": "string"},
+                        "__image_prompt__": {"type": "string"},
+                    },
+                    "required": ["__image_url__", "__image_prompt__"],
+                },
+            },
+            "required": ["title", "image"],
+        },
+    )
+
+
+def test_compiled_schema_is_cached_per_layout_and_schema():
+    cache = ResponseSchemaCache()
+    layout = _slide_layout()
+
+    first = cache.get_slide_response_schema(layout)
+    second = cache.get_slide_response_schema(layout.model_copy(deep=True))
+    changed = cache.get_slide_response_schema(_slide_layout(title_max_length=80))
+
+    assert first is second
+    assert changed is not first
+    assert len(cache) == 2
+    assert thaw_schema(first) == compile_slide_response_schema(layout.json_schema)
+    assert "__image_url__" not in first["properties"]["image"]["properties"]
+    assert "__speaker_note__" in first["required"]
+
+
+def test_compiled_schema_is_read_only_and_serializable():
+    schema = ResponseSchemaCache().get_slide_response_schema(_slide_layout())
+
+    with pytest.raises(TypeError):
+        schema["properties"]["title"]["maxLength"] = 1
+    with pytest.raises(TypeError):
+        schema["required"].append("other")
+
+    assert json.loads(json.dumps(schema))["properties"]["title"]["maxLength"] == 50
+
+
+def test_strict_schema_is_compiled_once():
+    cache = ResponseSchemaCache()
+    schema = cache.get_slide_response_schema(_slide_layout(), strict=True)
+
+    assert schema.strict
+    assert schema["additionalProperties"] is False
+    assert to_strict_json_schema(schema) is schema
+
+    # 非strict的只读schema会复制后再转换，不影响缓存内容
+    loose = cache.get_slide_response_schema(_slide_layout())
+    strict_copy = to_strict_json_schema(loose)
+    assert strict_copy["additionalProperties"] is False
+    assert "additionalProperties" not in loose
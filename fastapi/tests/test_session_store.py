@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timedelta
+import json
+import os
+import tempfile
+
+os.environ.setdefault("APP_DATA_DIRECTORY", tempfile.mkdtemp())
+
+from services.redis_service import REDIS_SERVICE
+from services.session_store import InMemorySessionStore, RedisSessionStore
+
+
+def _session(expires_in: timedelta) -> dict:
+    now = datetime.now()
+    return {"user_id": "u", "created_at": now, "expires_at": now + expires_in}
+
+
+def test_expired_session_is_not_returned():
+    async def _run():
+        store = InMemorySessionStore(max_entries=10)
+        await store.set("expired", _session(timedelta(seconds=-1)))
+        await store.set("valid", _session(timedelta(hours=1)))
+
+        assert await store.get("expired") is None
+        assert (await store.get("valid"))["user_id"] == "u"
+        assert len(store) == 1
+
+    asyncio.run(_run())
+
+
+def test_least_recently_used_session_is_evicted():
+    async def _run():
+        store = InMemorySessionStore(max_entries=2)
+        await store.set("a", _session(timedelta(hours=1)))
+        await store.set("b", _session(timedelta(hours=1)))
+        await store.get("a")
+        await store.set("c", _session(timedelta(hours=1)))
+
+        assert await store.get("b") is None
+        assert await store.get("a") is not None
+        assert await store.get("c") is not None
+
+    asyncio.run(_run())
+
+
+def test_sweep_removes_expired_sessions():
+    async def _run():
+        store = InMemorySessionStore(max_entries=10)
+        for i in range(3):
+            await store.set(f"expired-{i}", _session(timedelta(seconds=-1)))
+        await store.set("valid", _session(timedelta(hours=1)))
+
+        assert await store.sweep() == 3
+        assert len(store) == 1
+
+    asyncio.run(_run())
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+def test_redis_session_stores_api_key_encrypted(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(REDIS_SERVICE, "_client", redis)
+    store = RedisSessionStore()
+    session = {**_session(timedelta(hours=1)), "api_key": "sk-secret"}
+
+    async def _run():
+        await store.set("s1", session)
+        loaded = await store.get("s1")
+        # 旧版本以明文保存的会话需要重新登录
+        legacy_session = json.dumps({**session, "api_key": "sk-plain"}, default=str)
+        await redis.set(store._key("s2"), legacy_session)
+        return loaded, await store.get("s2")
+
+    loaded, legacy = asyncio.run(_run())
+
+    assert "sk-secret" not in redis.data[store._key("s1")]
+    assert loaded["api_key"] == "sk-secret"
+    assert loaded["expires_at"] == session["expires_at"]
+    assert session["api_key"] == "sk-secret"
+    assert legacy is None
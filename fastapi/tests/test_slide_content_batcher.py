@@ -0,0 +1,105 @@
+import asyncio
+import os
+import tempfile
+
+from fastapi import HTTPException
+
+os.environ.setdefault("APP_DATA_DIRECTORY", tempfile.mkdtemp())
+
+from models.presentation_layout import SlideLayoutModel
+from models.presentation_outline_model import SlideOutlineModel
+from utils import slide_content_batcher
+from utils.llm_calls.generate_slide_content import get_batch_response_schema
+from utils.slide_content_batcher import SlideContentBatcher
+
+
+def _layout(id: str, n_properties: int = 1) -> SlideLayoutModel:
+    return SlideLayoutModel(
+        id=id,
+        json_schema={
+            "type": "object",
+            "properties": {
+                f"field_{index}": {"type": "string", "maxLength": 50}
+                for index in range(n_properties)
+            },
+        },
+    )
+
+
+def _patch_llm_calls(monkeypatch, batch_calls, single_calls, fail_batch=False):
+    async def batched(slides, *args):
+        batch_calls.append([outline.content for _, outline in slides])
+        if fail_batch:
+            raise HTTPException(status_code=400, detail="Invalid response")
+        # 最后一张幻灯片缺失，需要单独生成
+        return {
+            index: {"title": outline.content}
+            for index, (_, outline) in enumerate(slides[:-1])
+        }
+
+    async def single(slide_layout, outline, **kwargs):
+        single_calls.append(outline.content)
+        return {"title": outline.content}
+
+    monkeypatch.setattr(
+        slide_content_batcher, "get_slides_content_from_types_and_outlines", batched
+    )
+    monkeypatch.setattr(
+        slide_content_batcher, "get_slide_content_from_type_and_outline", single
+    )
+
+
+def test_concurrent_slides_share_one_request_and_missing_slides_fall_back(monkeypatch):
+    batch_calls, single_calls = [], []
+    _patch_llm_calls(monkeypatch, batch_calls, single_calls)
+
+    async def _run():
+        batcher = SlideContentBatcher("English", "key", max_batch_size=3)
+        return await asyncio.gather(
+            *[
+                batcher.generate(_layout("general:title"), SlideOutlineModel(content=name))
+                for name in ["a", "b", "c", "d"]
+            ]
+        )
+
+    results = asyncio.run(_run())
+
+    assert [result["title"] for result in results] == ["a", "b", "c", "d"]
+    # 前3张一批，剩余1张等待超时后单独发送
+    assert batch_calls == [["a", "b", "c"]]
+    assert single_calls == ["c", "d"]
+
+
+def test_batch_size_adapts_to_schema_size(monkeypatch):
+    batch_calls, single_calls = [], []
+    _patch_llm_calls(monkeypatch, batch_calls, single_calls, fail_batch=True)
+
+    async def _run():
+        small_schema_chars = len(str(_layout("general:title").json_schema))
+        batcher = SlideContentBatcher(
+            "English",
+            "key",
+            max_batch_size=10,
+            max_schema_chars=small_schema_chars * 6,
+        )
+        layouts = [_layout("general:title")] * 2 + [_layout("general:table", 20)] * 2
+        return await asyncio.gather(
+            *[
+                batcher.generate(layout, SlideOutlineModel(content=str(index)))
+                for index, layout in enumerate(layouts)
+            ]
+        )
+
+    results = asyncio.run(_run())
+
+    assert [result["title"] for result in results] == ["0", "1", "2", "3"]
+    # 大schema的幻灯片不与其他幻灯片合并；批量请求失败后全部单独生成
+    assert batch_calls == [["0", "1"]]
+    assert sorted(single_calls) == ["0", "1", "2", "3"]
+
+
+def test_batch_response_schema_has_one_property_per_slide():
+    schema = get_batch_response_schema([{"type": "object"}, {"type": "array"}])
+
+    assert schema["required"] == ["slide_1", "slide_2"]
+    assert schema["properties"]["slide_2"] == {"type": "array"}
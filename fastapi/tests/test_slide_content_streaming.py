@@ -0,0 +1,62 @@
+import asyncio
+import json
+import os
+import tempfile
+
+os.environ.setdefault("APP_DATA_DIRECTORY", tempfile.mkdtemp())
+
+from models.presentation_layout import SlideLayoutModel
+from models.presentation_outline_model import SlideOutlineModel
+from services.llm_client import LLMClient
+from utils.llm_calls.generate_slide_content import (
+    get_slide_content_from_type_and_outline,
+)
+
+
+def test_slide_content_is_streamed_as_patches(monkeypatch):
+    monkeypatch.delenv("LLM_RESPONSE_CACHE", raising=False)
+    content = {
+        "title": "Solar power is now the cheapest source of new electricity "
+        "in most of the world, and it keeps getting cheaper every year",
+        "bulletPoints": [{"title": "Cheap"}, {"title": "Clean"}],
+        "__speaker_note__": "Solar is now the cheapest source of electricity.",
+    }
+
+    async def stream(self, **kwargs):
+        text = json.dumps(content)
+        for start in range(0, len(text), 8):
+            yield text[start : start + 8]
+
+    monkeypatch.setattr(LLMClient, "_stream_openai_structured", stream)
+    patches = []
+
+    response = asyncio.run(
+        get_slide_content_from_type_and_outline(
+            SlideLayoutModel(
+                id="general:bullets",
+                json_schema={"type": "object", "properties": {}},
+            ),
+            SlideOutlineModel(content="Solar power"),
+            "English",
+            api_key="key",
+            on_patch=patches.append,
+        )
+    )
+
+    assert response == content
+    # 标题先于要点到达，并逐步补全
+    paths = [patch["path"] for batch in patches for patch in batch]
+    assert paths.index(["title"]) < paths.index(["bulletPoints"])
+    assert len([path for path in paths if path == ["title"]]) > 1
+
+    rebuilt = {}
+    for batch in patches:
+        for patch in batch:
+            target = rebuilt
+            for key in patch["path"][:-1]:
+                target = target[key]
+            if isinstance(target, list) and patch["path"][-1] == len(target):
+                target.append(patch["value"])
+            else:
+                target[patch["path"][-1]] = patch["value"]
+    assert rebuilt == content
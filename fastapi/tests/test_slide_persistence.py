@@ -0,0 +1,110 @@
+import asyncio
+import os
+import tempfile
+import uuid
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import select
+
+os.environ.setdefault("APP_DATA_DIRECTORY", tempfile.mkdtemp())
+
+from models.sql.presentation import PresentationModel
+from models.sql.slide import SlideModel
+from utils.slide_persistence import save_presentation_slides
+
+
+SQLITE_TABLES = [PresentationModel.__table__, SlideModel.__table__]
+
+
+def _slide(index: int, text: str, id: uuid.UUID = None) -> SlideModel:
+    return SlideModel(
+        id=id or uuid.uuid4(),
+        layout_group="general",
+        layout="general:title",
+        index=index,
+        content={"title": text},
+        html_content=None,
+        properties=None,
+    )
+
+
+def test_only_changed_rows_are_written(sqlite_engine, session_maker):
+    statements = []
+
+    @event.listens_for(sqlite_engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    async def _run():
+        presentation_id = uuid.uuid4()
+        slides = [_slide(0, "a"), _slide(1, "b"), _slide(2, "c")]
+
+        async with session_maker() as sql_session:
+            sql_session.add(
+                PresentationModel(
+                    id=presentation_id, content="", n_slides=3, language="en"
+                )
+            )
+            await save_presentation_slides(sql_session, presentation_id, slides)
+            await sql_session.commit()
+
+        statements.clear()
+        async with session_maker() as sql_session:
+            incoming = [
+                _slide(0, "a", slides[0].id),
+                _slide(1, "b changed", slides[1].id),
+                _slide(2, "new"),
+            ]
+            await save_presentation_slides(sql_session, presentation_id, incoming)
+            await sql_session.commit()
+
+            stored = (
+                await sql_session.scalars(
+                    select(SlideModel)
+                    .where(SlideModel.presentation == presentation_id)
+                    .order_by(SlideModel.index)
+                )
+            ).all()
+
+        return slides, incoming, stored
+
+    slides, incoming, stored = asyncio.run(_run())
+
+    assert [slide.id for slide in stored] == [slide.id for slide in incoming]
+    assert stored[1].content == {"title": "b changed"}
+    assert all(slide.content_hash for slide in stored)
+    writes = [s for s in statements if s in ("INSERT", "UPDATE", "DELETE")]
+    assert sorted(writes) == ["DELETE", "INSERT", "UPDATE"]
+
+
+def test_unchanged_slides_produce_no_writes(sqlite_engine, session_maker):
+    async def _run():
+        presentation_id = uuid.uuid4()
+        slides = [_slide(0, "a"), _slide(1, "b")]
+        async with session_maker() as sql_session:
+            sql_session.add(
+                PresentationModel(
+                    id=presentation_id, content="", n_slides=2, language="en"
+                )
+            )
+            await save_presentation_slides(sql_session, presentation_id, slides)
+            await sql_session.commit()
+
+        statements = []
+
+        @event.listens_for(sqlite_engine.sync_engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split()[0].upper())
+
+        async with session_maker() as sql_session:
+            await save_presentation_slides(
+                sql_session,
+                presentation_id,
+                [_slide(slide.index, slide.content["title"], slide.id) for slide in slides],
+            )
+            await sql_session.commit()
+        return statements
+
+    statements = asyncio.run(_run())
+    assert statements == ["SELECT"]
@@ -0,0 +1,128 @@
+import copy
+import json
+
+from utils.streaming_json import (
+    PartialJsonParser,
+    StreamingJsonArrayParser,
+    diff_json_patches,
+)
+
+
+OUTLINE = {
+    "title": "Quarterly {review}",
+    "slides": [
+        {"content": "# Intro\nWelcome to the \"Q3\" review [draft]"},
+        {"content": "Numbers: {revenue: 10}, ]} inside a string"},
+        {"content": "Summary"},
+    ],
+}
+
+
+def _feed_in_chunks(parser, text, size):
+    emitted = []
+    for start in range(0, len(text), size):
+        emitted.append(parser.feed(text[start : start + size]))
+    return emitted
+
+
+def test_slides_are_emitted_as_soon_as_they_close():
+    text = json.dumps(OUTLINE)
+    parser = StreamingJsonArrayParser("slides")
+
+    emitted = _feed_in_chunks(parser, text, 7)
+
+    assert parser.items == OUTLINE["slides"]
+    assert parser.is_complete
+    # 每个元素在其右括号所在的块中返回，而不是等到整个JSON结束
+    first_close = text.index('"}, ') + 2
+    first_chunk_with_slide = next(i for i, items in enumerate(emitted) if items)
+    assert first_chunk_with_slide == (first_close - 1) // 7
+
+
+def test_fenced_and_truncated_output_keeps_completed_slides():
+    text = "```json\n" + json.dumps(OUTLINE, indent=2)
+    truncated = text[: text.index("Summary")]
+    parser = StreamingJsonArrayParser("slides")
+
+    _feed_in_chunks(parser, truncated, 3)
+
+    assert parser.items == OUTLINE["slides"][:2]
+    assert not parser.is_complete
+
+
+def test_nested_arrays_with_the_same_key_are_ignored():
+    text = json.dumps(
+        {"meta": {"slides": [{"content": "ignored"}]}, "slides": [{"content": "kept"}]}
+    )
+    parser = StreamingJsonArrayParser("slides")
+
+    parser.feed(text)
+
+    assert parser.items == [{"content": "kept"}]
+
+
+def test_items_closed_in_one_chunk_keep_their_array_positions():
+    parser = StreamingJsonArrayParser("slides")
+
+    first = parser.feed('{"slides": [{"content": "a"}, {"content": "b"}, {"content": }')
+    second = parser.feed(', {"content": "c"}]}')
+
+    assert first == [(0, {"content": "a"}), (1, {"content": "b"})]
+    # 无法解析的元素被跳过，但仍占用序号
+    assert second == [(3, {"content": "c"})]
+    assert parser.items == [{"content": "a"}, {"content": "b"}, {"content": "c"}]
+
+
+def test_partial_parser_returns_growing_object_and_skips_incomplete_values():
+    text = '{"title": "Solar \\"power\\"", "count": 12, "bulletPoints": [{"title": "Cheap"}]}'
+    parser = PartialJsonParser(min_reparse_chars=1)
+    snapshots = []
+    for char in text:
+        value = parser.feed(char)
+        if not snapshots or snapshots[-1] != value:
+            snapshots.append(copy.deepcopy(value))
+
+    assert snapshots[0] == {}
+    assert {"title": 'Solar "po'} in snapshots
+    # 未完成的数字和缺少值的键不会出现
+    assert {"title": 'Solar "power"', "count": 1} not in snapshots
+    assert {"title": 'Solar "power"', "count": None} not in snapshots
+    assert snapshots[-1] == json.loads(text)
+
+
+def test_partial_parser_reparses_only_on_completed_values_or_enough_new_text():
+    long_text = "x" * 1000
+    text = json.dumps({"title": "Solar", "description": long_text, "count": 12})
+    parser = PartialJsonParser(min_reparse_chars=100)
+    snapshots = []
+    for char in text:
+        value = parser.feed(char)
+        if not snapshots or snapshots[-1] != value:
+            snapshots.append(copy.deepcopy(value))
+
+    # 每个字符都解析需要约1000次
+    assert parser.n_parses < 20
+    assert {"title": "Solar"} in snapshots
+    partial = [
+        snapshot["description"]
+        for snapshot in snapshots
+        if 0 < len(snapshot.get("description", "")) < len(long_text)
+    ]
+    # 未闭合的长字符串仍逐步返回
+    assert len(partial) > 3
+    assert snapshots[-1] == json.loads(text)
+
+
+def test_patches_set_only_changed_paths():
+    old = {"title": "Sol", "bulletPoints": [{"title": "Cheap"}]}
+    new = {
+        "title": "Solar",
+        "bulletPoints": [{"title": "Cheap"}, {"title": "Cl"}],
+        "__speaker_note__": "",
+    }
+
+    assert diff_json_patches(old, new) == [
+        {"path": ["title"], "value": "Solar"},
+        {"path": ["bulletPoints", 1], "value": {"title": "Cl"}},
+        {"path": ["__speaker_note__"], "value": ""},
+    ]
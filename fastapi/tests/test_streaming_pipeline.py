@@ -0,0 +1,171 @@
+import asyncio
+import time
+
+import pytest
+
+from models.presentation_layout import PresentationLayoutModel, SlideLayoutModel
+from models.presentation_outline_model import SlideOutlineModel
+from utils.llm_calls.generate_presentation_structure import (
+    get_messages,
+    get_messages_for_slide,
+)
+from utils.ppt_utils import (
+    get_slide_position_with_toc,
+    get_table_of_contents_outlines,
+    get_toc_slide_position,
+)
+from utils.streaming_pipeline import PipelineStage, StreamingPipeline
+
+
+def test_items_flow_through_stages_without_waiting_for_each_other():
+    async def _run():
+        async def first(item):
+            await asyncio.sleep(0.05)
+            return item * 10
+
+        async def second(item):
+            await asyncio.sleep(0.05)
+            return item + 1
+
+        pipeline = StreamingPipeline([PipelineStage(first), PipelineStage(second)])
+        started = time.monotonic()
+        for index in range(3):
+            pipeline.submit(index, index)
+            # 模拟大纲逐页流式到达
+            await asyncio.sleep(0.05)
+        results = await pipeline.join()
+        return results, time.monotonic() - started
+
+    results, elapsed = asyncio.run(_run())
+
+    assert results == {0: 1, 1: 11, 2: 21}
+    # 顺序执行需要 3*0.05 + 3*0.1，流水线接近 最后一项到达 + 单条链路耗时
+    assert elapsed < 0.35
+
+
+def test_stage_concurrency_is_limited():
+    async def _run():
+        running = 0
+        max_running = 0
+
+        async def stage(item):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return item
+
+        pipeline = StreamingPipeline([PipelineStage(stage, concurrency=2)])
+        for index in range(6):
+            pipeline.submit(index, index)
+        await pipeline.join()
+        return max_running
+
+    assert asyncio.run(_run()) == 2
+
+
+def test_failure_cancels_remaining_items():
+    async def _run():
+        cancelled = []
+
+        async def stage(item):
+            if item == "bad":
+                raise RuntimeError("boom")
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(item)
+                raise
+            return item
+
+        pipeline = StreamingPipeline([PipelineStage(stage)])
+        pipeline.submit("slow", "slow")
+        pipeline.submit("bad", "bad")
+        with pytest.raises(RuntimeError):
+            await pipeline.join()
+        with pytest.raises(RuntimeError):
+            pipeline.submit("late", "late")
+        return cancelled
+
+    assert asyncio.run(_run()) == ["slow"]
+
+
+def _inject_toc_in_place(outlines, n_toc_slides, include_title_slide):
+    # prepare_presentation 中原有的目录插入逻辑
+    slides = list(outlines)
+    total_outlines = len(outlines)
+    outline_index = 1 if include_title_slide else 0
+    for i in range(n_toc_slides):
+        outlines_to = outline_index + 10
+        if total_outlines == outlines_to:
+            outlines_to -= 1
+        toc_outline = f"Table of Contents\n\n"
+        for outline in slides[outline_index:outlines_to]:
+            page_number = (
+                outline_index - i + n_toc_slides + 1
+                if include_title_slide
+                else outline_index - i + n_toc_slides
+            )
+            toc_outline += f"Slide page number: {page_number}\n Slide Content: {outline.content[:100]}\n\n"
+            outline_index += 1
+        outline_index += 1
+        slides.insert(
+            i + 1 if include_title_slide else i,
+            SlideOutlineModel(content=toc_outline),
+        )
+    return slides
+
+
+@pytest.mark.parametrize("include_title_slide", [True, False])
+@pytest.mark.parametrize("n_outlines,n_toc_slides", [(5, 1), (19, 2), (25, 3)])
+def test_toc_positions_match_in_place_injection(
+    include_title_slide, n_outlines, n_toc_slides
+):
+    outlines = [SlideOutlineModel(content=f"Slide {i}") for i in range(n_outlines)]
+    expected = _inject_toc_in_place(outlines, n_toc_slides, include_title_slide)
+
+    actual = [None] * (n_outlines + n_toc_slides)
+    for index, outline in enumerate(outlines):
+        actual[
+            get_slide_position_with_toc(index, n_toc_slides, include_title_slide)
+        ] = outline
+    for index, toc_outline in enumerate(
+        get_table_of_contents_outlines(outlines, n_toc_slides, include_title_slide)
+    ):
+        actual[get_toc_slide_position(index, include_title_slide)] = (
+            SlideOutlineModel(content=toc_outline)
+        )
+
+    assert actual == expected
+
+
+def test_single_slide_layout_prompt_includes_previous_layouts():
+    layout = PresentationLayoutModel(
+        name="general",
+        slides=[
+            SlideLayoutModel(id="title", name="Title", json_schema={}),
+            SlideLayoutModel(id="bullets", name="Bullets", json_schema={}),
+        ],
+    )
+    messages = get_messages_for_slide(
+        layout,
+        3,
+        8,
+        SlideOutlineModel(content="# Market size\nGrowing 20% yearly").content,
+        [0, 1],
+        instructions="Use charts",
+    )
+
+    # 与整体结构生成共用系统提示词，便于命中提示词缓存
+    assert messages[0].content == get_messages(layout, 8, "")[0].content
+    user_prompt = messages[1].content
+    assert "## Slide 3 of 8\n# Market size\nGrowing 20% yearly" in user_prompt
+    assert "content=" not in user_prompt
+    assert "- Layout 0\n- Layout 1" in user_prompt
+    assert "slide 3 only" in user_prompt
+    assert "each of the" not in user_prompt
+    assert user_prompt.index("Layout 1") < user_prompt.index("Use charts")
+
+    first_slide_prompt = get_messages_for_slide(layout, 1, 8, "Intro", [])[1].content
+    assert "Previous Slides" not in first_slide_prompt
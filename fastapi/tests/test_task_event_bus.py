@@ -0,0 +1,38 @@
+import asyncio
+
+from services.task_event_bus import TaskEventBus
+
+
+def test_subscriber_receives_last_event_then_new_events(monkeypatch):
+    monkeypatch.delenv("REDIS_URL", raising=False)
+
+    async def _run():
+        bus = TaskEventBus()
+        await bus.publish("task-1", {"type": "status", "message": "Generating slides"})
+
+        async with bus.subscribe("task-1") as subscription:
+            first = await subscription.get(timeout=1)
+            await bus.publish("task-1", {"type": "slide", "index": 0})
+            await bus.publish("task-2", {"type": "slide", "index": 5})
+            second = await subscription.get(timeout=1)
+            third = await subscription.get(timeout=0.05)
+
+        assert first == {"type": "status", "message": "Generating slides"}
+        assert second == {"type": "slide", "index": 0}
+        assert third is None
+        assert "task-1" not in bus._subscribers
+
+    asyncio.run(_run())
+
+
+def test_last_event_cache_is_bounded(monkeypatch):
+    monkeypatch.delenv("REDIS_URL", raising=False)
+
+    async def _run():
+        bus = TaskEventBus()
+        bus.MAX_CACHED_TOPICS = 2
+        for i in range(3):
+            await bus.publish(f"task-{i}", {"type": "status", "index": i})
+        assert list(bus._last_events) == ["task-1", "task-2"]
+
+    asyncio.run(_run())
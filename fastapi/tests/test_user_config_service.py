@@ -0,0 +1,74 @@
+import json
+import os
+
+from pydantic import ValidationError
+import pytest
+
+from services.user_config_service import UserConfigService
+
+
+@pytest.fixture
+def config_path(tmp_path, monkeypatch):
+    path = tmp_path / "userConfig.json"
+    path.write_text(json.dumps({"LLM": "openai", "OPENAI_MODEL": "gpt-4.1"}))
+    monkeypatch.setenv("USER_CONFIG_PATH", str(path))
+    # reload() 会同步写入这些环境变量，交给monkeypatch在测试结束后恢复
+    monkeypatch.setenv("LLM", "")
+    monkeypatch.setenv("OPENAI_MODEL", "")
+    return path
+
+
+def test_snapshot_is_loaded_once_and_immutable(config_path):
+    service = UserConfigService()
+
+    snapshot = service.snapshot
+
+    assert snapshot.LLM == "openai"
+    assert service.snapshot is snapshot
+    assert os.environ["OPENAI_MODEL"] == "gpt-4.1"
+    with pytest.raises(ValidationError):
+        snapshot.LLM = "google"
+
+
+def test_snapshot_is_replaced_when_config_file_changes(config_path):
+    service = UserConfigService()
+    first = service.snapshot
+
+    assert service.reload_if_changed() is False
+
+    config_path.write_text(json.dumps({"LLM": "openai", "OPENAI_MODEL": "gpt-4o"}))
+    first_mtime = os.path.getmtime(config_path)
+    os.utime(config_path, (first_mtime + 10, first_mtime + 10))
+
+    assert service.reload_if_changed() is True
+    assert service.snapshot is not first
+    assert service.snapshot.OPENAI_MODEL == "gpt-4o"
+
+
+def test_reload_endpoint_requires_admin_token(config_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from api.middlewares.auth_middleware import AuthMiddleware
+    from api.v1.config.router import API_V1_CONFIG_ROUTER
+    from services.session_store import SESSION_STORE, InMemorySessionStore
+
+    monkeypatch.setattr(SESSION_STORE, "_backend", InMemorySessionStore(max_entries=10))
+    monkeypatch.setenv("CAN_CHANGE_KEYS", "true")
+    app = FastAPI()
+    app.include_router(API_V1_CONFIG_ROUTER)
+    app.add_middleware(AuthMiddleware)
+    client = TestClient(app)
+
+    monkeypatch.delenv("ADMIN_API_TOKEN", raising=False)
+    assert client.post("/api/v1/config/reload").status_code == 401
+
+    monkeypatch.setenv("ADMIN_API_TOKEN", "admin-secret")
+    assert client.post(
+        "/api/v1/config/reload", headers={"Authorization": "Bearer wrong"}
+    ).status_code == 401
+    response = client.post(
+        "/api/v1/config/reload", headers={"Authorization": "Bearer admin-secret"}
+    )
+    assert response.status_code == 200
+    assert response.json()["LLM"] == "openai"
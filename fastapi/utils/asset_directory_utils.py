@@ -17,3 +17,12 @@ def get_uploads_directory():
     uploads_directory = os.path.join(get_app_data_directory_env(), "uploads")
     os.makedirs(uploads_directory, exist_ok=True)
     return uploads_directory
+
+
+def get_image_url_from_asset_path(path: str) -> str:
+    """将图片的绝对路径转换为可通过FastAPI访问的URL路径"""
+    if path.startswith(get_images_directory()):
+        # 从绝对路径中提取相对路径
+        relative_path = path[len(get_images_directory()):].lstrip('/')
+        return f"/app_data/images/{relative_path}"
+    return path
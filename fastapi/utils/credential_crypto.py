@@ -0,0 +1,62 @@
+import base64
+from functools import lru_cache
+import hashlib
+import os
+from typing import Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from utils.get_env import (
+    get_app_data_directory_env,
+    get_credential_encryption_key_env,
+    get_jwt_token_secret_key_env,
+)
+
+
+# 未配置服务端密钥时，自动生成并保存在应用数据目录中的密钥文件
+CREDENTIAL_KEY_FILE_NAME = "credential.key"
+
+
+def _load_or_create_key_file() -> str:
+    path = os.path.join(get_app_data_directory_env(), CREDENTIAL_KEY_FILE_NAME)
+    if not os.path.exists(path):
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(Fernet.generate_key().decode())
+        except FileExistsError:
+            # 其他worker同时创建了密钥文件
+            pass
+    with open(path) as f:
+        return f.read().strip()
+
+
+@lru_cache(maxsize=1)
+def _get_fernet() -> Fernet:
+    # 优先使用 CREDENTIAL_ENCRYPTION_KEY，其次 JWT_TOKEN_SECRET_KEY，都未配置时使用密钥文件；
+    # 多个worker必须使用相同的密钥才能解密彼此写入的凭据
+    secret = (
+        get_credential_encryption_key_env()
+        or get_jwt_token_secret_key_env()
+        or _load_or_create_key_file()
+    )
+    key = base64.urlsafe_b64encode(hashlib.sha256(secret.encode()).digest())
+    return Fernet(key)
+
+
+def encrypt_credential(value: Optional[str]) -> Optional[str]:
+    """加密需要保存到数据库中的用户凭据（例如任务执行时使用的API密钥）"""
+    if not value:
+        return None
+    return _get_fernet().encrypt(value.encode()).decode()
+
+
+def decrypt_credential(token: Optional[str]) -> Optional[str]:
+    """解密 encrypt_credential 的结果，密钥不匹配或不是密文时返回None"""
+    if not token:
+        return None
+    try:
+        return _get_fernet().decrypt(token.encode()).decode()
+    except InvalidToken:
+        print("Failed to decrypt stored credential")
+        return None
@@ -1,5 +1,19 @@
 import os
-from utils.get_env import get_app_data_directory_env, get_database_url_env
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import Pool
+from utils.get_env import (
+    get_app_data_directory_env,
+    get_database_max_overflow_env,
+    get_database_pool_pre_ping_env,
+    get_database_pool_recycle_env,
+    get_database_pool_size_env,
+    get_database_pool_timeout_env,
+    get_database_statement_cache_size_env,
+    get_database_url_env,
+    get_sqlite_busy_timeout_env,
+)
+from utils.parsers import parse_bool_or_none, parse_int_or_none
 from urllib.parse import urlsplit, urlunsplit, parse_qsl
 import ssl
 
@@ -46,3 +60,89 @@ def get_database_url_and_connect_args() -> tuple[str, dict]:
         pass
 
     return database_url, connect_args
+
+
+def get_database_engine_kwargs(database_url: str, connect_args: dict) -> dict:
+    """
+    根据环境变量生成 create_async_engine 的连接池参数。
+    MySQL默认 wait_timeout 会断开空闲连接，因此默认开启 pre_ping 并定期回收连接。
+    """
+    is_sqlite = "sqlite" in database_url
+    if is_sqlite and (":memory:" in database_url or database_url.endswith("://")):
+        # 内存数据库使用StaticPool，不支持连接池参数
+        return {"connect_args": connect_args}
+
+    pool_pre_ping = parse_bool_or_none(get_database_pool_pre_ping_env() or None)
+
+    def int_or_default(value: str | None, default: int) -> int:
+        parsed = parse_int_or_none(value)
+        return default if parsed is None else parsed
+
+    engine_kwargs = {
+        "connect_args": connect_args,
+        "pool_size": int_or_default(get_database_pool_size_env(), 10),
+        "max_overflow": int_or_default(get_database_max_overflow_env(), 20),
+        "pool_recycle": int_or_default(get_database_pool_recycle_env(), 1800),
+        "pool_timeout": int_or_default(get_database_pool_timeout_env(), 30),
+        "pool_pre_ping": (not is_sqlite) if pool_pre_ping is None else pool_pre_ping,
+    }
+
+    statement_cache_size = parse_int_or_none(get_database_statement_cache_size_env())
+    if statement_cache_size is not None:
+        # SQLAlchemy编译语句缓存
+        engine_kwargs["query_cache_size"] = statement_cache_size
+        # asyncpg服务端预编译语句缓存（使用pgbouncer事务模式时需设置为0）
+        if "postgresql+asyncpg" in database_url:
+            connect_args["prepared_statement_cache_size"] = statement_cache_size
+
+    return engine_kwargs
+
+
+def configure_sqlite_engine(engine: AsyncEngine):
+    """
+    为SQLite连接设置WAL模式、synchronous=NORMAL和busy_timeout，
+    减少并发写入时的 "database is locked" 错误。
+    """
+    busy_timeout = parse_int_or_none(get_sqlite_busy_timeout_env()) or 5000
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+        cursor.close()
+
+
+def instrument_engine_pool(engine: AsyncEngine, name: str):
+    """统计连接池的建立、检出和失效次数，并注册连接池状态采集"""
+    from services.metrics_service import METRICS_SERVICE
+
+    pool = engine.sync_engine.pool
+
+    @event.listens_for(pool, "connect")
+    def on_connect(*_):
+        METRICS_SERVICE.increment(f"{name}.connections_opened")
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(*_):
+        METRICS_SERVICE.increment(f"{name}.checkouts")
+
+    @event.listens_for(pool, "invalidate")
+    def on_invalidate(*_):
+        METRICS_SERVICE.increment(f"{name}.connections_invalidated")
+
+    METRICS_SERVICE.register_collector(name, lambda: get_pool_stats(pool))
+
+
+def get_pool_stats(pool: Pool) -> dict:
+    """获取连接池统计信息，用于监控"""
+    stats = {"pool_class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    timeout = getattr(pool, "timeout", None)
+    if callable(timeout):
+        stats["timeout"] = timeout()
+    return stats
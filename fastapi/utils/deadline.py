@@ -0,0 +1,74 @@
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from utils.get_env import get_generation_deadline_seconds_env
+from utils.parsers import parse_float_or_none
+
+
+# 当前请求的截止时间（事件循环时间），通过contextvars传递给请求内创建的所有任务
+_request_deadline: ContextVar[Optional[float]] = ContextVar(
+    "request_deadline", default=None
+)
+
+DEFAULT_GENERATION_DEADLINE_SECONDS = 420
+# 导出阶段预留的时间，内容和资产生成需在此之前结束
+EXPORT_RESERVE_SECONDS = 60
+
+
+class RequestDeadlineExceeded(TimeoutError):
+    pass
+
+
+def get_generation_deadline_seconds() -> Optional[float]:
+    """GENERATION_DEADLINE_SECONDS 为0时不限制"""
+    value = parse_float_or_none(get_generation_deadline_seconds_env())
+    if value is None:
+        return DEFAULT_GENERATION_DEADLINE_SECONDS
+    return value or None
+
+
+def set_request_deadline(seconds: Optional[float]) -> Optional[float]:
+    """从现在起 seconds 秒后截止，返回截止时间"""
+    deadline = None
+    if seconds is not None:
+        deadline = asyncio.get_running_loop().time() + seconds
+    _request_deadline.set(deadline)
+    return deadline
+
+
+def get_request_deadline(reserve: float = 0) -> Optional[float]:
+    """返回截止时间，reserve 为需要预留给后续阶段的时间（最多预留总时长的20%）"""
+    deadline = _request_deadline.get()
+    if deadline is None or not reserve:
+        return deadline
+    remaining = deadline - asyncio.get_running_loop().time()
+    return deadline - min(reserve, max(remaining, 0) * 0.2)
+
+
+def get_request_deadline_remaining(reserve: float = 0) -> Optional[float]:
+    deadline = get_request_deadline(reserve)
+    if deadline is None:
+        return None
+    return max(deadline - asyncio.get_running_loop().time(), 0)
+
+
+def is_request_deadline_exceeded(reserve: float = 0) -> bool:
+    remaining = get_request_deadline_remaining(reserve)
+    return remaining is not None and remaining <= 0
+
+
+@asynccontextmanager
+async def request_deadline_scope(deadline: Optional[float]):
+    """
+    在截止时间到达时取消代码块内的执行并抛出 RequestDeadlineExceeded，deadline为None时不限制。
+    不能跨越异步生成器的 yield 使用
+    """
+    try:
+        async with asyncio.timeout_at(deadline):
+            yield
+    except TimeoutError as e:
+        if deadline is not None and asyncio.get_running_loop().time() >= deadline:
+            raise RequestDeadlineExceeded() from e
+        raise
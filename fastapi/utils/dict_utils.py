@@ -22,6 +22,22 @@ def get_dict_paths_with_key(data: dict, key: str) -> List[JsonPathGuide]:
     return result
 
 
+def json_path_to_list(path: JsonPathGuide) -> List[str | int]:
+    return [
+        guide.key if isinstance(guide, DictGuide) else guide.index
+        for guide in path.guides
+    ]
+
+
+def list_to_json_path(path: List[str | int]) -> JsonPathGuide:
+    return JsonPathGuide(
+        guides=[
+            ListGuide(index=key) if isinstance(key, int) else DictGuide(key=key)
+            for key in path
+        ]
+    )
+
+
 def get_dict_at_path(data: dict, path: JsonPathGuide) -> dict:
     current = data
     for guide in path.guides:
@@ -163,3 +163,163 @@ def get_tavily_api_key_env():
     return os.getenv("TAVILY_API_KEY")
 
 
+def get_generation_queue_mode_env():
+    """
+    获取异步生成任务队列模式：local（Web进程内执行）或 external（由独立worker执行）
+    """
+    return os.getenv("GENERATION_QUEUE_MODE") or "local"
+
+
+def get_generation_worker_concurrency_env():
+    return os.getenv("GENERATION_WORKER_CONCURRENCY")
+
+
+def get_generation_job_max_attempts_env():
+    return os.getenv("GENERATION_JOB_MAX_ATTEMPTS")
+
+
+def get_generation_job_lease_seconds_env():
+    return os.getenv("GENERATION_JOB_LEASE_SECONDS")
+
+
+def get_generation_job_poll_interval_env():
+    return os.getenv("GENERATION_JOB_POLL_INTERVAL")
+
+
+def get_redis_url_env():
+    return os.getenv("REDIS_URL")
+
+
+def get_database_pool_size_env():
+    return os.getenv("DATABASE_POOL_SIZE")
+
+
+def get_database_max_overflow_env():
+    return os.getenv("DATABASE_MAX_OVERFLOW")
+
+
+def get_database_pool_recycle_env():
+    return os.getenv("DATABASE_POOL_RECYCLE")
+
+
+def get_database_pool_pre_ping_env():
+    return os.getenv("DATABASE_POOL_PRE_PING")
+
+
+def get_database_pool_timeout_env():
+    return os.getenv("DATABASE_POOL_TIMEOUT")
+
+
+def get_database_statement_cache_size_env():
+    return os.getenv("DATABASE_STATEMENT_CACHE_SIZE")
+
+
+def get_sqlite_busy_timeout_env():
+    return os.getenv("SQLITE_BUSY_TIMEOUT")
+
+
+def get_session_store_env():
+    """
+    获取会话存储类型：memory 或 redis（未设置时，配置了 REDIS_URL 则使用redis）
+    """
+    return os.getenv("SESSION_STORE")
+
+
+def get_session_max_entries_env():
+    return os.getenv("SESSION_MAX_ENTRIES")
+
+
+def get_session_sweep_interval_env():
+    return os.getenv("SESSION_SWEEP_INTERVAL")
+
+
+def get_user_config_watch_interval_env():
+    return os.getenv("USER_CONFIG_WATCH_INTERVAL")
+
+
+def get_layout_cache_revalidate_seconds_env():
+    return os.getenv("LAYOUT_CACHE_REVALIDATE_SECONDS")
+
+
+def get_llm_response_cache_env():
+    return os.getenv("LLM_RESPONSE_CACHE")
+
+
+def get_llm_response_cache_ttl_env():
+    return os.getenv("LLM_RESPONSE_CACHE_TTL")
+
+
+def get_llm_response_cache_max_entries_env():
+    return os.getenv("LLM_RESPONSE_CACHE_MAX_ENTRIES")
+
+
+def get_llm_rate_limit_rpm_env():
+    return os.getenv("LLM_RATE_LIMIT_RPM")
+
+
+def get_llm_rate_limit_tpm_env():
+    return os.getenv("LLM_RATE_LIMIT_TPM")
+
+
+def get_llm_max_concurrency_env():
+    return os.getenv("LLM_MAX_CONCURRENCY")
+
+
+def get_llm_latency_target_seconds_env():
+    return os.getenv("LLM_LATENCY_TARGET_SECONDS")
+
+
+def get_llm_rate_limit_retries_env():
+    return os.getenv("LLM_RATE_LIMIT_RETRIES")
+
+
+def get_slide_content_batch_size_env():
+    return os.getenv("SLIDE_CONTENT_BATCH_SIZE")
+
+
+def get_slide_content_batch_max_schema_chars_env():
+    return os.getenv("SLIDE_CONTENT_BATCH_MAX_SCHEMA_CHARS")
+
+
+def get_llm_prompt_cache_control_env():
+    return os.getenv("LLM_PROMPT_CACHE_CONTROL")
+
+
+def get_llm_hedge_requests_env():
+    return os.getenv("LLM_HEDGE_REQUESTS")
+
+
+def get_llm_hedge_budget_percent_env():
+    return os.getenv("LLM_HEDGE_BUDGET_PERCENT")
+
+
+def get_generation_deadline_seconds_env():
+    return os.getenv("GENERATION_DEADLINE_SECONDS")
+
+
+def get_image_backfill_concurrency_env():
+    return os.getenv("IMAGE_BACKFILL_CONCURRENCY")
+
+
+def get_image_backfill_max_attempts_env():
+    return os.getenv("IMAGE_BACKFILL_MAX_ATTEMPTS")
+
+
+def get_generation_event_buffer_size_env():
+    return os.getenv("GENERATION_EVENT_BUFFER_SIZE")
+
+
+def get_generation_detach_cancel_seconds_env():
+    return os.getenv("GENERATION_DETACH_CANCEL_SECONDS")
+
+
+def get_credential_encryption_key_env():
+    return os.getenv("CREDENTIAL_ENCRYPTION_KEY")
+
+
+def get_metrics_scrape_token_env():
+    return os.getenv("METRICS_SCRAPE_TOKEN")
+
+
+def get_admin_api_token_env():
+    return os.getenv("ADMIN_API_TOKEN")
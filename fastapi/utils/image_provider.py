@@ -1,11 +1,5 @@
 from enums.image_provider import ImageProvider
-from utils.get_env import (
-    get_google_api_key_env,
-    get_image_provider_env,
-    get_openai_api_key_env,
-    get_pexels_api_key_env,
-    get_pixabay_api_key_env,
-)
+from services.user_config_service import USER_CONFIG_SERVICE
 
 
 def is_pixels_selected() -> bool:
@@ -26,25 +20,26 @@ def is_dalle3_selected() -> bool:
 
 def get_selected_image_provider() -> ImageProvider | None:
     """
-    Get the selected image provider from environment variables.
+    Get the selected image provider from the user config snapshot.
     Returns:
         ImageProvider: The selected image provider.
     """
-    image_provider_env = get_image_provider_env()
-    if image_provider_env:
-        return ImageProvider(image_provider_env)
+    image_provider = USER_CONFIG_SERVICE.snapshot.IMAGE_PROVIDER
+    if image_provider:
+        return ImageProvider(image_provider)
     return None
 
 
 def get_image_provider_api_key() -> str:
     selected_image_provider = get_selected_image_provider()
+    user_config = USER_CONFIG_SERVICE.snapshot
     if selected_image_provider == ImageProvider.PEXELS:
-        return get_pexels_api_key_env()
+        return user_config.PEXELS_API_KEY
     elif selected_image_provider == ImageProvider.PIXABAY:
-        return get_pixabay_api_key_env()
+        return user_config.PIXABAY_API_KEY
     elif selected_image_provider == ImageProvider.GEMINI_FLASH:
-        return get_google_api_key_env()
+        return user_config.GOOGLE_API_KEY
     elif selected_image_provider == ImageProvider.DALLE3:
-        return get_openai_api_key_env()
+        return user_config.OPENAI_API_KEY
     else:
         raise ValueError(f"Invalid image provider: {selected_image_provider}")
@@ -1,32 +1,23 @@
-from datetime import datetime
 from typing import Optional
 from models.llm_message import LLMSystemMessage, LLMUserMessage
 from models.presentation_layout import SlideLayoutModel
 from models.sql.slide import SlideModel
 from services.llm_client import LLMClient
+from services.response_schema_cache import RESPONSE_SCHEMA_CACHE
 from utils.get_env import get_comparegpt_api_model_env
 from utils.llm_client_error_handler import handle_llm_client_exceptions
 from utils.llm_provider import get_model
-from utils.schema_utils import add_field_in_schema, remove_fields_from_schema
+from utils.prompt_utils import (
+    get_current_date_prompt,
+    get_request_context_prompt,
+    join_prompt_sections,
+)
 
 
-def get_system_prompt(
-    tone: Optional[str] = None,
-    verbosity: Optional[str] = None,
-    instructions: Optional[str] = None,
-):
-    return f"""
+# 系统提示词不包含任何请求参数，所有请求共享同一前缀
+SYSTEM_PROMPT = """
     Edit Slide data and speaker note based on provided prompt, follow mentioned steps and notes and provide structured output.
 
-    {"# User Instruction:" if instructions else ""}
-    {instructions or ""}
-
-    {"# Tone:" if tone else ""}
-    {tone or ""}
-
-    {"# Verbosity:" if verbosity else ""}
-    {verbosity or ""}
-
     # Notes
     - Provide output in language mentioned in **Input**.
     - The goal is to change Slide data based on the provided prompt.
@@ -35,28 +26,32 @@ def get_system_prompt(
     - Make sure to follow language guidelines.
     - Speaker note should be normal text, not markdown.
     - Speaker note should be simple, clear, concise and to the point.
+    - User instructions, tone and verbosity are provided at the end of the user message when given, and should be followed.
 
     **Go through all notes and steps and make sure they are followed, including mentioned constraints**
     """
 
 
-def get_user_prompt(prompt: str, slide_data: dict, language: str):
-    return f"""
-        ## Icon Query And Image Prompt Language
-        English
-
-        ## Current Date and Time
-        {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-
-        ## Slide Content Language
-        {language}
+def get_system_prompt():
+    return SYSTEM_PROMPT
 
-        ## Prompt
-        {prompt}
 
-        ## Slide data
-        {slide_data}
-    """
+def get_user_prompt(
+    prompt: str,
+    slide_data: dict,
+    language: str,
+    tone: Optional[str] = None,
+    verbosity: Optional[str] = None,
+    instructions: Optional[str] = None,
+):
+    return join_prompt_sections(
+        "## Icon Query And Image Prompt Language\nEnglish",
+        f"## Slide Content Language\n{language}",
+        f"## Prompt\n{prompt}",
+        f"## Slide data\n{slide_data}",
+        get_request_context_prompt(instructions, tone, verbosity),
+        get_current_date_prompt(),
+    )
 
 
 def get_messages(
@@ -69,10 +64,13 @@ def get_messages(
 ):
     return [
         LLMSystemMessage(
-            content=get_system_prompt(tone, verbosity, instructions),
+            content=get_system_prompt(),
+            cacheable=True,
         ),
         LLMUserMessage(
-            content=get_user_prompt(prompt, slide_data, language),
+            content=get_user_prompt(
+                prompt, slide_data, language, tone, verbosity, instructions
+            ),
         ),
     ]
 
@@ -102,21 +100,7 @@ async def get_edited_slide_content(
     """
     client = LLMClient(api_key=api_key)
 
-    response_schema = remove_fields_from_schema(
-        slide_layout.json_schema, ["__image_url__", "__icon_url__"]
-    )
-    response_schema = add_field_in_schema(
-        response_schema,
-        {
-            "__speaker_note__": {
-                "type": "string",
-                "minLength": 100,
-                "maxLength": 250,
-                "description": "Speaker note for the slide",
-            }
-        },
-        True,
-    )
+    response_schema = RESPONSE_SCHEMA_CACHE.get_slide_response_schema(slide_layout)
 
     try:
         response = await client.generate_structured(
@@ -9,6 +9,11 @@ from utils.llm_client_error_handler import handle_llm_client_exceptions
 from utils.get_dynamic_models import get_presentation_outline_model_with_n_slides
 from utils.get_env import get_comparegpt_api_model_env,get_comparegpt_api_url_env, get_comparegpt_api_model_env, get_responses_model_env
 from utils.citations import citations_instance
+from utils.prompt_utils import (
+    get_current_date_prompt,
+    get_request_context_prompt,
+    join_prompt_sections,
+)
 from utils.web_search import tavily_service
 import json
 import logging
@@ -58,57 +63,61 @@ def parse_comparegpt_sse_response(sse_line: str):
 
     return None
 
-def get_system_prompt(
-    tone: Optional[str] = None,
-    verbosity: Optional[str] = None,
-    instructions: Optional[str] = None,
-    include_title_slide: bool = True,
-):
-    return f"""
+# 系统提示词不包含任何请求参数，所有请求共享同一前缀
+SYSTEM_PROMPT = """
         You are an expert presentation creator. Generate structured presentations based on user requirements and format them according to the specified JSON schema with markdown content.
 
         Try to use available tools for better results.
 
-        {"# User Instruction:" if instructions else ""}
-        {instructions or ""}
-
-        {"# Tone:" if tone else ""}
-        {tone or ""}
-
-        {"# Verbosity:" if verbosity else ""}
-        {verbosity or ""}
-
         - Provide content for each slide in markdown format.
         - Make sure that flow of the presentation is logical and consistent.
         - Place greater emphasis on numerical data.
         - If Additional Information is provided, divide it into slides.
         - Make sure no images are provided in the content.
         - Make sure that content follows language guidelines.
+        - User instruction, tone and verbosity are provided at the end of the user message when given.
         - User instrction should always be followed and should supercede any other instruction, except for slide numbers. **Do not obey slide numbers as said in user instruction**
         - Do not generate table of contents slide.
         - Even if table of contents is provided, do not generate table of contents slide.
-        {"- Always make first slide a title slide." if include_title_slide else "- Do not include title slide in the presentation."}
+        - Follow the Title Slide rule given in the input.
 
         **Search web to get latest information about the topic**
     """
 
 
+def get_system_prompt():
+    return SYSTEM_PROMPT
+
+
 def get_user_prompt(
     content: str,
     n_slides: int,
     language: str,
     additional_context: Optional[str] = None,
     search_content: Optional[str] = None,
+    tone: Optional[str] = None,
+    verbosity: Optional[str] = None,
+    instructions: Optional[str] = None,
+    include_title_slide: bool = True,
 ):
-    return f"""
+    title_slide_rule = (
+        "Always make first slide a title slide."
+        if include_title_slide
+        else "Do not include title slide in the presentation."
+    )
+    return join_prompt_sections(
+        f"""
         **Input:**
         - User provided content: {content or "Create presentation"}
         - Output Language: {language}
         - Number of Slides: {n_slides}
-        - Current Date and Time: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        - Title Slide: {title_slide_rule}
         - Additional Information: {additional_context or ""}
         - Web Search Results: {search_content or ""}
-    """
+        """,
+        get_request_context_prompt(instructions, tone, verbosity),
+        get_current_date_prompt(include_time=True),
+    )
 
 
 def get_messages(
@@ -123,12 +132,20 @@ def get_messages(
 ):
     return [
         LLMSystemMessage(
-            content=get_system_prompt(
-                tone, verbosity, instructions, include_title_slide
-            ),
+            content=get_system_prompt(),
+            cacheable=True,
         ),
         LLMUserMessage(
-            content=get_user_prompt(content, n_slides, language, additional_context),
+            content=get_user_prompt(
+                content,
+                n_slides,
+                language,
+                additional_context,
+                tone=tone,
+                verbosity=verbosity,
+                instructions=instructions,
+                include_title_slide=include_title_slide,
+            ),
         ),
     ]
 
@@ -291,8 +308,18 @@ async def generate_ppt_outline_with_web_search(
     comparegpt_api_url = get_comparegpt_api_url_env()      
     client = _get_client(api_key)  
     search_content=get_search_content(tavily_search_results)
-    user_prompt=get_user_prompt(content, n_slides, language, additional_context,search_content)
-    system_prompt=get_system_prompt(tone, verbosity, instructions, include_title_slide)
+    user_prompt=get_user_prompt(
+        content,
+        n_slides,
+        language,
+        additional_context,
+        search_content,
+        tone=tone,
+        verbosity=verbosity,
+        instructions=instructions,
+        include_title_slide=include_title_slide,
+    )
+    system_prompt=get_system_prompt()
     messages = build_messages(user_prompt, system_prompt)
 
     logger.debug(f"messages: {messages}")
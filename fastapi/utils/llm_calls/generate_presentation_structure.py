@@ -1,24 +1,24 @@
-from typing import Optional
+from typing import List, Optional
 from models.llm_message import LLMSystemMessage, LLMUserMessage
 from models.presentation_layout import PresentationLayoutModel
-from models.presentation_outline_model import PresentationOutlineModel
+from models.presentation_outline_model import (
+    PresentationOutlineModel,
+    SlideOutlineModel,
+)
+from models.slide_layout_index import SlideLayoutIndex
 from services.llm_client import LLMClient
 from utils.get_env import get_comparegpt_api_model_env
 from utils.llm_client_error_handler import handle_llm_client_exceptions
 from utils.llm_provider import get_model
 from utils.get_dynamic_models import get_presentation_structure_model_with_n_slides
 from models.presentation_structure_model import PresentationStructureModel
+from utils.prompt_utils import get_request_context_prompt, join_prompt_sections
 
 
-def get_messages(
-    presentation_layout: PresentationLayoutModel,
-    n_slides: int,
-    data: str,
-    instructions: Optional[str] = None,
-):
-    return [
-        LLMSystemMessage(
-            content=f"""
+# 系统提示词只包含布局信息（同一模板的所有请求相同），幻灯片数量和用户指令放在用户消息末尾
+def get_system_message(presentation_layout: PresentationLayoutModel):
+    return LLMSystemMessage(
+        content=f"""
                 You're a professional presentation designer with creative freedom to design engaging presentations.
 
                 {presentation_layout.to_string()}
@@ -49,18 +49,43 @@ def get_messages(
 
                 **Trust your design instincts. Focus on creating the most effective presentation for the content and audience.**
 
-                {"# User Instruction:" if instructions else ""}
-                {instructions or ""}
+                User intruction, when provided at the end of the user message, should be taken into account while creating the presentation structure, except for number of slides.
 
-                User intruction should be taken into account while creating the presentation structure, except for number of slides.
+                Select layout index for each of the slides based on what will best serve the presentation's goals.
+            """,
+        cacheable=True,
+    )
 
-                Select layout index for each of the {n_slides} slides based on what will best serve the presentation's goals.
+
+def get_system_message_for_slides_markdown(
+    presentation_layout: PresentationLayoutModel,
+):
+    return LLMSystemMessage(
+        content=f"""
+                You're a professional presentation designer with creative freedom to design engaging presentations.
+
+                {presentation_layout.to_string()}
+
+                Select layout that best matches the content of the slides.
+
+                User intruction, when provided at the end of the user message, should be taken into account while creating the presentation structure, except for number of slides.
+
+                Select layout index for each of the slides based on what will best serve the presentation's goals.
             """,
-        ),
+        cacheable=True,
+    )
+
+
+def get_messages(
+    presentation_layout: PresentationLayoutModel,
+    n_slides: int,
+    data: str,
+    instructions: Optional[str] = None,
+):
+    return [
+        get_system_message(presentation_layout),
         LLMUserMessage(
-            content=f"""
-                {data}
-            """,
+            content=get_user_prompt(n_slides, data, instructions),
         ),
     ]
 
@@ -72,30 +97,66 @@ def get_messages_for_slides_markdown(
     instructions: Optional[str] = None,
 ):
     return [
-        LLMSystemMessage(
-            content=f"""
-                You're a professional presentation designer with creative freedom to design engaging presentations.
-
-                {"# User Instruction:" if instructions else ""}
-                {instructions or ""}
-
-                {presentation_layout.to_string()}
-
-                Select layout that best matches the content of the slides.
+        get_system_message_for_slides_markdown(presentation_layout),
+        LLMUserMessage(
+            content=get_user_prompt(n_slides, data, instructions),
+        ),
+    ]
 
-                User intruction should be taken into account while creating the presentation structure, except for number of slides.
 
-                Select layout index for each of the {n_slides} slides based on what will best serve the presentation's goals.
-            """,
+# 单页布局选择与整体结构生成共用系统提示词，已选择的前序布局放在用户消息中以保持版式变化和衔接
+def get_messages_for_slide(
+    presentation_layout: PresentationLayoutModel,
+    slide_number: int,
+    n_slides: int,
+    slide_content: str,
+    previous_layouts: List[int],
+    instructions: Optional[str] = None,
+    using_slides_markdown: bool = False,
+):
+    return [
+        (
+            get_system_message_for_slides_markdown(presentation_layout)
+            if using_slides_markdown
+            else get_system_message(presentation_layout)
         ),
         LLMUserMessage(
-            content=f"""
-                {data}
-            """,
+            content=get_slide_user_prompt(
+                slide_number, n_slides, slide_content, previous_layouts, instructions
+            ),
         ),
     ]
 
 
+def get_slide_user_prompt(
+    slide_number: int,
+    n_slides: int,
+    slide_content: str,
+    previous_layouts: List[int],
+    instructions: Optional[str] = None,
+):
+    previous_layouts_prompt = None
+    if previous_layouts:
+        previous_layouts_prompt = "## Layouts of Previous Slides (in order)\n" + "\n".join(
+            f"- Layout {layout_index}" for layout_index in previous_layouts
+        )
+    return join_prompt_sections(
+        f"## Slide {slide_number} of {n_slides}\n{slide_content}",
+        previous_layouts_prompt,
+        f"## Task\nSelect layout index for slide {slide_number} only. "
+        "Consider the layouts of previous slides to keep visual variety and natural transitions.",
+        get_request_context_prompt(instructions),
+    )
+
+
+def get_user_prompt(n_slides: int, data: str, instructions: Optional[str] = None):
+    return join_prompt_sections(
+        data,
+        f"## Number of Slides\nSelect layout index for each of the {n_slides} slides.",
+        get_request_context_prompt(instructions),
+    )
+
+
 async def generate_presentation_structure(
     presentation_outline: PresentationOutlineModel,
     presentation_layout: PresentationLayoutModel,
@@ -143,3 +204,49 @@ async def generate_presentation_structure(
         return PresentationStructureModel(**response)
     except Exception as e:
         raise handle_llm_client_exceptions(e)
+
+
+async def select_slide_layout_index(
+    slide_outline: SlideOutlineModel,
+    slide_number: int,
+    n_slides: int,
+    presentation_layout: PresentationLayoutModel,
+    previous_layouts: List[int],
+    instructions: Optional[str] = None,
+    api_key: Optional[str] = None,
+    model: Optional[dict] = None,
+    using_slides_markdown: bool = False,
+) -> int:
+    """
+    为单张幻灯片选择布局，大纲流式生成时每解析出一张幻灯片即可开始选择
+    :param slide_outline: 幻灯片大纲
+    :param slide_number: 幻灯片在演示文稿中的页码（从1开始）
+    :param n_slides: 演示文稿总页数
+    :param presentation_layout: 演示文稿的布局
+    :param previous_layouts: 之前各页已选择的布局索引（按页码顺序）
+    :param instructions: 用户指令
+    :param api_key: CompareGPT API密钥
+    :param model: 选择布局使用的模型配置
+    :param using_slides_markdown: 是否使用幻灯片Markdown
+    :return: 布局索引
+    """
+    client = LLMClient(api_key=api_key)
+
+    try:
+        response = await client.generate_structured(
+            model=model,
+            messages=get_messages_for_slide(
+                presentation_layout,
+                slide_number,
+                n_slides,
+                slide_outline.content,
+                previous_layouts,
+                instructions,
+                using_slides_markdown,
+            ),
+            response_format=SlideLayoutIndex.model_json_schema(),
+            strict=True,
+        )
+        return SlideLayoutIndex(**response).index
+    except Exception as e:
+        raise handle_llm_client_exceptions(e)
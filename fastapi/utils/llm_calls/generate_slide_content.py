@@ -1,32 +1,24 @@
-from datetime import datetime
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from models.llm_message import LLMSystemMessage, LLMUserMessage
 from models.presentation_layout import SlideLayoutModel
 from models.presentation_outline_model import SlideOutlineModel
 from services.llm_client import LLMClient
+from services.response_schema_cache import RESPONSE_SCHEMA_CACHE
 from utils.get_env import get_comparegpt_api_model_env
 from utils.llm_client_error_handler import handle_llm_client_exceptions
 from utils.llm_provider import get_model
-from utils.schema_utils import add_field_in_schema, remove_fields_from_schema
+from utils.prompt_utils import (
+    get_current_date_prompt,
+    get_request_context_prompt,
+    join_prompt_sections,
+)
+from utils.streaming_json import PartialJsonParser, diff_json_patches
 
 
-def get_system_prompt(
-    tone: Optional[str] = None,
-    verbosity: Optional[str] = None,
-    instructions: Optional[str] = None,
-):
-    return f"""
+# 系统提示词不包含任何请求参数，所有请求共享同一前缀
+SYSTEM_PROMPT = """
         Generate structured slide based on provided outline, follow mentioned steps and notes and provide structured output.
 
-        {"# User Instructions:" if instructions else ""}
-        {instructions or ""}
-
-        {"# Tone:" if tone else ""}
-        {tone or ""}
-
-        {"# Verbosity:" if verbosity else ""}
-        {verbosity or ""}
-
         # Steps
         1. Analyze the outline.
         2. Generate structured slide based on the outline.
@@ -50,35 +42,49 @@ def get_system_prompt(
             - If verbosity is 'standard', then generate description as 2/3 of the max character limit.
             - If verbosity is 'text-heavy', then generate description as 3/4 or higher of the max character limit. Make sure it does not exceed the max character limit.
 
+        User instructions, tone and verbosity are provided at the end of the user message when given.
         User instructions, tone and verbosity should always be followed and should supercede any other instruction, except for max and min character limit, slide schema and number of items.
 
         - Provide output in json format and **don't include <parameters> tags**.
 
         # Image and Icon Output Format
-        image: {{
+        image: {
             __image_prompt__: string,
-        }}
-        icon: {{
+        }
+        icon: {
             __icon_query__: string,
-        }}
+        }
 
     """
 
+BATCH_SYSTEM_PROMPT = f"""
+        {SYSTEM_PROMPT}
 
-def get_user_prompt(outline: str, language: str):
-    return f"""
-        ## Current Date and Time
-        {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        # Multiple Slides
+        - Multiple slide outlines are provided, each under its own key (slide_1, slide_2, ...).
+        - Generate every slide independently under the same key, following the schema of that key.
+        - Never mix content between slides.
+    """
 
-        ## Icon Query And Image Prompt Language
-        English
 
-        ## Slide Content Language
-        {language}
+def get_system_prompt():
+    return SYSTEM_PROMPT
 
-        ## Slide Outline
-        {outline}
-    """
+
+def get_user_prompt(
+    outline: str,
+    language: str,
+    tone: Optional[str] = None,
+    verbosity: Optional[str] = None,
+    instructions: Optional[str] = None,
+):
+    return join_prompt_sections(
+        "## Icon Query And Image Prompt Language\nEnglish",
+        f"## Slide Content Language\n{language}",
+        f"## Slide Outline\n{outline}",
+        get_request_context_prompt(instructions, tone, verbosity),
+        get_current_date_prompt(),
+    )
 
 
 def get_messages(
@@ -91,14 +97,48 @@ def get_messages(
 
     return [
         LLMSystemMessage(
-            content=get_system_prompt(tone, verbosity, instructions),
+            content=get_system_prompt(),
+            cacheable=True,
         ),
         LLMUserMessage(
-            content=get_user_prompt(outline, language),
+            content=get_user_prompt(outline, language, tone, verbosity, instructions),
         ),
     ]
 
 
+def get_batch_slide_key(index: int) -> str:
+    return f"slide_{index + 1}"
+
+
+def get_batch_user_prompt(
+    outlines: List[str],
+    language: str,
+    tone: Optional[str] = None,
+    verbosity: Optional[str] = None,
+    instructions: Optional[str] = None,
+):
+    return join_prompt_sections(
+        "## Icon Query And Image Prompt Language\nEnglish",
+        f"## Slide Content Language\n{language}",
+        *[
+            f"## Slide Outline ({get_batch_slide_key(index)})\n{outline}"
+            for index, outline in enumerate(outlines)
+        ],
+        get_request_context_prompt(instructions, tone, verbosity),
+        get_current_date_prompt(),
+    )
+
+
+def get_batch_response_schema(response_schemas: List[dict]) -> dict:
+    """将多张幻灯片的响应schema合并为一个，每张幻灯片对应一个 slide_n 属性"""
+    keys = [get_batch_slide_key(index) for index in range(len(response_schemas))]
+    return {
+        "type": "object",
+        "properties": dict(zip(keys, response_schemas)),
+        "required": keys,
+    }
+
+
 async def get_slide_content_from_type_and_outline(
     slide_layout: SlideLayoutModel,
     outline: SlideOutlineModel,
@@ -108,6 +148,7 @@ async def get_slide_content_from_type_and_outline(
     tone: Optional[str] = None,
     verbosity: Optional[str] = None,
     instructions: Optional[str] = None,
+    on_patch: Optional[Callable[[List[dict]], None]] = None,
 ):
     """
     根据幻灯片布局和大纲生成幻灯片内容
@@ -117,25 +158,28 @@ async def get_slide_content_from_type_and_outline(
     :param tone: 幻灯片语气
     :param verbosity: 幻灯片冗长程度
     :param instructions: 用户指令
+    :param on_patch: 传入时以流式请求生成，内容每有变化即回调 {"path", "value"} 补丁列表
     :return: 幻灯片内容
     """
     client = LLMClient(api_key=api_key)
 
-    response_schema = remove_fields_from_schema(
-        slide_layout.json_schema, ["__image_url__", "__icon_url__"]
-    )
-    response_schema = add_field_in_schema(
-        response_schema,
-        {
-            "__speaker_note__": {
-                "type": "string",
-                "minLength": 100,
-                "maxLength": 250,
-                "description": "Speaker note for the slide",
-            }
-        },
-        True,
-    )
+    response_schema = RESPONSE_SCHEMA_CACHE.get_slide_response_schema(slide_layout)
+
+    on_chunk = None
+    partial_content = {}
+    if on_patch is not None:
+        parser = PartialJsonParser()
+
+        def on_chunk(chunk: str):
+            nonlocal partial_content
+            value = parser.feed(chunk)
+            # 未重新解析时返回上一次的同一个对象
+            if value is partial_content or not isinstance(value, dict):
+                return
+            patches = diff_json_patches(partial_content, value)
+            partial_content = value
+            if patches:
+                on_patch(patches)
 
     try:
         response = await client.generate_structured(
@@ -149,8 +193,69 @@ async def get_slide_content_from_type_and_outline(
             ),
             response_format=response_schema,
             strict=False,
+            on_chunk=on_chunk,
         )
+        if on_patch is not None:
+            # 最终结果经过宽松解析，可能与流式解析的部分内容不同；命中缓存时为全部内容
+            patches = diff_json_patches(partial_content, response)
+            if patches:
+                on_patch(patches)
         return response
 
     except Exception as e:
         raise handle_llm_client_exceptions(e)
+
+
+async def get_slides_content_from_types_and_outlines(
+    slides: List[Tuple[SlideLayoutModel, SlideOutlineModel]],
+    language: str,
+    api_key: str,
+    model: Optional[dict] = None,
+    tone: Optional[str] = None,
+    verbosity: Optional[str] = None,
+    instructions: Optional[str] = None,
+) -> Dict[int, dict]:
+    """
+    通过一次LLM请求生成多张幻灯片的内容，所有幻灯片共用同一份系统提示词
+    :param slides: (幻灯片布局, 幻灯片大纲) 列表
+    :return: 幻灯片在列表中的位置 -> 幻灯片内容，缺失或格式错误的幻灯片不包含在结果中
+    """
+    client = LLMClient(api_key=api_key)
+
+    response_schema = get_batch_response_schema(
+        [
+            RESPONSE_SCHEMA_CACHE.get_slide_response_schema(slide_layout)
+            for slide_layout, _ in slides
+        ]
+    )
+
+    try:
+        response = await client.generate_structured(
+            model=model,
+            messages=[
+                LLMSystemMessage(
+                    content=BATCH_SYSTEM_PROMPT,
+                    cacheable=True,
+                ),
+                LLMUserMessage(
+                    content=get_batch_user_prompt(
+                        [outline.content for _, outline in slides],
+                        language,
+                        tone,
+                        verbosity,
+                        instructions,
+                    ),
+                ),
+            ],
+            response_format=response_schema,
+            strict=False,
+        )
+    except Exception as e:
+        raise handle_llm_client_exceptions(e)
+
+    slides_content = {}
+    for index in range(len(slides)):
+        slide_content = response.get(get_batch_slide_key(index))
+        if isinstance(slide_content, dict):
+            slides_content[index] = slide_content
+    return slides_content
@@ -1,18 +1,45 @@
 from fastapi import HTTPException
+from anthropic import APIConnectionError as AnthropicAPIConnectionError
 from anthropic import APIError as AnthropicAPIError
+from anthropic import APITimeoutError as AnthropicAPITimeoutError
+from openai import APIConnectionError as OpenAIAPIConnectionError
 from openai import APIError as OpenAIAPIError
+from openai import APITimeoutError as OpenAIAPITimeoutError
 from google.genai.errors import APIError as GoogleAPIError
 import traceback
 
 
+def get_llm_error_status_code(e: Exception) -> int:
+    """
+    保留上游返回的状态码（400请求错误、429限流、5xx服务端错误），
+    超时和连接失败分别对应504和503，便于任务队列区分暂时性错误和永久错误
+    """
+    if isinstance(e, (OpenAIAPITimeoutError, AnthropicAPITimeoutError, TimeoutError)):
+        return 504
+    if isinstance(e, (OpenAIAPIConnectionError, AnthropicAPIConnectionError)):
+        return 503
+    status_code = getattr(e, "status_code", None) or getattr(e, "code", None)
+    if not isinstance(status_code, int) or not 400 <= status_code < 600:
+        return 500
+    # 上游的401/403是大模型API密钥无效或无权限，前端会把401/403当作登录失效处理
+    if status_code in (401, 403):
+        return 400
+    return status_code
+
+
 def handle_llm_client_exceptions(e: Exception) -> HTTPException:
     traceback.print_exc()
+    status_code = get_llm_error_status_code(e)
     if isinstance(e, OpenAIAPIError):
-        return HTTPException(status_code=500, detail=f"OpenAI API error: {e.message}")
+        return HTTPException(
+            status_code=status_code, detail=f"OpenAI API error: {e.message}"
+        )
     if isinstance(e, GoogleAPIError):
-        return HTTPException(status_code=500, detail=f"Google API error: {e.message}")
+        return HTTPException(
+            status_code=status_code, detail=f"Google API error: {e.message}"
+        )
     if isinstance(e, AnthropicAPIError):
         return HTTPException(
-            status_code=500, detail=f"Anthropic API error: {e.message}"
+            status_code=status_code, detail=f"Anthropic API error: {e.message}"
         )
-    return HTTPException(status_code=500, detail=f"LLM API error: {e}")
+    return HTTPException(status_code=status_code, detail=f"LLM API error: {e}")
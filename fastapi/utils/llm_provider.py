@@ -6,19 +6,12 @@ from constants.llm import (
     DEFAULT_OPENAI_MODEL,
 )
 from enums.llm_provider import LLMProvider
-from utils.get_env import (
-    get_anthropic_model_env,
-    get_custom_model_env,
-    get_google_model_env,
-    get_llm_provider_env,
-    get_ollama_model_env,
-    get_openai_model_env,
-)
+from services.user_config_service import USER_CONFIG_SERVICE
 
 
 def get_llm_provider():
     try:
-        return LLMProvider(get_llm_provider_env())
+        return LLMProvider(USER_CONFIG_SERVICE.snapshot.LLM)
     except:
         raise HTTPException(
             status_code=500,
@@ -48,16 +41,17 @@ def is_custom_llm_selected():
 
 def get_model():
     selected_llm = get_llm_provider()
+    user_config = USER_CONFIG_SERVICE.snapshot
     if selected_llm == LLMProvider.OPENAI:
-        return get_openai_model_env() or DEFAULT_OPENAI_MODEL
+        return user_config.OPENAI_MODEL or DEFAULT_OPENAI_MODEL
     elif selected_llm == LLMProvider.GOOGLE:
-        return get_google_model_env() or DEFAULT_GOOGLE_MODEL
+        return user_config.GOOGLE_MODEL or DEFAULT_GOOGLE_MODEL
     elif selected_llm == LLMProvider.ANTHROPIC:
-        return get_anthropic_model_env() or DEFAULT_ANTHROPIC_MODEL
+        return user_config.ANTHROPIC_MODEL or DEFAULT_ANTHROPIC_MODEL
     elif selected_llm == LLMProvider.OLLAMA:
-        return get_ollama_model_env()
+        return user_config.OLLAMA_MODEL
     elif selected_llm == LLMProvider.CUSTOM:
-        return get_custom_model_env()
+        return user_config.CUSTOM_MODEL
     else:
         raise HTTPException(
             status_code=500,
@@ -0,0 +1,22 @@
+import base64
+from datetime import datetime
+import json
+from typing import Tuple
+import uuid
+
+from fastapi import HTTPException
+
+
+def encode_created_at_cursor(created_at: datetime, id: uuid.UUID) -> str:
+    """将 (created_at, id) 编码为不透明的分页游标"""
+    payload = json.dumps({"created_at": created_at.isoformat(), "id": str(id)})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_created_at_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["created_at"]), uuid.UUID(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
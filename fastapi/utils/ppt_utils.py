@@ -1,5 +1,8 @@
 from models.presentation_layout import PresentationLayoutModel
-from models.presentation_outline_model import PresentationOutlineModel
+from models.presentation_outline_model import (
+    PresentationOutlineModel,
+    SlideOutlineModel,
+)
 import re
 from typing import List
 
@@ -80,3 +83,48 @@ def select_toc_or_list_slide_layout_index(
         return toc_index
 
     return find_slide_layout_index_by_regex(layout, list_patterns)
+
+
+def get_slide_position_with_toc(
+    outline_index: int, n_toc_slides: int, include_title_slide: bool
+) -> int:
+    """目录页插入在标题页之后（没有标题页时插入在开头），返回第 outline_index 个大纲在最终演示文稿中的位置"""
+    if include_title_slide and outline_index == 0:
+        return 0
+    return outline_index + n_toc_slides
+
+
+def get_toc_slide_position(toc_index: int, include_title_slide: bool) -> int:
+    return toc_index + 1 if include_title_slide else toc_index
+
+
+def get_table_of_contents_outlines(
+    outlines: List[SlideOutlineModel], n_toc_slides: int, include_title_slide: bool
+) -> List[str]:
+    """
+    生成目录页的大纲内容，每页目录最多列出10个幻灯片。
+    与 prepare_presentation 中插入目录的逻辑一致，但不修改传入的大纲列表。
+    """
+    total_outlines = len(outlines)
+    toc_outlines = []
+    # outline_index 为插入目录页后列表中的位置，减去已插入的目录页数量即为原大纲位置
+    outline_index = 1 if include_title_slide else 0
+    for i in range(n_toc_slides):
+        outlines_to = outline_index + 10
+        if total_outlines == outlines_to:
+            outlines_to -= 1
+
+        toc_outline = f"Table of Contents\n\n"
+        for outline in outlines[outline_index - i : max(outlines_to - i, 0)]:
+            page_number = (
+                outline_index - i + n_toc_slides + 1
+                if include_title_slide
+                else outline_index - i + n_toc_slides
+            )
+            toc_outline += f"Slide page number: {page_number}\n Slide Content: {outline.content[:100]}\n\n"
+            outline_index += 1
+
+        outline_index += 1
+        toc_outlines.append(toc_outline)
+
+    return toc_outlines
@@ -1,70 +1,74 @@
 import asyncio
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
+from constants.presentation import PLACEHOLDER_IMAGE_URL
 from models.image_prompt import ImagePrompt
+from models.json_path_guide import DictGuide, JsonPathGuide
 from models.sql.image_asset import ImageAsset
 from models.sql.slide import SlideModel
 from services.icon_finder_service import ICON_FINDER_SERVICE
 from services.image_generation_service import ImageGenerationService
-from utils.asset_directory_utils import get_images_directory
-from utils.dict_utils import get_dict_at_path, get_dict_paths_with_key, set_dict_at_path
+from utils.asset_directory_utils import (
+    get_image_url_from_asset_path,
+    get_images_directory,
+)
+from utils.dict_utils import (
+    get_dict_at_path,
+    get_dict_paths_with_key,
+    json_path_to_list,
+    set_dict_at_path,
+)
 
 
 async def process_slide_and_fetch_assets(
     image_generation_service: ImageGenerationService,
     slide: SlideModel,
+    on_asset: Optional[Callable[[dict], None]] = None,
 ) -> List[ImageAsset]:
     """
     处理幻灯片并获取其资产（图像和图标）。
+    每个资产单独获取，完成后立即写入幻灯片内容，并通过 on_asset 回调通知调用方。
     :param image_generation_service: 用于生成图像的服务。
     :param slide: 要处理的幻灯片模型。
+    :param on_asset: 单个资产完成时的回调，参数为 {"asset_type", "path", "url"}。
     :return: 幻灯片中使用的图像资产列表。
     """
-    async_tasks = []
+    return_assets = []
 
     image_paths = get_dict_paths_with_key(slide.content, "__image_prompt__")
     icon_paths = get_dict_paths_with_key(slide.content, "__icon_query__")
 
-    for image_path in image_paths:
-        __image_prompt__parent = get_dict_at_path(slide.content, image_path)
-        async_tasks.append(
-            image_generation_service.generate_image(
-                ImagePrompt(
-                    prompt=__image_prompt__parent["__image_prompt__"],
-                )
+    def notify(asset_type: str, path: JsonPathGuide, url: str):
+        if on_asset is not None:
+            on_asset(
+                {"asset_type": asset_type, "path": json_path_to_list(path), "url": url}
             )
-        )
-
-    for icon_path in icon_paths:
-        __icon_query__parent = get_dict_at_path(slide.content, icon_path)
-        async_tasks.append(
-            ICON_FINDER_SERVICE.search_icons(__icon_query__parent["__icon_query__"])
-        )
 
-    results = await asyncio.gather(*async_tasks)
-    results.reverse()
-
-    return_assets = []
-    for image_path in image_paths:
+    async def fetch_image(image_path: JsonPathGuide):
         image_dict = get_dict_at_path(slide.content, image_path)
-        result = results.pop()
+        result = await image_generation_service.generate_image(
+            ImagePrompt(
+                prompt=image_dict["__image_prompt__"],
+            )
+        )
         if isinstance(result, ImageAsset):
             return_assets.append(result)
-            # 修复：将绝对路径转换为URL路径
-            if result.path.startswith(get_images_directory()):
-                # 从绝对路径中提取相对路径
-                relative_path = result.path[len(get_images_directory()):].lstrip('/')
-                # 构建可通过FastAPI访问的URL
-                image_dict["__image_url__"] = f"/app_data/images/{relative_path}"
-            else:
-                image_dict["__image_url__"] = result.path
+            image_dict["__image_url__"] = get_image_url_from_asset_path(result.path)
         else:
             image_dict["__image_url__"] = result
         set_dict_at_path(slide.content, image_path, image_dict)
+        notify("image", image_path, image_dict["__image_url__"])
 
-    for icon_path in icon_paths:
+    async def fetch_icon(icon_path: JsonPathGuide):
         icon_dict = get_dict_at_path(slide.content, icon_path)
-        icon_dict["__icon_url__"] = results.pop()[0]
+        icons = await ICON_FINDER_SERVICE.search_icons(icon_dict["__icon_query__"])
+        icon_dict["__icon_url__"] = icons[0]
         set_dict_at_path(slide.content, icon_path, icon_dict)
+        notify("icon", icon_path, icon_dict["__icon_url__"])
+
+    await asyncio.gather(
+        *[fetch_image(image_path) for image_path in image_paths],
+        *[fetch_icon(icon_path) for icon_path in icon_paths],
+    )
 
     return return_assets
 
@@ -199,7 +203,7 @@ def process_slide_add_placeholder_assets(slide: SlideModel):
 
     for image_path in image_paths:
         image_dict = get_dict_at_path(slide.content, image_path)
-        image_dict["__image_url__"] = "/static/images/placeholder.jpg"
+        image_dict["__image_url__"] = PLACEHOLDER_IMAGE_URL
         set_dict_at_path(slide.content, image_path, image_dict)
 
     for icon_path in icon_paths:
@@ -0,0 +1,31 @@
+from datetime import datetime
+from typing import Optional
+
+
+# 提示词按“静态前缀 + 请求相关内容”组织：系统提示词不插入任何请求参数，保证字节级不变，
+# 用户指令、语气、冗长程度和日期放在用户消息末尾，使服务商的提示词前缀缓存能够命中
+
+
+def get_request_context_prompt(
+    instructions: Optional[str] = None,
+    tone: Optional[str] = None,
+    verbosity: Optional[str] = None,
+) -> str:
+    sections = []
+    if instructions:
+        sections.append(f"## User Instructions\n{instructions}")
+    if tone:
+        sections.append(f"## Tone\n{tone}")
+    if verbosity:
+        sections.append(f"## Verbosity\n{verbosity}")
+    return "\n\n".join(sections)
+
+
+def get_current_date_prompt(include_time: bool = False) -> str:
+    date_format = "%Y-%m-%d %H:%M:%S" if include_time else "%Y-%m-%d"
+    title = "Current Date and Time" if include_time else "Current Date"
+    return f"## {title}\n{datetime.now().strftime(date_format)}"
+
+
+def join_prompt_sections(*sections: Optional[str]) -> str:
+    return "\n\n".join(section.strip() for section in sections if section and section.strip())
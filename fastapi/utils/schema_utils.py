@@ -87,6 +87,73 @@ def add_field_in_schema(schema: dict, field: dict, required: bool = False) -> di
     return updated_schema
 
 
+
+def _frozen_error(*args, **kwargs):
+    raise TypeError("Compiled response schema is read-only, use thaw_schema() to copy")
+
+
+class FrozenSchemaList(list):
+    """只读的schema列表，仍是list子类，可直接JSON序列化"""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _frozen_error
+    append = extend = insert = pop = remove = clear = sort = reverse = _frozen_error
+
+    def __deepcopy__(self, memo):
+        return thaw_schema(self)
+
+
+class FrozenSchema(dict):
+    """
+    只读的已编译schema，在多次请求间共享。
+    strict 表示是否已经过 ensure_strict_json_schema 处理。
+    """
+
+    __setitem__ = __delitem__ = __ior__ = _frozen_error
+    pop = popitem = clear = update = setdefault = _frozen_error
+
+    def __init__(self, *args, strict: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.strict = strict
+
+    def __deepcopy__(self, memo):
+        return thaw_schema(self)
+
+
+def freeze_schema(schema: Any, strict: bool = False) -> Any:
+    if isinstance(schema, dict):
+        return FrozenSchema(
+            {key: freeze_schema(value) for key, value in schema.items()},
+            strict=strict,
+        )
+    if isinstance(schema, list):
+        return FrozenSchemaList(freeze_schema(value) for value in schema)
+    return schema
+
+
+def thaw_schema(schema: Any) -> Any:
+    """返回可修改的普通dict/list副本"""
+    if isinstance(schema, dict):
+        return {key: thaw_schema(value) for key, value in schema.items()}
+    if isinstance(schema, list):
+        return [thaw_schema(value) for value in schema]
+    return schema
+
+
+def to_strict_json_schema(schema: dict) -> dict:
+    """
+    与 ensure_strict_json_schema 相同，但已编译为strict的schema直接返回，不再重复处理。
+    包含只读节点的schema会先复制再转换。
+    """
+    if isinstance(schema, FrozenSchema) and schema.strict:
+        return schema
+    # pydantic模型字段会把顶层复制为普通dict，内部节点仍可能是只读的
+    if isinstance(schema, FrozenSchema) or any(
+        isinstance(value, (FrozenSchema, FrozenSchemaList)) for value in schema.values()
+    ):
+        schema = thaw_schema(schema)
+    return ensure_strict_json_schema(schema, path=(), root=schema)
+
+
 # From OpenAI
 def ensure_strict_json_schema(
     json_schema: object,
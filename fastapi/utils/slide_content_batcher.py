@@ -0,0 +1,213 @@
+import asyncio
+import json
+from typing import List, Optional, Set
+
+from models.presentation_layout import SlideLayoutModel
+from models.presentation_outline_model import SlideOutlineModel
+from services.metrics_service import METRICS_SERVICE
+from services.response_schema_cache import RESPONSE_SCHEMA_CACHE
+from utils.get_env import (
+    get_slide_content_batch_max_schema_chars_env,
+    get_slide_content_batch_size_env,
+)
+from utils.llm_calls.generate_slide_content import (
+    get_slide_content_from_type_and_outline,
+    get_slides_content_from_types_and_outlines,
+)
+from utils.parsers import parse_int_or_none
+
+
+class _PendingSlide:
+    def __init__(
+        self,
+        slide_layout: SlideLayoutModel,
+        outline: SlideOutlineModel,
+        schema_chars: int,
+        future: asyncio.Future,
+    ):
+        self.slide_layout = slide_layout
+        self.outline = outline
+        self.schema_chars = schema_chars
+        self.future = future
+
+
+class SlideContentBatcher:
+    """
+    将短时间内提交的多张幻灯片合并为一次LLM请求生成内容。
+    - 每批最多 max_batch_size 张，且响应schema总字符数不超过 max_schema_chars，
+      布局schema较大时每批的幻灯片数自动减少
+    - 未凑满一批时最多等待 max_wait_seconds 后发送
+    - 批量请求失败或缺少某张幻灯片时，对应幻灯片回退为单独请求
+    用法：
+        batcher = SlideContentBatcher.from_env(language, api_key, ...)
+        if batcher:
+            content = await batcher.generate(slide_layout, outline)
+    """
+
+    DEFAULT_MAX_SCHEMA_CHARS = 12000
+
+    def __init__(
+        self,
+        language: str,
+        api_key: str,
+        model: Optional[dict] = None,
+        tone: Optional[str] = None,
+        verbosity: Optional[str] = None,
+        instructions: Optional[str] = None,
+        max_batch_size: int = 4,
+        max_schema_chars: int = DEFAULT_MAX_SCHEMA_CHARS,
+        max_wait_seconds: float = 0.1,
+    ):
+        self.language = language
+        self.api_key = api_key
+        self.model = model
+        self.tone = tone
+        self.verbosity = verbosity
+        self.instructions = instructions
+        self.max_batch_size = max_batch_size
+        self.max_schema_chars = max_schema_chars
+        self.max_wait_seconds = max_wait_seconds
+        self._pending: List[_PendingSlide] = []
+        self._pending_schema_chars = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_env(cls, language: str, api_key: str, **kwargs) -> Optional["SlideContentBatcher"]:
+        """未配置 SLIDE_CONTENT_BATCH_SIZE 或其值不大于1时返回None，即逐张生成"""
+        max_batch_size = parse_int_or_none(get_slide_content_batch_size_env())
+        if not max_batch_size or max_batch_size <= 1:
+            return None
+        max_schema_chars = (
+            parse_int_or_none(get_slide_content_batch_max_schema_chars_env())
+            or cls.DEFAULT_MAX_SCHEMA_CHARS
+        )
+        return cls(
+            language,
+            api_key,
+            max_batch_size=max_batch_size,
+            max_schema_chars=max_schema_chars,
+            **kwargs,
+        )
+
+    async def generate(
+        self, slide_layout: SlideLayoutModel, outline: SlideOutlineModel
+    ) -> dict:
+        schema = RESPONSE_SCHEMA_CACHE.get_slide_response_schema(slide_layout)
+        schema_chars = len(json.dumps(schema, ensure_ascii=False))
+
+        # 加入后超出schema大小上限时，先发送已排队的幻灯片
+        if (
+            self._pending
+            and self._pending_schema_chars + schema_chars > self.max_schema_chars
+        ):
+            self._flush()
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(_PendingSlide(slide_layout, outline, schema_chars, future))
+        self._pending_schema_chars += schema_chars
+
+        if (
+            len(self._pending) >= self.max_batch_size
+            or self._pending_schema_chars >= self.max_schema_chars
+        ):
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.max_wait_seconds, self._flush
+            )
+
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        self._pending_schema_chars = 0
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._run_batch(batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch: List[_PendingSlide]):
+        # 调用方已取消的幻灯片不再生成
+        batch = [pending for pending in batch if not pending.future.done()]
+        if not batch:
+            return
+
+        try:
+            await self._generate_batch(batch)
+        except asyncio.CancelledError:
+            for pending in batch:
+                pending.future.cancel()
+            raise
+
+    async def _generate_batch(self, batch: List[_PendingSlide]):
+        remaining = batch
+        if len(batch) > 1:
+            METRICS_SERVICE.increment("slide_content_batcher.batches")
+            try:
+                slides_content = await get_slides_content_from_types_and_outlines(
+                    [(pending.slide_layout, pending.outline) for pending in batch],
+                    self.language,
+                    self.api_key,
+                    self.model,
+                    self.tone,
+                    self.verbosity,
+                    self.instructions,
+                )
+            except Exception as e:
+                print(f"Batched slide content generation failed, falling back: {e}")
+                slides_content = {}
+
+            remaining = []
+            for index, pending in enumerate(batch):
+                if index in slides_content:
+                    self._set_result(pending, slides_content[index])
+                else:
+                    remaining.append(pending)
+            if remaining:
+                METRICS_SERVICE.increment(
+                    "slide_content_batcher.fallbacks", len(remaining)
+                )
+
+        await asyncio.gather(*[self._generate_single(pending) for pending in remaining])
+
+    async def _generate_single(self, pending: _PendingSlide):
+        if pending.future.done():
+            return
+        try:
+            slide_content = await get_slide_content_from_type_and_outline(
+                slide_layout=pending.slide_layout,
+                outline=pending.outline,
+                language=self.language,
+                api_key=self.api_key,
+                model=self.model,
+                tone=self.tone,
+                verbosity=self.verbosity,
+                instructions=self.instructions,
+            )
+        except Exception as e:
+            if not pending.future.done():
+                pending.future.set_exception(e)
+            return
+        self._set_result(pending, slide_content)
+
+    def _set_result(self, pending: _PendingSlide, slide_content: dict):
+        if not pending.future.done():
+            pending.future.set_result(slide_content)
+
+    def cancel(self):
+        """取消尚未完成的批量请求"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        for pending in self._pending:
+            pending.future.cancel()
+        self._pending = []
+        self._pending_schema_chars = 0
+        for task in list(self._batch_tasks):
+            task.cancel()
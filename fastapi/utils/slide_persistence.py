@@ -0,0 +1,90 @@
+import hashlib
+import json
+from typing import List
+import uuid
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from models.sql.slide import SlideModel
+
+
+# 参与内容哈希的字段，id/presentation 由比较逻辑本身处理
+SLIDE_HASH_FIELDS = (
+    "layout_group",
+    "layout",
+    "index",
+    "content",
+    "html_content",
+    "speaker_note",
+    "properties",
+)
+
+
+def compute_slide_content_hash(slide: SlideModel) -> str:
+    payload = {field: getattr(slide, field) for field in SLIDE_HASH_FIELDS}
+    serialized = json.dumps(
+        payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def _slide_to_row(slide: SlideModel) -> dict:
+    return {
+        column.name: getattr(slide, column.name)
+        for column in SlideModel.__table__.columns
+    }
+
+
+async def save_presentation_slides(
+    sql_session: AsyncSession,
+    presentation_id: uuid.UUID,
+    slides: List[SlideModel],
+    delete_missing: bool = True,
+):
+    """
+    按差异保存演示文稿的幻灯片，替代"全部删除再插入"。
+
+    根据幻灯片id和内容哈希与数据库中的记录比较：
+    内容变化的执行UPDATE，新增的执行INSERT，不再存在的执行DELETE（delete_missing为True时），
+    每类操作各为一条批量语句，未变化的幻灯片不产生写入。
+    调用方负责提交事务。
+    """
+    existing_hashes = {
+        slide_id: content_hash
+        for slide_id, content_hash in await sql_session.execute(
+            select(SlideModel.id, SlideModel.content_hash).where(
+                SlideModel.presentation == presentation_id
+            )
+        )
+    }
+
+    rows_to_insert = []
+    rows_to_update = []
+    incoming_ids = set()
+    for slide in slides:
+        slide.presentation = presentation_id
+        slide.content_hash = compute_slide_content_hash(slide)
+        incoming_ids.add(slide.id)
+
+        if slide.id not in existing_hashes:
+            rows_to_insert.append(_slide_to_row(slide))
+        elif existing_hashes[slide.id] != slide.content_hash:
+            rows_to_update.append(_slide_to_row(slide))
+
+    if delete_missing:
+        ids_to_delete = [
+            slide_id for slide_id in existing_hashes if slide_id not in incoming_ids
+        ]
+        if ids_to_delete:
+            await sql_session.execute(
+                delete(SlideModel).where(SlideModel.id.in_(ids_to_delete))
+            )
+
+    if rows_to_insert:
+        await sql_session.execute(insert(SlideModel), rows_to_insert)
+
+    if rows_to_update:
+        # ORM按主键批量更新（executemany）
+        await sql_session.execute(update(SlideModel), rows_to_update)
@@ -0,0 +1,280 @@
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+import dirtyjson
+
+
+class StreamingJsonArrayParser:
+    """
+    增量JSON解析器：逐块输入大模型的流式输出，根对象中 `array_key` 数组的每个元素
+    一旦闭合就立即解析返回，无需等待整个JSON结束。
+
+    只扫描新到达的字符，不会重复解析已经处理过的文本；
+    根对象之前的内容（例如 ```json 代码块标记）会被忽略，元素使用 dirtyjson 宽松解析。
+    元素的序号是其在数组中的位置：无法解析而被跳过的元素同样占用序号，
+    后续元素的序号与完整解析后的数组保持一致。
+
+    用法：
+        parser = StreamingJsonArrayParser("slides")
+        async for chunk in stream:
+            for index, slide in parser.feed(chunk):
+                ...
+    """
+
+    def __init__(self, array_key: str):
+        self.array_key = array_key
+        self.items: List[Any] = []
+
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_chars: List[str] = []
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        # 目标数组所在的嵌套深度，None 表示尚未进入目标数组
+        self._array_depth: Optional[int] = None
+        self._array_closed = False
+        self._item_chars: Optional[List[str]] = None
+        # 已闭合的元素数（包括无法解析的元素）
+        self._n_closed = 0
+
+    @property
+    def is_complete(self) -> bool:
+        return self._array_closed
+
+    def feed(self, chunk: str) -> List[Tuple[int, Any]]:
+        """输入一块文本，返回本块中新闭合的数组元素及其在数组中的序号"""
+        completed = []
+        for char in chunk:
+            item = self._consume(char)
+            if item is not None:
+                completed.append(item)
+        return completed
+
+    def _consume(self, char: str) -> Optional[Tuple[int, Any]]:
+        capturing = self._item_chars is not None
+        if capturing:
+            self._item_chars.append(char)
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                self._last_string = "".join(self._string_chars)
+            else:
+                self._string_chars.append(char)
+            return None
+
+        if not self._stack and char != "{":
+            return None
+
+        if char == '"':
+            self._in_string = True
+            self._string_chars = []
+        elif char == ":" and len(self._stack) == 1:
+            self._current_key = self._last_string
+        elif char == "," and len(self._stack) == 1:
+            self._current_key = None
+        elif char in "{[":
+            if (
+                char == "["
+                and self._array_depth is None
+                and len(self._stack) == 1
+                and self._current_key == self.array_key
+            ):
+                self._array_depth = 2
+            elif (
+                self._array_depth is not None
+                and not self._array_closed
+                and len(self._stack) == self._array_depth
+            ):
+                self._item_chars = [char]
+            self._stack.append(char)
+        elif char in "}]":
+            if self._stack:
+                self._stack.pop()
+            if self._array_depth is not None and not self._array_closed:
+                if len(self._stack) == self._array_depth and capturing:
+                    return self._complete_item()
+                if len(self._stack) < self._array_depth:
+                    self._array_closed = True
+        return None
+
+    def _complete_item(self) -> Optional[Tuple[int, Any]]:
+        text = "".join(self._item_chars)
+        self._item_chars = None
+        index = self._n_closed
+        self._n_closed += 1
+        try:
+            item = _to_plain(dirtyjson.loads(text))
+        except Exception:
+            return None
+        self.items.append(item)
+        return index, item
+
+
+def _to_plain(value: Any) -> Any:
+    """dirtyjson 返回带位置信息的对象，转换为普通dict/list"""
+    if isinstance(value, dict):
+        return {key: _to_plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_to_plain(item) for item in value]
+    return value
+
+
+class PartialJsonParser:
+    """
+    解析不完整的JSON文本：逐块输入大模型的流式输出，每次返回当前能确定的最大部分对象。
+    未闭合的字符串值按已到达的内容返回，未完成的数字/字面量和缺少值的键会被忽略。
+
+    每块只扫描新到达的字符；只有出现新的完整值（字符串、数字、对象等闭合），
+    或未闭合的字符串值又增加了 min_reparse_chars 个字符时才重新解析整个文本，
+    其余情况返回上一次的结果（同一个对象），避免每个token都解析一次全部文本。
+
+    用法：
+        parser = PartialJsonParser()
+        async for chunk in stream:
+            partial_value = parser.feed(chunk)
+    """
+
+    MIN_REPARSE_CHARS = 64
+
+    def __init__(self, min_reparse_chars: Optional[int] = None):
+        self.text = ""
+        self.value: Optional[Any] = None
+        self.n_parses = 0
+        self._min_reparse_chars = (
+            self.MIN_REPARSE_CHARS if min_reparse_chars is None else min_reparse_chars
+        )
+        self._parsed_safe_end: Optional[Tuple[int, str]] = None
+        self._parsed_length = 0
+
+        # 每层为 [括号, 对象是否正在等待键]
+        self._stack: List[list] = []
+        self._done = False
+        self._in_string = False
+        self._escape = False
+        self._string_is_value = False
+        self._in_primitive = False
+        # 最后一个完整值的结束位置及此时需要补全的闭合括号
+        self._safe_end: Optional[Tuple[int, str]] = None
+
+    def feed(self, chunk: str) -> Optional[Any]:
+        start = len(self.text)
+        self.text += chunk
+        for offset, char in enumerate(chunk):
+            if self._done:
+                break
+            self._consume(start + offset, char)
+
+        if not self._needs_reparse():
+            return self.value
+
+        self.n_parses += 1
+        self._parsed_safe_end = self._safe_end
+        self._parsed_length = len(self.text)
+        for candidate in self._candidates():
+            try:
+                self.value = json.loads(candidate)
+                break
+            except ValueError:
+                continue
+        return self.value
+
+    def _needs_reparse(self) -> bool:
+        if self._safe_end != self._parsed_safe_end:
+            return True
+        return (
+            self._in_string
+            and self._string_is_value
+            and len(self.text) - self._parsed_length >= self._min_reparse_chars
+        )
+
+    def _closers(self) -> str:
+        return "".join("}" if frame[0] == "{" else "]" for frame in reversed(self._stack))
+
+    def _mark_safe(self, end: int):
+        self._safe_end = (end, self._closers())
+
+    def _consume(self, position: int, char: str):
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._string_is_value:
+                    self._mark_safe(position + 1)
+            return
+
+        if not self._stack:
+            # 忽略根对象之前的内容
+            if char in "{[":
+                self._stack.append([char, True])
+                self._mark_safe(position + 1)
+            return
+
+        if self._in_primitive and (char in ",}]" or char.isspace()):
+            self._in_primitive = False
+            self._mark_safe(position)
+
+        frame = self._stack[-1]
+        if char == '"':
+            self._in_string = True
+            self._string_is_value = frame[0] == "[" or not frame[1]
+        elif char == ":":
+            frame[1] = False
+        elif char == ",":
+            frame[1] = True
+        elif char in "{[":
+            self._stack.append([char, True])
+            self._mark_safe(position + 1)
+        elif char in "}]":
+            self._stack.pop()
+            self._mark_safe(position + 1)
+            self._done = not self._stack
+        elif not char.isspace():
+            self._in_primitive = True
+
+    def _candidates(self) -> List[str]:
+        candidates = []
+        if self._in_string and self._string_is_value:
+            text = self.text[:-1] if self._escape else self.text
+            # 去掉不完整的 \uXXXX 转义
+            text = re.sub(r"\\u[0-9a-fA-F]{0,3}$", "", text)
+            candidates.append(text + '"' + self._closers())
+        if self._safe_end is not None:
+            end, closers = self._safe_end
+            candidates.append(self.text[:end] + closers)
+        return candidates
+
+
+def diff_json_patches(old: Any, new: Any, path: Tuple = ()) -> List[dict]:
+    """
+    比较两个部分对象，返回 {"path": [...], "value": ...} 补丁列表，
+    客户端按顺序将 value 设置到 path 处即可得到新对象
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        patches = []
+        for key, value in new.items():
+            if key in old:
+                patches.extend(diff_json_patches(old[key], value, (*path, key)))
+            else:
+                patches.append({"path": [*path, key], "value": value})
+        return patches
+    if isinstance(old, list) and isinstance(new, list):
+        patches = []
+        for index, value in enumerate(new):
+            if index < len(old):
+                patches.extend(diff_json_patches(old[index], value, (*path, index)))
+            else:
+                patches.append({"path": [*path, index], "value": value})
+        return patches
+    if old != new:
+        return [{"path": list(path), "value": new}]
+    return []
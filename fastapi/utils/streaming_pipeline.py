@@ -0,0 +1,75 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+
+@dataclass
+class PipelineStage:
+    handler: Callable[[Any], Awaitable[Any]]
+    # 该阶段同时执行的最大数量，None 表示不限制
+    concurrency: Optional[int] = None
+
+
+class StreamingPipeline:
+    """
+    流式DAG执行器：每个输入项提交后立即依次经过各阶段，不同输入项之间互不等待，
+    整体耗时接近最慢的一条链路，而不是各阶段耗时之和。
+    任一输入项失败时取消其余所有输入项，并在 join() 中抛出该异常。
+
+    用法：
+        pipeline = StreamingPipeline([PipelineStage(select), PipelineStage(generate, 10)])
+        pipeline.submit(key, item)
+        results = await pipeline.join()  # {key: 最后一个阶段的返回值}
+    """
+
+    def __init__(self, stages: List[PipelineStage]):
+        self._stages = stages
+        self._semaphores = [
+            asyncio.Semaphore(stage.concurrency) if stage.concurrency else None
+            for stage in stages
+        ]
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._error: Optional[BaseException] = None
+
+    def submit(self, key: Hashable, item: Any):
+        self.raise_if_failed()
+        if key in self._tasks:
+            raise ValueError(f"Item {key} has already been submitted")
+        task = asyncio.create_task(self._run(item))
+        task.add_done_callback(self._on_task_done)
+        self._tasks[key] = task
+
+    def raise_if_failed(self):
+        if self._error is not None:
+            raise self._error
+
+    async def _run(self, item: Any) -> Any:
+        for stage, semaphore in zip(self._stages, self._semaphores):
+            if semaphore is None:
+                item = await stage.handler(item)
+            else:
+                async with semaphore:
+                    item = await stage.handler(item)
+        return item
+
+    def _on_task_done(self, task: asyncio.Task):
+        if task.cancelled() or self._error is not None:
+            return
+        error = task.exception()
+        if error is not None:
+            self._error = error
+            self.cancel()
+
+    def cancel(self):
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+
+    async def join(self) -> Dict[Hashable, Any]:
+        try:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        except asyncio.CancelledError:
+            self.cancel()
+            raise
+        self.raise_if_failed()
+        return {key: task.result() for key, task in self._tasks.items()}
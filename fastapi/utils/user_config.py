@@ -1,5 +1,6 @@
 import os
 import json
+from typing import Optional
 
 from models.user_config import UserConfig
 from utils.get_env import (
@@ -101,8 +102,8 @@ def get_user_config():
     )
 
 
-def update_env_with_user_config():
-    user_config = get_user_config()
+def update_env_with_user_config(user_config: Optional[UserConfig] = None):
+    user_config = user_config or get_user_config()
     if user_config.LLM:
         set_llm_provider_env(user_config.LLM)
     if user_config.OPENAI_API_KEY:
@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+from dotenv import load_dotenv
+
+# 加载.env文件
+load_dotenv()
+
+from api.v1.ppt.endpoints.presentation import (
+    on_async_generation_task_failed,
+    run_async_generation_task,
+)
+from services.database import async_session_maker, create_db_and_tables
+from services.generation_job_queue import GENERATION_JOB_QUEUE, GenerationWorker
+from services.image_backfill_queue import IMAGE_BACKFILL_QUEUE, ImageBackfillWorker
+from services.redis_service import REDIS_SERVICE
+from services.user_config_service import USER_CONFIG_SERVICE
+
+
+async def main(concurrency: int | None):
+    await create_db_and_tables()
+    # 与Web进程一样加载用户配置快照并监听配置文件变化，模型和API配置修改后无需重启worker
+    USER_CONFIG_SERVICE.reload()
+    user_config_watcher = asyncio.create_task(USER_CONFIG_SERVICE.run_watcher())
+    worker = GenerationWorker(
+        GENERATION_JOB_QUEUE,
+        async_session_maker,
+        handler=run_async_generation_task,
+        on_failure=on_async_generation_task_failed,
+        concurrency=concurrency,
+    )
+    # 占位图补全与生成任务在同一进程中运行
+    image_backfill_worker = ImageBackfillWorker(IMAGE_BACKFILL_QUEUE)
+    image_backfill_worker.start()
+    try:
+        await worker.run_forever()
+    finally:
+        user_config_watcher.cancel()
+        await image_backfill_worker.stop()
+        await REDIS_SERVICE.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run the presentation generation worker"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Number of generation tasks to run at the same time (default: GENERATION_WORKER_CONCURRENCY or 2)",
+    )
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args.concurrency))
+    except KeyboardInterrupt:
+        pass
@@ -1,6 +1,29 @@
+import { createHash } from "crypto";
+import { promises as fs } from "fs";
+import path from "path";
 import { NextResponse } from "next/server";
 import puppeteer from "puppeteer";
 
+// 内置模板的ETag由模板目录中文件的名称、大小和修改时间计算，无需启动浏览器渲染；
+// 自定义模板存储在后端数据库中，由后端按布局代码版本重新验证，不返回ETag
+async function getBuiltinTemplateEtag(groupName: string): Promise<string | null> {
+  if (path.basename(groupName) !== groupName) {
+    return null;
+  }
+  const templatePath = path.join(process.cwd(), "presentation-templates", groupName);
+  try {
+    const files = (await fs.readdir(templatePath)).sort();
+    const hash = createHash("sha1");
+    for (const file of files) {
+      const stat = await fs.stat(path.join(templatePath, file));
+      hash.update(`${file}:${stat.size}:${stat.mtimeMs};`);
+    }
+    return `"${hash.digest("hex")}"`;
+  } catch (e) {
+    return null;
+  }
+}
+
 export async function GET(request: Request) {
   const { searchParams } = new URL(request.url);
   const groupName = searchParams.get("group");
@@ -9,6 +32,11 @@ export async function GET(request: Request) {
     return NextResponse.json({ error: "Missing group name" }, { status: 400 });
   }
 
+  const etag = await getBuiltinTemplateEtag(groupName);
+  if (etag && request.headers.get("if-none-match") === etag) {
+    return new NextResponse(null, { status: 304, headers: { ETag: etag } });
+  }
+
   const schemaPageUrl = `http://localhost/schema?group=${encodeURIComponent(
     groupName
   )}`;
@@ -74,7 +102,12 @@ export async function GET(request: Request) {
       })),
     };
 
-    return NextResponse.json(response);
+    return new NextResponse(JSON.stringify(response), {
+      headers: {
+        "Content-Type": "application/json",
+        ...(etag ? { ETag: etag } : {}),
+      },
+    });
   } catch (err) {
     return NextResponse.json(
       { error: "Failed to fetch or parse client page" },